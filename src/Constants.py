@@ -5,3 +5,6 @@ class Constants:
     WAKE_TIME = 7/24
     WORK_TIME = 9/24
     HEALTHY_SLEEP = 8/24
+    # Step length for which the weight_new of the sigmoid updates
+    # of suicidal thought and escape behavior is defined
+    SIGMOID_STEP = 1/(24*60)
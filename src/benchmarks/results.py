@@ -0,0 +1,92 @@
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+
+def environment():
+    """
+    Returns the commit, interpreter, library versions and machine the
+    benchmarks run on, so results of different commits can be told
+    apart and compared fairly.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+def write_results(path, results):
+    """
+    Writes benchmark results with the environment to a JSON file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump({"environment": environment(), "results": results},
+                  file, indent=2)
+
+def read_results(path):
+    with open(path) as file:
+        return json.load(file)
+
+def _key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Returns the name, parameters, baseline and current seconds, their
+    ratio, the noise of the baseline and whether it is a regression,
+    for every benchmark in both result files.
+
+    The seconds are the fastest of several repeats, whose spread
+    measures the noise of the machine: the noise is the slowest
+    baseline repeat relative to the fastest. A benchmark regressed
+    when it became slower by more than the threshold fraction, and
+    its fastest repeat is also slower than every baseline repeat, so
+    slowdowns within the measured noise are not flagged.
+
+    Parameters
+    ----------
+    baseline: dict
+        Results read with read_results, e.g. of an earlier commit.
+    current: dict
+        Results read with read_results.
+    threshold: float
+        Relative slowdown counted as a regression.
+    """
+    baseline_results = {_key(result): result
+                        for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = baseline_results.get(_key(result))
+        if old is None:
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        # Results of a single repeat have no measured spread
+        old_max = old.get("max_seconds", old["seconds"])
+        rows.append({
+            "name": result["name"],
+            "params": result["params"],
+            "baseline_seconds": old["seconds"],
+            "seconds": result["seconds"],
+            "ratio": ratio,
+            "noise": old_max / old["seconds"] - 1,
+            "regression": ratio > 1 + threshold
+            and result["seconds"] > old_max,
+        })
+    return rows
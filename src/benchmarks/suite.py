@@ -0,0 +1,195 @@
+import tempfile
+import time
+import numpy as np
+from model.SuicideModel import SuicideModel
+from model.recording.TrajectoryRecorder import RECORDED_COLUMNS
+from benchmarks.timing import measure
+
+# Agent counts of the end-to-end scaling curve
+SCALING_AGENTS = (10, 100, 1_000, 10_000, 100_000)
+# Numbers of modelled days of the end-to-end scaling curve
+SCALING_DAYS = (0.25, 0.5, 1, 2)
+# Largest population run with the per-agent path, which is too slow
+# for the largest populations
+PER_AGENT_LIMIT = 10_000
+# Recording of the scaling runs, hourly so that the recordings of the
+# largest populations fit in memory
+SCALING_CADENCES = {column: "hourly" for column in RECORDED_COLUMNS}
+
+# Timestep size of the benchmarks, one minute
+DT = 1 / (24*60)
+
+
+def _agent(seed=0):
+    """
+    Returns the first agent of a small model, whose updater,
+    parameters and state manager are used by the microbenchmarks.
+    """
+    model = SuicideModel(4, seed=seed)
+    return list(model.agents)[0]
+
+def bench_stress():
+    agent = _agent()
+    mean, sigma, reversion, E_weight = agent.parameters.compiled["stress"]
+    return lambda: agent.updater.stress(
+        DT, agent.stress, agent.external_strat, mean, sigma, reversion,
+        E_weight)
+
+def bench_sigmoid():
+    agent = _agent()
+    params = agent.parameters.compiled["suicidal_thought"]
+    return lambda: agent.updater.sigmoid(
+        agent.suicidal_thought, 0, (0.5,), params)
+
+def bench_rk4_step():
+    agent = _agent()
+    params = agent.parameters.compiled["aversion"]
+    inputs = (0.5, 0.1, 0.1, 0.1, 0.2, 0.0)
+    return lambda: agent.updater.rk4_step(
+        agent.aversive_internal_state, 0, DT,
+        agent.updater.aversive_internal_state, inputs, params)
+
+def bench_update_state():
+    """
+    Passes one minute in an agent's state per call, with transitions
+    as often as over a modelled day.
+    """
+    agent = _agent()
+    manager = agent.state_manager
+    clock = [0.0]
+    def update():
+        clock[0] += DT
+        manager.update_state(DT, clock[0], agent.parameters)
+    return update
+
+def bench_transition():
+    """
+    Moves an agent to its following state on every call.
+    """
+    agent = _agent()
+    manager = agent.state_manager
+    return lambda: manager.transition(0.0, agent.parameters)
+
+def bench_collect(n, vectorized):
+    """
+    Records all agents of a model per call, flushing full chunks to a
+    temporary directory as a long run would, so the recordings of
+    many calls do not fill the memory.
+    """
+    directory = tempfile.TemporaryDirectory()
+    model = SuicideModel(n, seed=0, vectorized=vectorized,
+                         record_directory=directory.name)
+    model.step(DT)
+    def collect():
+        model.datacollector.collect(model)
+    # Removes the directory once the benchmark is dropped
+    collect.directory = directory
+    return collect
+
+def bench_step(n, vectorized):
+    model = SuicideModel(n, seed=0, vectorized=vectorized)
+    return lambda: model.step(DT)
+
+# Microbenchmarks, as (name, setup, parameters) where setup takes the
+# parameters and returns the function to time
+MICRO_BENCHMARKS = (
+    ("AgentUpdater.stress", bench_stress, {}),
+    ("AgentUpdater.sigmoid", bench_sigmoid, {}),
+    ("AgentUpdater.rk4_step", bench_rk4_step, {}),
+    ("StateManager.update_state", bench_update_state, {}),
+    ("StateManager.transition", bench_transition, {}),
+    ("TrajectoryRecorder.collect", bench_collect,
+     {"n": 100, "vectorized": False}),
+    ("TrajectoryRecorder.collect", bench_collect,
+     {"n": 10_000, "vectorized": True}),
+    ("SuicideModel.step", bench_step, {"n": 100, "vectorized": False}),
+    ("SuicideModel.step", bench_step, {"n": 100, "vectorized": True}),
+)
+
+
+def run_micro(names=None, repeats=5, min_time=0.2):
+    """
+    Runs the microbenchmarks, or only those whose name is in names,
+    and returns one result per benchmark.
+    """
+    results = []
+    for name, setup, params in MICRO_BENCHMARKS:
+        if names is not None and name not in names:
+            continue
+        timing = measure(setup(**params), repeats, min_time)
+        results.append({"name": name, "params": params, **timing})
+    return results
+
+
+def run_model(n, days, vectorized, dt=DT, seed=0, cadences=SCALING_CADENCES,
+              repeats=3):
+    """
+    Builds and runs one model repeats times, each time from scratch,
+    and returns the shortest time taken to build it, the shortest run
+    time and time per step, and the agent steps per second of the
+    fastest run. As with measure, the fastest repeat is the least
+    disturbed by other work of the machine, so a comparison of single
+    runs does not flag noise as a regression.
+    """
+    steps = max(1, int(days / dt))
+    build_times = []
+    run_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model = SuicideModel(n, seed=seed, vectorized=vectorized,
+                             record_cadences=cadences)
+        build_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(steps):
+            model.step(dt)
+        run_times.append(time.perf_counter() - start)
+        # Frees the recordings before the next repeat builds its model
+        del model
+    run_seconds = min(run_times)
+    return {
+        "name": "SuicideModel.run",
+        "params": {"n": n, "days": days, "vectorized": vectorized},
+        "build_seconds": min(build_times),
+        "seconds": run_seconds,
+        "median_seconds": float(np.median(run_times)),
+        "max_seconds": max(run_times),
+        "repeats": repeats,
+        "seconds_per_step": run_seconds / steps,
+        "agent_steps_per_second": n * steps / run_seconds,
+    }
+
+
+def run_scaling(agents=SCALING_AGENTS, days=SCALING_DAYS, agents_days=0.25,
+                days_agents=100, modes=(False, True),
+                per_agent_limit=PER_AGENT_LIMIT, repeats=3):
+    """
+    Runs the end-to-end scaling curves: over the number of agents for
+    agents_days modelled days, and over the number of days for
+    days_agents agents, once per mode.
+
+    Parameters
+    ----------
+    agents: tuple of int
+        Agent counts of the curve over agents.
+    days: tuple of float
+        Modelled days of the curve over days.
+    agents_days: float
+        Modelled days of every run of the curve over agents.
+    days_agents: int
+        Agent count of every run of the curve over days.
+    modes: tuple of bool
+        Values of SuicideModel's vectorized option to run.
+    per_agent_limit: int
+        Largest agent count run with vectorized=False.
+    repeats: int
+        Number of runs of every point, of which the fastest counts.
+    """
+    runs = [(n, agents_days) for n in agents]
+    runs += [(days_agents, d) for d in days if (days_agents, d) not in runs]
+    results = []
+    for vectorized in modes:
+        for n, d in runs:
+            if not vectorized and n > per_agent_limit:
+                continue
+            results.append(run_model(n, d, vectorized, repeats=repeats))
+    return results
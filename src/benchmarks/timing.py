@@ -0,0 +1,42 @@
+import time
+import numpy as np
+
+def measure(function, repeats=5, min_time=0.2):
+    """
+    Times calls of function and returns statistics of the time per
+    call. The number of calls per repeat is doubled until one repeat
+    takes at least min_time, so fast functions are timed over many
+    calls and the timer's resolution does not matter.
+
+    Parameters
+    ----------
+    function: function
+        Function without arguments to time.
+    repeats: int
+        Number of timed repeats of the calls.
+    min_time: float
+        Minimum duration of one repeat in seconds.
+    """
+    number = 1
+    while True:
+        elapsed = _time_calls(function, number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    times = [elapsed] + [
+        _time_calls(function, number) for _ in range(repeats - 1)
+    ]
+    per_call = np.array(times) / number
+    return {
+        "seconds": float(per_call.min()),
+        "median_seconds": float(np.median(per_call)),
+        "max_seconds": float(per_call.max()),
+        "calls": number,
+        "repeats": repeats,
+    }
+
+def _time_calls(function, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return time.perf_counter() - start
@@ -4,52 +4,332 @@ from model.agents.VolatileAgent import VolatileAgent
 from model.agents.PopularAgent import PopularAgent
 from model.agents.BulliedAgent import BulliedAgent
 from model.system_updates.state_registry import register_all_states
+from model.system_updates.Population import Population, STRESS_SCHEMES
+from model.system_updates.WienerNoise import WienerNoise
+from model.recording.TrajectoryRecorder import TrajectoryRecorder
+from model.recording.OnlineStatistics import OnlineStatistics
+from model.social.SocialGraph import SocialGraph
+from model.parameters.parameter_overrides import with_defaults
+from model.profiling.StepProfiler import StepProfiler
+from model.checkpoint.checkpoints import (
+    write_checkpoint, read_checkpoint, prefixed, subset,
+    get_agents_checkpoint, load_agents_checkpoint
+)
 import numpy as np
 
+# Agent classes, in creation order, and the probability of each
+AGENT_TYPES = (StandardAgent, VolatileAgent, PopularAgent, BulliedAgent)
+TYPE_PROBABILITIES = (0.5, 0.1, 0.2, 0.2)
+
 
 class SuicideModel(mesa.Model):
     """
     Agent-based model of suicidality in a small community.
     """
 
-    def __init__(self, n=10, seed=None):
+    def __init__(self, n=10, seed=None, vectorized=False,
+                 noise_block_size=2**20, stress_scheme="euler",
+                 stress_interval=1, integrator="rk4", max_dt=1/96,
+                 tolerance=1e-6, chunk_steps=1440, record_directory=None,
+                 record_cadences=None, statistics=None, social_coupling=None,
+                 parameter_overrides=None, checkpoint_path=None,
+                 checkpoint_interval=None, profile=False,
+                 profile_sampler=None, noise=None, arrays=None):
         """
         Initializes the model with a number of agents.
+
+        Parameters
+        ----------
+        n: int
+            Number of agents in the community.
+        seed: int or np.random.SeedSequence
+            Seed of the model's randomness. Two independent streams
+            are spawned from it: one for the model's generator
+            self.rng, which draws the agent types, social networks,
+            commute and sleep lengths and per-step stress noise, and
+            one for the vectorized population's noise generator.
+            Nothing is drawn from the global np.random.
+        vectorized: bool
+            If True, agent variables are stored in a Population and
+            all agents are updated in one batched step per timestep,
+            instead of calling update_agent on every agent.
+        noise_block_size: int
+            Number of stress increments the vectorized population
+            draws at once from its noise generator. If None,
+            increments are drawn from self.rng every step.
+        stress_scheme: str
+            Stress integration scheme, "euler" or "exact". See
+            Population.
+        stress_interval: int
+            Number of steps per stress update of the vectorized
+            population. See Population.
+        integrator: str
+            Integrator of the vectorized population, "rk4",
+            "adaptive" or "implicit". With "adaptive", every
+            step(dt) may be as long as the recording interval, and
+            "implicit" stays stable at timesteps of many minutes.
+            See Population.
+        max_dt: float
+            Largest step of the adaptive integrator.
+        tolerance: float
+            Error tolerance of the adaptive integrator.
+        chunk_steps: int
+            Largest number of recorded steps the trajectory recorder
+            keeps in preallocated arrays before flushing them, which
+            are also kept below CHUNK_BYTES.
+        record_directory: str or Path
+            Directory the trajectory recorder flushes to. If None,
+            all recordings are kept in memory, which grows without
+            bound with the number of agents and steps recorded; pass
+            a directory, or fewer record_cadences, for long runs.
+        record_cadences: dict
+            Recording cadence per column, e.g. {"Stress": "hourly",
+            "State": "transitions"}. See TrajectoryRecorder. If None,
+            every column is recorded every step. Pass {} to record
+            nothing, e.g. when only statistics are needed.
+        statistics: dict
+            Keyword arguments of the OnlineStatistics that summarize
+            the agent variables per type and time bin every step, in
+            self.statistics. If None, self.statistics is None.
+        social_coupling: str
+            Agent variable, e.g. "aversive_internal_state", by which
+            friend and bully influence is weighted with the connected
+            agents' current value. If None, influence only depends on
+            the connection weights. See Population.
+        parameter_overrides: dict
+            New default parameters of every agent type, by parameter
+            set and field, e.g. {"aversion": {"feedback": 4}}. See
+            parameter_overrides.with_defaults.
+        checkpoint_path: str or Path
+            File to write checkpoints to, see save_checkpoint.
+        checkpoint_interval: int
+            Number of steps between checkpoints. If None, no
+            checkpoints are written automatically.
+        profile: bool
+            If True, the wall time of every phase of a step, the state
+            transitions and the random draws are measured by
+            self.profiler, see StepProfiler. If False, self.profiler
+            is None and nothing is measured or slowed down.
+        profile_sampler: object
+            Sampling profiler that runs during the profiled steps,
+            e.g. a StackSampler. Only used if profile is True.
+        noise: object
+            Source of the stress noise of all agents, with the
+            increments(dt) and standard_normal() methods of
+            WienerNoise, instead of the model's own. Used by both the
+            per-agent and the vectorized path, e.g. to drive models
+            with common random numbers. Models with a given noise
+            cannot be checkpointed.
+        arrays: dict
+            Preallocated arrays of the vectorized population's agent
+            variables, parameter tables and state codes, e.g. in
+            shared memory, see Population. Only used if vectorized
+            is True.
         """
-        super().__init__(seed=seed)
+        if stress_scheme not in STRESS_SCHEMES:
+            raise ValueError(f"Unknown stress scheme {stress_scheme}")
+        if not vectorized and (stress_interval != 1
+                               or integrator != "rk4"
+                               or social_coupling is not None):
+            raise ValueError("Stress intervals other than 1, integrators"
+                             + " other than rk4 and social coupling"
+                             + " require vectorized=True")
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        model_seed, noise_seed = seed.spawn(2)
+        super().__init__(rng=np.random.default_rng(model_seed))
+        self.profiler = None
+        if profile:
+            self.profiler = StepProfiler(profile_sampler)
+            # Wrapped before any agent holds a reference to it
+            self.rng = self.profiler.count_draws(self.rng, "model")
+        # Arguments to rebuild the model with when resuming
+        self.config = {
+            "n": n,
+            "seed": {"entropy": seed.entropy, "spawn_key": seed.spawn_key},
+            "vectorized": vectorized,
+            "noise_block_size": noise_block_size,
+            "stress_scheme": stress_scheme,
+            "stress_interval": stress_interval,
+            "integrator": integrator,
+            "max_dt": max_dt,
+            "tolerance": tolerance,
+            "chunk_steps": chunk_steps,
+            "record_directory": None if record_directory is None
+            else str(record_directory),
+            "record_cadences": record_cadences,
+            "statistics": statistics,
+            "social_coupling": social_coupling,
+            "parameter_overrides": parameter_overrides,
+            "checkpoint_path": None if checkpoint_path is None
+            else str(checkpoint_path),
+            "checkpoint_interval": checkpoint_interval,
+        }
+        self.noise = noise
+        self.stress_scheme = stress_scheme
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
         self.num_agents = n
         self.time = 0
-        self.datacollector = mesa.DataCollector(
-            agent_reporters={
-                "Type": "type",
-                "Stress": "stress",
-                "Aversive Internal State": "aversive_internal_state",
-                "Urge to Escape": "urge_to_escape",
-                "Suicidal Thought": "suicidal_thought",
-                "Escape Behavior": "escape_behavior",
-                "External-Focused Change": "external_strat",
-                "Internal-Focused Change": "internal_strat",
-                "Time": "total_time",
-                "State": lambda agent: agent.state_manager.state.to_string(),
-            }
-        )
         register_all_states()
 
-        type_probs = [0.5, 0.1, 0.2, 0.2]
-        counts = np.random.multinomial(n, type_probs)
-        StandardAgent.create_agents(model=self, n=counts[0])
-        VolatileAgent.create_agents(model=self, n=counts[1])
-        PopularAgent.create_agents(model=self, n=counts[2])
-        BulliedAgent.create_agents(model=self, n=counts[3])
-        for agent in self.agents:
-            agent.set_friends()
-            agent.set_bullies()
+        self.add_agents(n)
+        if parameter_overrides:
+            for agent in self.agents:
+                agent.parameters = with_defaults(
+                    type(agent.parameters), parameter_overrides)()
+        self.build_social_networks()
+        self.population = None
+        if vectorized:
+            if noise is None and noise_block_size is not None:
+                noise = WienerNoise(
+                    len(self.agents),
+                    seed=noise_seed,
+                    block_size=noise_block_size,
+                )
+            self.population = Population(
+                self.agents,
+                self.friend_graph,
+                self.bully_graph,
+                noise=noise,
+                stress_scheme=stress_scheme,
+                stress_interval=stress_interval,
+                integrator=integrator,
+                max_dt=max_dt,
+                tolerance=tolerance,
+                social_coupling=social_coupling,
+                rng=self.rng,
+                arrays=arrays,
+            )
+        self.datacollector = TrajectoryRecorder(
+            self.agents,
+            chunk_steps=chunk_steps,
+            directory=record_directory,
+            cadences=record_cadences,
+        )
+        self.statistics = None if statistics is None \
+            else OnlineStatistics(self.agents, **statistics)
+        if self.profiler is not None:
+            self.profiler.attach(self)
     
 
+    def add_agents(self, n):
+        """
+        Creates n agents, with the number of agents of every type
+        drawn from TYPE_PROBABILITIES. Agents of one type are created
+        together, in the order of AGENT_TYPES.
+        """
+        counts = self.rng.multinomial(n, TYPE_PROBABILITIES)
+        for agent_class, count in zip(AGENT_TYPES, counts):
+            agent_class.create_agents(model=self, n=count)
+
+    def build_social_networks(self):
+        """
+        Samples the friend and bully networks of all agents at once,
+        with friend_count and bully_count connections per agent.
+        """
+        agents = list(self.agents)
+        for index, agent in enumerate(agents):
+            agent.social_index = index
+        ids = np.array([agent.unique_id for agent in agents])
+        self.friend_graph = SocialGraph.sample(
+            [agent.friend_count for agent in agents], ids=ids, rng=self.rng)
+        self.bully_graph = SocialGraph.sample(
+            [agent.bully_count for agent in agents], ids=ids, rng=self.rng)
+        friend_counts = self.friend_graph.degrees().tolist()
+        bully_counts = self.bully_graph.degrees().tolist()
+        for agent, num_friends, num_bullies in zip(
+                agents, friend_counts, bully_counts):
+            agent.num_friends = num_friends
+            agent.num_bullies = num_bullies
+
     def step(self, dt):
         """
         Performs one timestep of the model.
         """
         self.datacollector.collect(self)
-        self.agents.do(lambda agent: agent.update_agent(dt))
+        if self.statistics is not None:
+            self.statistics.collect(self)
+        if self.population is None and self.noise is not None:
+            for agent, dW in zip(self.agents, self.noise.increments(dt)):
+                agent.update_agent(dt, dW)
+        elif self.population is None:
+            self.agents.do(lambda agent: agent.update_agent(dt))
+        else:
+            self.population.step(dt)
         self.time += dt
+        if self.checkpoint_interval is not None \
+          and self.steps % self.checkpoint_interval == 0:
+            self.save_checkpoint()
+
+    def save_checkpoint(self, path=None):
+        """
+        Writes the full state of the model to a compressed .npz file:
+        agent variables, parameters and states, state parameter draws,
+        the social networks, the population schedule, the recordings
+        so far and the state of every random number generator.
+        Resuming from it with resume continues exactly as the
+        uninterrupted run would.
+
+        Parameters
+        ----------
+        path: str or Path
+            File to write to. Defaults to the model's checkpoint_path.
+        """
+        if self.noise is not None:
+            raise ValueError("Models with a given noise source cannot"
+                             + " be checkpointed")
+        path = self.checkpoint_path if path is None else path
+        agents = list(self.agents)
+        arrays = prefixed(get_agents_checkpoint(agents), "agents")
+        meta = {
+            "config": self.config,
+            "steps": self.steps,
+            "time": self.time,
+            "running": self.running,
+            "rng_state": self.rng.bit_generator.state,
+            "random_state": self.random.getstate(),
+        }
+        for name in ("friend_graph", "bully_graph", "datacollector",
+                     "statistics", "population"):
+            component = getattr(self, name)
+            if component is None:
+                continue
+            component_arrays, meta[name] = component.get_checkpoint()
+            arrays.update(prefixed(component_arrays, name))
+        write_checkpoint(path, arrays, meta)
+
+    @classmethod
+    def resume(cls, path, profile=False, profile_sampler=None):
+        """
+        Rebuilds a model from a checkpoint written by save_checkpoint,
+        ready to continue stepping. Profiling is not part of the
+        checkpoint, and is configured as in __init__.
+        """
+        arrays, meta = read_checkpoint(path)
+        config = dict(meta["config"])
+        config["seed"] = np.random.SeedSequence(
+            config["seed"]["entropy"],
+            spawn_key=tuple(config["seed"]["spawn_key"]),
+        )
+        model = cls(**config, profile=profile,
+                    profile_sampler=profile_sampler)
+        model.steps = meta["steps"]
+        model.time = meta["time"]
+        model.running = meta["running"]
+        model.rng.bit_generator.state = meta["rng_state"]
+        version, state, gauss = meta["random_state"]
+        model.random.setstate((version, tuple(state), gauss))
+        load_agents_checkpoint(list(model.agents), subset(arrays, "agents"))
+        for name in ("friend_graph", "bully_graph", "datacollector",
+                     "statistics", "population"):
+            component = getattr(model, name)
+            if component is not None:
+                component.load_checkpoint(subset(arrays, name), meta[name])
+        for agent, num_friends, num_bullies in zip(
+                model.agents,
+                model.friend_graph.degrees().tolist(),
+                model.bully_graph.degrees().tolist()):
+            agent.num_friends = num_friends
+            agent.num_bullies = num_bullies
+        return model
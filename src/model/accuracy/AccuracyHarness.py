@@ -0,0 +1,186 @@
+import time
+import numpy as np
+from Constants import Constants
+from model.SuicideModel import SuicideModel
+from model.recording.TrajectoryRecorder import RECORDED_COLUMNS
+from model.accuracy.BrownianPath import BrownianPath
+from model.accuracy.metrics import ACCURACY_VARIABLES, compare
+
+# One minute, the step size of the reference path
+MINUTE = Constants.DAY_LENGTH / (24*60)
+
+# Fast simulation modes compared with the reference, as step size in
+# minutes and SuicideModel keyword arguments
+ACCURACY_MODES = {
+    "vectorized rk4 1 min": (1, {"vectorized": True}),
+    "vectorized rk4 5 min": (5, {"vectorized": True}),
+    "exact stress rk4 5 min": (
+        5, {"vectorized": True, "stress_scheme": "exact"}),
+    "implicit 5 min": (
+        5, {"vectorized": True, "integrator": "implicit",
+            "stress_scheme": "exact"}),
+    "implicit 15 min": (
+        15, {"vectorized": True, "integrator": "implicit",
+             "stress_scheme": "exact"}),
+    "implicit 60 min": (
+        60, {"vectorized": True, "integrator": "implicit",
+             "stress_scheme": "exact"}),
+    "adaptive 60 min": (
+        60, {"vectorized": True, "integrator": "adaptive",
+             "stress_scheme": "exact"}),
+}
+
+
+class AccuracyHarness():
+    """
+    Measures the accuracy and cost of fast simulation modes against
+    the reference per-agent path, which updates every agent with
+    StandardAgent.update_agent in steps of one minute.
+
+    All runs of a replicate use common random numbers:
+    - the same model seed, so the same agents, networks and initial
+      draws;
+    - the same Wiener paths of stress on a one-minute grid, summed
+      over the steps of every mode, see BrownianPath;
+    - one generator per agent for the random state lengths, so draws
+      do not move between agents when they change state in a
+      different order.
+    The differences between a mode and the reference therefore come
+    from the numerical method, except for the adaptive integrator,
+    whose steps do not follow the grid and get independent draws
+    from the paths.
+    The vectorized rk4 mode in steps of one minute reproduces the
+    reference, with the same states at every step.
+    """
+    def __init__(
+            self,
+            n=100,
+            days=2,
+            modes=None,
+            replicates=1,
+            seed=None,
+            interval=60,
+    ):
+        """
+        Parameters
+        ----------
+        n: int
+            Number of agents.
+        days: float
+            Number of days to model per run.
+        modes: dict
+            Compared modes, as step size in minutes and SuicideModel
+            keyword arguments by name. Defaults to ACCURACY_MODES.
+        replicates: int
+            Number of seeds every mode is run with. Errors and wall
+            times are averaged over them.
+        seed: int or np.random.SeedSequence
+            Seed of the replicates.
+        interval: int
+            Minutes between the compared recordings. Every step size
+            must divide it.
+        """
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.n = n
+        self.days = days
+        self.modes = dict(ACCURACY_MODES if modes is None else modes)
+        for name, (step_minutes, _) in self.modes.items():
+            if interval % step_minutes != 0:
+                raise ValueError(f"Step size {step_minutes} of {name} does"
+                                 + f" not divide the interval {interval}")
+        self.replicates = replicates
+        self.interval = interval
+
+    def run_mode(self, seed, step_minutes, model_kwargs):
+        """
+        Runs one model with common random numbers and returns its
+        agent DataFrame, recorded every interval, and the wall time
+        of its steps.
+        """
+        # Spawn from a copy, so every mode gets the same children
+        model_seed, noise_seed, state_seed = np.random.SeedSequence(
+            seed.entropy, spawn_key=seed.spawn_key).spawn(3)
+        dt = step_minutes * MINUTE
+        stress_interval = model_kwargs.get("stress_interval", 1)
+        noise = BrownianPath(
+            self.n, MINUTE, seed=noise_seed,
+            normal_steps=step_minutes * stress_interval,
+        )
+        model = SuicideModel(
+            self.n,
+            seed=model_seed,
+            noise=noise,
+            record_cadences={
+                column: self.interval // step_minutes
+                for column in RECORDED_COLUMNS
+            },
+            **model_kwargs,
+        )
+        for agent, agent_seed in zip(
+                model.agents, state_seed.spawn(len(model.agents))):
+            agent.state_params.rng = np.random.default_rng(agent_seed)
+
+        steps = int(round(self.days / dt))
+        start = time.perf_counter()
+        for _ in range(steps):
+            model.step(dt)
+        seconds = time.perf_counter() - start
+        return model.datacollector.get_agent_vars_dataframe(), seconds
+
+    def run(self):
+        """
+        Runs the reference and every mode for every replicate, and
+        returns the wall times, error norms and distribution distances
+        of every mode, averaged over the replicates.
+        """
+        interval = self.interval * MINUTE
+        reference_seconds = []
+        results = {name: [] for name in self.modes}
+        seed_sequence = np.random.SeedSequence(
+            self.seed_sequence.entropy,
+            spawn_key=self.seed_sequence.spawn_key,
+        )
+        for seed in seed_sequence.spawn(self.replicates):
+            reference_df, seconds = self.run_mode(seed, 1, {})
+            reference_seconds.append(seconds)
+            for name, (step_minutes, model_kwargs) in self.modes.items():
+                agent_df, seconds = self.run_mode(
+                    seed, step_minutes, model_kwargs)
+                results[name].append(
+                    (seconds, compare(reference_df, agent_df, interval)))
+
+        reference_time = float(np.mean(reference_seconds))
+        modes = []
+        for name, (step_minutes, model_kwargs) in self.modes.items():
+            seconds = float(np.mean([run[0] for run in results[name]]))
+            comparisons = [run[1] for run in results[name]]
+            modes.append({
+                "name": name,
+                "step_minutes": step_minutes,
+                "model_kwargs": model_kwargs,
+                "common_noise": model_kwargs.get("integrator") != "adaptive",
+                "seconds": seconds,
+                "speedup": reference_time / seconds,
+                "state_agreement": float(np.mean([
+                    comparison.get("state_agreement", np.nan)
+                    for comparison in comparisons])),
+                "variables": {
+                    variable: {
+                        metric: float(np.mean([
+                            comparison["variables"][variable][metric]
+                            for comparison in comparisons]))
+                        for metric in comparisons[0]["variables"][variable]
+                    }
+                    for variable in ACCURACY_VARIABLES
+                },
+            })
+        return {
+            "agents": self.n,
+            "days": self.days,
+            "replicates": self.replicates,
+            "interval_minutes": self.interval,
+            "reference": {"step_minutes": 1, "seconds": reference_time},
+            "modes": modes,
+        }
@@ -0,0 +1,82 @@
+import numpy as np
+
+
+class BrownianPath():
+    """
+    Wiener paths of a population on a fine grid of time, handed out
+    as the increments over steps of any whole number of grid steps.
+    Models stepping with different step sizes but the same seed are
+    driven by the same paths, so their differences come from the
+    numerical method and not from the noise.
+
+    Implements the noise interface of WienerNoise, so it can be given
+    to SuicideModel as its noise.
+    """
+    def __init__(self, size, dt, seed=None, normal_steps=1,
+                 block_steps=1440):
+        """
+        Parameters
+        ----------
+        size: int
+            Number of agents.
+        dt: float
+            Step size of the fine grid, which divides the step size
+            of every model driven by the paths.
+        seed: int or np.random.SeedSequence
+            Seed of the paths.
+        normal_steps: int
+            Number of grid steps covered by every standard_normal
+            draw, i.e. the model's step size times its stress
+            interval divided by dt.
+        block_steps: int
+            Number of grid steps drawn at once.
+        """
+        self.size = size
+        self.dt = dt
+        self.normal_steps = normal_steps
+        self.block_steps = block_steps
+        self.rng = np.random.default_rng(seed)
+        self._block = np.empty((0, size))
+        self._cursor = 0
+
+    def _grid_steps(self, count):
+        """
+        Returns the standard normal draws of the next count grid
+        steps, as a count x size array.
+        """
+        rows = []
+        while count > 0:
+            if self._cursor >= len(self._block):
+                self._block = self.rng.standard_normal(
+                    (self.block_steps, self.size))
+                self._cursor = 0
+            taken = self._block[self._cursor:self._cursor + count]
+            self._cursor += len(taken)
+            count -= len(taken)
+            rows.append(taken)
+        return np.concatenate(rows) if len(rows) > 1 else rows[0]
+
+    def steps(self, dt):
+        """
+        Returns the number of grid steps in a step of size dt.
+        """
+        count = int(round(dt / self.dt))
+        if count < 1 or not np.isclose(count * self.dt, dt):
+            raise ValueError(f"Step size {dt} is not a multiple of the"
+                             + f" grid step {self.dt}")
+        return count
+
+    def increments(self, dt):
+        """
+        Returns the Wiener increments over the next step of size dt,
+        one per agent.
+        """
+        return np.sqrt(self.dt) * self._grid_steps(self.steps(dt)).sum(axis=0)
+
+    def standard_normal(self):
+        """
+        Returns the Wiener increments over the next normal_steps grid
+        steps, scaled to standard normal draws.
+        """
+        draws = self._grid_steps(self.normal_steps)
+        return draws.sum(axis=0) / np.sqrt(self.normal_steps)
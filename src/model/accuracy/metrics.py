@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import ks_2samp, wasserstein_distance
+
+# Compared agent variables, by short name
+ACCURACY_VARIABLES = {
+    "S": "Stress",
+    "A": "Aversive Internal State",
+    "U": "Urge to Escape",
+    "T": "Suicidal Thought",
+    "X": "Escape Behavior",
+}
+
+def align(reference_df, agent_df, interval):
+    """
+    Returns the rows of two agent DataFrames recorded at the same
+    multiples of interval of model time, for the same agents, as two
+    DataFrames indexed by (grid time, agent ID) in the same order.
+    Rows recorded in between are dropped.
+    """
+    frames = []
+    for frame in (reference_df, agent_df):
+        ticks = frame["Time"].to_numpy() / interval
+        on_grid = np.isclose(ticks, np.round(ticks), rtol=0, atol=1e-6)
+        frame = frame[on_grid]
+        index = pd.MultiIndex.from_arrays([
+            np.round(ticks[on_grid]).astype(np.int64),
+            frame.index.get_level_values("AgentID"),
+        ], names=["Tick", "AgentID"])
+        frames.append(frame.set_axis(index).sort_index())
+    common = frames[0].index.intersection(frames[1].index)
+    return frames[0].loc[common], frames[1].loc[common]
+
+def error_norms(reference, values, ticks):
+    """
+    Returns the root mean square and largest absolute difference of
+    two aligned trajectories, over all rows and at the last tick, and
+    the largest difference of their population means at any tick.
+
+    Parameters
+    ----------
+    reference: np.ndarray
+        Values of the reference run.
+    values: np.ndarray
+        Values of the compared run, aligned with reference.
+    ticks: np.ndarray
+        Grid time of every row.
+    """
+    errors = values - reference
+    last = ticks == ticks.max()
+    mean_errors = pd.Series(errors).groupby(ticks).mean().to_numpy()
+    return {
+        "rmse": float(np.sqrt(np.mean(errors**2))),
+        "max": float(np.max(np.abs(errors))),
+        "final_rmse": float(np.sqrt(np.mean(errors[last]**2))),
+        "mean_bias": float(np.max(np.abs(mean_errors))),
+    }
+
+def distribution_distances(reference, values):
+    """
+    Returns the Wasserstein-1 distance and Kolmogorov-Smirnov
+    statistic between the distributions of two sets of values, which
+    do not need to be aligned.
+    """
+    return {
+        "wasserstein": float(wasserstein_distance(reference, values)),
+        "ks": float(ks_2samp(reference, values, method="asymp").statistic),
+    }
+
+def compare(reference_df, agent_df, interval):
+    """
+    Returns the error norms and distribution distances of every
+    variable in ACCURACY_VARIABLES, and the fraction of rows in the
+    same state, between two agent DataFrames at the multiples of
+    interval they share.
+    """
+    reference, other = align(reference_df, agent_df, interval)
+    ticks = reference.index.get_level_values("Tick").to_numpy()
+    result = {"rows": len(reference), "variables": {}}
+    for name, column in ACCURACY_VARIABLES.items():
+        reference_values = reference[column].to_numpy(dtype=float)
+        values = other[column].to_numpy(dtype=float)
+        result["variables"][name] = {
+            **error_norms(reference_values, values, ticks),
+            **distribution_distances(reference_values, values),
+        }
+    if "State" in reference and "State" in other:
+        result["state_agreement"] = float(np.mean(
+            reference["State"].to_numpy() == other["State"].to_numpy()))
+    return result
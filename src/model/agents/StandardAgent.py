@@ -6,14 +6,29 @@ from model.system_updates.AgentUpdater import (
 from model.parameters.DefaultParameters import DefaultParameters
 from model.parameters.StateParameters import StateParameters
 from model.system_updates.StateManager import StateManager
+from model.system_updates.Population import PopulationVariable
 from model.states.SleepState import SleepState
-SOCIAL_WEIGHT_IDX = 1
 
 
 class StandardAgent(mesa.Agent):
     """
     Default agent in the suicide model.
     """
+    # Agent variables, stored in the model's Population when it has one
+    stress = PopulationVariable()
+    aversive_internal_state = PopulationVariable()
+    urge_to_escape = PopulationVariable()
+    suicidal_thought = PopulationVariable()
+    escape_behavior = PopulationVariable()
+    external_strat = PopulationVariable()
+    internal_strat = PopulationVariable()
+    total_time = PopulationVariable()
+    population = None
+    population_index = None
+    # Number of connections in the model's social networks
+    friend_count = 5
+    bully_count = 0
+    social_index = None
 
     def __init__(self, model):
         """
@@ -21,11 +36,11 @@ class StandardAgent(mesa.Agent):
         """
         super().__init__(model)
         self.type = "standard"
-        self.updater = AgentUpdater()
+        self.updater = AgentUpdater(model.rng)
         self.parameters = DefaultParameters()
 
         # Initialize state-specific values
-        self.state_params = StateParameters()
+        self.state_params = StateParameters(model.rng)
         self.state_params.set_commute()         # should be constant
         self.state_params.set_sleep_params()
 
@@ -43,137 +58,152 @@ class StandardAgent(mesa.Agent):
         self.state_manager.state = SleepState()
         self.state_manager.state.generate_time(0, None, self.state_params)
 
-    def set_friends(self, n=5):
-        n = min(n, self.model.num_agents)
-        self.friends = self.set_social_connections(n)
-        self.num_friends = n
-
-    def set_bullies(self, n=0):
-        n = min(n, self.model.num_agents)
-        self.bullies = self.set_social_connections(n)
-        self.num_bullies = n
-    
-    def set_social_connections(
-            self,
-            n
-    ):
-        if n == 0:
-            return np.array([])
-        other_agents = [agent.unique_id 
-                        for agent in self.model.agents 
-                        if agent.unique_id != self.unique_id]
-        n = min(n, len(other_agents))
-        agent_IDs = np.random.choice(other_agents, size=n)
-
-        # Take n random samples from N(0.5, 0.15)
-        # (roughly between 0 and 1), then clip
-        weights = np.random.normal(loc=0.5, scale=0.15, size=n)
-        weights = np.clip(weights, 0, 1)
-
-        # Make 2D array
-        connections = np.column_stack((agent_IDs, weights))
-        return connections
-
-    def saturated_mean_social_influence(self, connections, k=5):
-        """
-        Calculates social influence using the mean weight
-        of the agent's social connections. Saturates by
-        multiplying with f(n) = n/(k+n), so that f(n) =
-        1 as n -> inf, and f(n) = 1/2 at k = n.
-        """
-        total = 0
-        for agent_info in connections:
-            total += agent_info[SOCIAL_WEIGHT_IDX]
-        n = len(connections)
-        if n == 0:
-            return 0
-        return (total/n) * (n/(k+n))
-    
-    def update_agent(self, dt):
-        """
-        Updates the agent over timestep dt.
+    def set_friends(self, n=None):
+        """
+        Resamples the agent's friends in the model's friend network.
+        Uses friend_count connections if n is None.
+        """
+        if n is None:
+            n = self.friend_count
+        self.num_friends = self.model.friend_graph.resample(
+            self.social_index, n, rng=self.model.rng)
+
+    def set_bullies(self, n=None):
+        """
+        Resamples the agent's bullies in the model's bully network.
+        Uses bully_count connections if n is None.
+        """
+        if n is None:
+            n = self.bully_count
+        self.num_bullies = self.model.bully_graph.resample(
+            self.social_index, n, rng=self.model.rng)
+
+    @property
+    def friends(self):
+        """
+        Friends of the agent as rows of (unique_id, weight).
+        """
+        return self.model.friend_graph.connections(self.social_index)
+
+    @property
+    def bullies(self):
+        """
+        Bullies of the agent as rows of (unique_id, weight).
+        """
+        return self.model.bully_graph.connections(self.social_index)
+
+    @property
+    def friend_influence(self):
+        """
+        Saturated mean social influence of the agent's friends, kept
+        by the friend network until it changes.
+        """
+        return self.model.friend_graph.influence()[self.social_index]
+
+    @property
+    def bully_influence(self):
+        """
+        Saturated mean social influence of the agent's bullies, kept
+        by the bully network until it changes.
+        """
+        return self.model.bully_graph.influence()[self.social_index]
+
+    def update_agent(self, dt, dW=None):
+        """
+        Updates the agent over timestep dt. dW is the Wiener increment
+        of stress over the step, drawn from the agent's updater if
+        None. Stress is updated with the model's stress scheme, where
+        the exact scheme uses dW/sqrt(dt) as its standard normal draw.
         """
 
+        params = self.parameters.compiled
+
         # Update stress
-        new_S = self.updater.stress(
-            dt=dt,
-            prev_stress=self.stress,
-            prev_E=self.external_strat,
-            mean=self.parameters.stress.mean,
-            sigma=self.parameters.stress.sigma,
-            reversion=self.parameters.stress.reversion,
-            prev_E_weight=self.parameters.stress.E_weight,
-            )
+        mean, sigma, reversion, E_weight = params["stress"]
+        if self.model.stress_scheme == "exact":
+            new_S = self.updater.stress_exact(
+                dt=dt,
+                prev_stress=self.stress,
+                prev_E=self.external_strat,
+                mean=mean,
+                sigma=sigma,
+                reversion=reversion,
+                prev_E_weight=E_weight,
+                Z=None if dW is None else dW / np.sqrt(dt),
+                )
+        else:
+            new_S = self.updater.stress(
+                dt=dt,
+                prev_stress=self.stress,
+                prev_E=self.external_strat,
+                mean=mean,
+                sigma=sigma,
+                reversion=reversion,
+                prev_E_weight=E_weight,
+                dW=dW,
+                )
 
         # Update aversive internal state
-        params = self.parameters.get_A_params(
-            stress=self.stress,
-            suicidal_thought=self.suicidal_thought,
-            escape_behavior=self.escape_behavior,
-            internal_strat=self.internal_strat,
-            friend_influence=self.saturated_mean_social_influence(
-                self.friends),
-            bully_influence=self.saturated_mean_social_influence(
-                self.bullies),
-        )
         new_A = self.updater.rk4_step(
             self.aversive_internal_state,
             self.total_time,
             dt,
             self.updater.aversive_internal_state,
-            params,
+            (
+                self.stress,
+                self.suicidal_thought,
+                self.escape_behavior,
+                self.internal_strat,
+                self.friend_influence,
+                self.bully_influence,
+            ),
+            params["aversion"],
         )
 
         # Update urge to escape
-        params = self.parameters.get_U_params(
-            aversive_internal_state=self.aversive_internal_state,
-        )
         new_U = self.updater.rk4_step(
             self.urge_to_escape,
             self.total_time,
             dt,
             self.updater.urge_to_escape,
-            params,
+            (self.aversive_internal_state,),
+            params["urge_to_escape"],
         )
 
         # Update suicidal thought
-        params = self.parameters.get_T_params(
-            urge_to_escape=self.urge_to_escape,
-        )
         new_T = self.updater.sigmoid(
-            self.suicidal_thought, self.total_time, params
+            self.suicidal_thought,
+            self.total_time,
+            (self.urge_to_escape,),
+            params["suicidal_thought"],
         )
 
         # Update escape behavior
-        params = self.parameters.get_X_params(
-            self.urge_to_escape,
+        new_X = self.updater.sigmoid(
+            self.escape_behavior,
+            self.total_time,
+            (self.urge_to_escape,),
+            params["escape_behavior"],
         )
-        new_X = self.updater.sigmoid(self.escape_behavior, self.total_time, params)
 
         # Update external strategy
-        params = self.parameters.get_E_params(
-            self.aversive_internal_state,
-            self.urge_to_escape
-        )
         new_E = self.updater.rk4_step(
             self.external_strat,
             self.total_time,
             dt,
             self.updater.strategy_for_escape,
-            params,
+            (self.aversive_internal_state, self.urge_to_escape),
+            params["external_strategy"],
         )
 
         # Update internal strategy
-        params = self.parameters.get_I_params(
-            self.aversive_internal_state,
-            self.urge_to_escape
-        )
         new_I = self.updater.rk4_step(
             self.internal_strat,
             self.total_time,
             dt,
             self.updater.strategy_for_escape,
-            params,
+            (self.aversive_internal_state, self.urge_to_escape),
+            params["internal_strategy"],
         )
 
         self.stress = new_S
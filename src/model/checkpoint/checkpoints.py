@@ -0,0 +1,142 @@
+import json
+import os
+from pathlib import Path
+import numpy as np
+from model.system_updates.Population import VARIABLES, PARAMETER_SETS
+from model.system_updates.state_registry import (
+    get_state, STATE_NAMES, STATE_CODES, NO_STATE
+)
+
+# Random draws kept by every agent's StateParameters
+STATE_PARAMETERS = ("commute", "mean_sleep", "sigma_sleep")
+
+def write_checkpoint(path, arrays, meta):
+    """
+    Writes arrays and JSON metadata to a compressed .npz file. The
+    file is written next to its destination first and then moved in
+    place, so an interrupted write never leaves a broken checkpoint.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = path.with_name(path.name + ".partial")
+    with open(partial_path, "wb") as file:
+        np.savez_compressed(file, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(partial_path, path)
+
+def read_checkpoint(path):
+    """
+    Returns the arrays and metadata of a checkpoint file.
+    """
+    with np.load(path) as checkpoint:
+        arrays = {name: checkpoint[name] for name in checkpoint.files}
+    meta = json.loads(str(arrays.pop("meta")))
+    return arrays, meta
+
+def subset(arrays, prefix):
+    """
+    Returns the arrays whose name starts with prefix/, without it.
+    """
+    start = prefix + "/"
+    return {
+        name[len(start):]: values
+        for name, values in arrays.items() if name.startswith(start)
+    }
+
+def prefixed(arrays, prefix):
+    """
+    Returns the arrays with prefix/ added to their names.
+    """
+    return {f"{prefix}/{name}": values for name, values in arrays.items()}
+
+def state_record(state):
+    """
+    Returns the code, times, sleep length and preceding state code of
+    a state, as stored in a checkpoint.
+    """
+    if state is None:
+        return NO_STATE, (np.nan,) * 4, np.nan, NO_STATE
+    previous = getattr(state, "_prev_state", None)
+    return (
+        STATE_CODES[state.to_string()],
+        (state.start_time, state.end_time, state.time_left,
+         state.state_length),
+        getattr(state, "sleep", np.nan),
+        NO_STATE if previous is None else STATE_CODES[previous.to_string()],
+    )
+
+def build_state(code, times, sleep, previous):
+    """
+    Rebuilds a state from its checkpoint record.
+    """
+    if code == NO_STATE:
+        return None
+    state = get_state(STATE_NAMES[code])()
+    state.start_time, state.end_time, state.time_left, state.state_length\
+        = times
+    if not np.isnan(sleep):
+        state.sleep = sleep
+    if previous != NO_STATE:
+        state._prev_state = get_state(STATE_NAMES[previous])()
+    return state
+
+def get_agents_checkpoint(agents):
+    """
+    Returns the arrays holding the variables, compiled parameters,
+    states and state parameter draws of all agents.
+    """
+    arrays = {
+        "variables": np.array([
+            [getattr(agent, name) for name in VARIABLES] for agent in agents
+        ], dtype=float).reshape(len(agents), len(VARIABLES)),
+    }
+    for set_name in PARAMETER_SETS:
+        arrays[f"parameters/{set_name}"] = np.array([
+            agent.parameters.compiled[set_name] for agent in agents
+        ], dtype=float)
+    for name in STATE_PARAMETERS:
+        arrays[name] = np.array(
+            [getattr(agent.state_params, name) for agent in agents],
+            dtype=float)
+    for key, get in (("state", lambda agent: agent.state_manager.state),
+                     ("last_state",
+                      lambda agent: agent.state_manager.state.last_state)):
+        codes, times, sleeps, previous = zip(
+            *[state_record(get(agent)) for agent in agents]) \
+            if agents else ((), (), (), ())
+        arrays[f"{key}/codes"] = np.array(codes, dtype=np.uint8)
+        arrays[f"{key}/times"] = np.array(times, dtype=float).reshape(-1, 4)
+        arrays[f"{key}/sleep"] = np.array(sleeps, dtype=float)
+        arrays[f"{key}/previous"] = np.array(previous, dtype=np.uint8)
+    return arrays
+
+def load_agents_checkpoint(agents, arrays):
+    """
+    Restores all agents from get_agents_checkpoint output.
+    """
+    variables = arrays["variables"].tolist()
+    tables = {
+        set_name: arrays[f"parameters/{set_name}"].tolist()
+        for set_name in PARAMETER_SETS
+    }
+    records = {
+        key: zip(
+            arrays[f"{key}/codes"].tolist(),
+            arrays[f"{key}/times"].tolist(),
+            arrays[f"{key}/sleep"].tolist(),
+            arrays[f"{key}/previous"].tolist(),
+        )
+        for key in ("state", "last_state")
+    }
+    for index, (agent, state, last_state) in enumerate(
+            zip(agents, records["state"], records["last_state"])):
+        for name, value in zip(VARIABLES, variables[index]):
+            setattr(agent, name, value)
+        agent.parameters.compiled = {
+            set_name: getattr(agent.parameters, set_name).Compiled(
+                *tables[set_name][index])
+            for set_name in PARAMETER_SETS
+        }
+        for name in STATE_PARAMETERS:
+            setattr(agent.state_params, name, float(arrays[name][index]))
+        agent.state_manager.state = build_state(*state)
+        agent.state_manager.state.last_state = build_state(*last_state)
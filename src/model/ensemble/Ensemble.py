@@ -0,0 +1,99 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from model.SuicideModel import SuicideModel
+
+
+def run_replicate(seed, days, dt, model_kwargs, summarize=None):
+    """
+    Runs one replicate of the model for a number of days and returns
+    summarize(model), or the agent variable DataFrame if summarize is
+    None.
+    """
+    model = SuicideModel(seed=seed, **model_kwargs)
+    for _ in range(int(days / dt)):
+        model.step(dt)
+    if summarize is None:
+        return model.datacollector.get_agent_vars_dataframe()
+    return summarize(model)
+
+
+class Ensemble():
+    """
+    Runs independent replicates of SuicideModel across a pool of
+    worker processes.
+
+    Every replicate is seeded with its own child of one
+    np.random.SeedSequence, and the model draws all of its randomness
+    from generators spawned from that seed. The results therefore only
+    depend on the ensemble seed and the replicate's position, not on
+    the number of workers or the order in which replicates finish.
+    """
+    def __init__(
+            self,
+            replicates,
+            seed=None,
+            days=1,
+            dt=1/(24*60),
+            model_kwargs=None,
+            summarize=None,
+            workers=None,
+    ):
+        """
+        Parameters
+        ----------
+        replicates: int
+            Number of model runs.
+        seed: int or np.random.SeedSequence
+            Seed of the ensemble. If None, fresh entropy is used,
+            which is kept in self.seed_sequence.entropy.
+        days: float
+            Number of days to model per replicate.
+        dt: float
+            Timestep size.
+        model_kwargs: dict
+            Keyword arguments of SuicideModel, e.g. n, other than seed.
+        summarize: function
+            Takes a finished model and returns the result of the
+            replicate. Must be picklable, i.e. defined at module level.
+            If None, the agent variable DataFrame is returned.
+        workers: int
+            Number of worker processes. If 1, replicates run in the
+            current process. If None, one per CPU.
+        """
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.replicates = replicates
+        self.days = days
+        self.dt = dt
+        self.model_kwargs = {} if model_kwargs is None else dict(model_kwargs)
+        self.summarize = summarize
+        self.workers = workers
+
+    def seeds(self):
+        """
+        Returns the seed of every replicate, in order.
+        """
+        # Spawn from a copy, so every call returns the same children
+        seed_sequence = np.random.SeedSequence(
+            self.seed_sequence.entropy,
+            spawn_key=self.seed_sequence.spawn_key,
+        )
+        return seed_sequence.spawn(self.replicates)
+
+    def run(self):
+        """
+        Runs all replicates and returns their results, in order.
+        """
+        seeds = self.seeds()
+        arguments = (
+            seeds,
+            [self.days] * self.replicates,
+            [self.dt] * self.replicates,
+            [self.model_kwargs] * self.replicates,
+            [self.summarize] * self.replicates,
+        )
+        if self.workers == 1:
+            return list(map(run_replicate, *arguments))
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run_replicate, *arguments))
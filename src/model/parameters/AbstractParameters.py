@@ -5,22 +5,68 @@ from model.parameters.sets.SuicidalParameterSet import SuicidalParameterSet
 from model.parameters.sets.EscapeBehaviorParameterSet import EscapeBehaviorParameterSet
 from model.parameters.sets.ExternalParameterSet import ExternalParameterSet
 from model.parameters.sets.InternalParameterSet import InternalParameterSet
+from model.parameters.ParameterView import ParameterView
 from abc import ABC
 
+# Record class of every parameter set, by parameter set name
+PARAMETER_SET_CLASSES = {
+    "stress": StressParameterSet,
+    "aversion": AversionParameterSet,
+    "urge_to_escape": UrgeToEscapeParameterSet,
+    "suicidal_thought": SuicidalParameterSet,
+    "escape_behavior": EscapeBehaviorParameterSet,
+    "external_strategy": ExternalParameterSet,
+    "internal_strategy": InternalParameterSet,
+}
+
+
+def _view_property(set_name):
+    return property(
+        lambda self: ParameterView(
+            self, set_name, PARAMETER_SET_CLASSES[set_name]),
+        doc=f"Live view of the {set_name} parameters in use.")
+
+
 class Parameters(ABC):
     """
     Abstract class to extend for containing and modifying parameters
     to use in update equations.
+
+    The compiled parameter tuples are the only copy of the parameters.
+    The parameter set attributes, e.g. params.stress, are live views
+    of them, see ParameterView, so they always show the parameters in
+    use, and setting one of their fields, directly or through the
+    set_*_params methods, changes the compiled tuple at once. States
+    swap in precomputed compiled parameters with apply_snapshot.
     """
+    stress = _view_property("stress")
+    aversion = _view_property("aversion")
+    urge_to_escape = _view_property("urge_to_escape")
+    suicidal_thought = _view_property("suicidal_thought")
+    escape_behavior = _view_property("escape_behavior")
+    external_strategy = _view_property("external_strategy")
+    internal_strategy = _view_property("internal_strategy")
+
     def __init__(self):
-        self.stress = StressParameterSet()
-        self.aversion = AversionParameterSet()
-        self.urge_to_escape = UrgeToEscapeParameterSet()
-        self.suicidal_thought = SuicidalParameterSet()
-        self.escape_behavior = EscapeBehaviorParameterSet()
-        self.external_strategy = ExternalParameterSet()
-        self.internal_strategy = InternalParameterSet()
+        # Immutable parameter tuples for the update equations, which
+        # are replaced whenever a parameter changes
+        self.compiled = {
+            set_name: set_class().compile()
+            for set_name, set_class in PARAMETER_SET_CLASSES.items()
+        }
     
+    def apply_snapshot(self, snapshot):
+        """
+        Replaces the compiled parameters with a precomputed snapshot.
+
+        Parameters
+        ----------
+        snapshot: Mapping
+            Compiled parameter tuples by parameter set name, as
+            returned by parameter_snapshots.get_snapshot.
+        """
+        self.compiled = dict(snapshot)
+
     def set_stress_params(
             self,
             mean=None,
@@ -50,9 +96,10 @@ class Parameters(ABC):
             "E_weight": E_weight,
         }
 
+        view = self.stress
         for name, value in params.items():
             if value is not None:
-                setattr(self.stress, name, value)
+                setattr(view, name, value)
     
     def set_aversion_params(
             self,
@@ -105,9 +152,10 @@ class Parameters(ABC):
             "B_weight": B_weight,
         }
 
+        view = self.aversion
         for name, value in params.items():
             if value is not None:
-                setattr(self.aversion, name, value)
+                setattr(view, name, value)
     
     def set_urge_to_escape_params(
             self,
@@ -131,9 +179,10 @@ class Parameters(ABC):
             "A_weight": A_weight,
         }
 
+        view = self.urge_to_escape
         for name, value in params.items():
             if value is not None:
-                setattr(self.urge_to_escape, name, value)
+                setattr(view, name, value)
     
     def set_suicidal_thought_params(
             self,
@@ -163,9 +212,10 @@ class Parameters(ABC):
             "sig_steepness": sig_steepness,
         }
 
+        view = self.suicidal_thought
         for name, value in params.items():
             if value is not None:
-                setattr(self.suicidal_thought, name, value)
+                setattr(view, name, value)
     
     def set_escape_behavior_params(
             self,
@@ -195,9 +245,10 @@ class Parameters(ABC):
             "sig_steepness": sig_steepness,
         }
 
+        view = self.escape_behavior
         for name, value in params.items():
             if value is not None:
-                setattr(self.escape_behavior, name, value)
+                setattr(view, name, value)
     
     def set_external_strategy_params(
             self,
@@ -232,9 +283,10 @@ class Parameters(ABC):
             "U_weight": U_weight,
         }
 
+        view = self.external_strategy
         for name, value in params.items():
             if value is not None:
-                setattr(self.external_strategy, name, value)
+                setattr(view, name, value)
     
     def set_internal_strategy_params(
             self,
@@ -269,111 +321,7 @@ class Parameters(ABC):
             "U_weight": U_weight,
         }
 
+        view = self.internal_strategy
         for name, value in params.items():
             if value is not None:
-                setattr(self.internal_strategy, name, value)
-    
-    def get_A_params(
-            self,
-            stress,
-            suicidal_thought,
-            escape_behavior,
-            internal_strat,
-            friend_influence,
-            bully_influence,
-    ):
-        """
-        Gathers all aversive internal state parameters into
-        a dictionary.
-        """
-        return {
-            "S": stress,
-            "T": suicidal_thought,
-            "X": escape_behavior,
-            "I": internal_strat,
-            "F": friend_influence,
-            "B": bully_influence,
-            "feedback": self.aversion.feedback,
-            "carrying_capacity": self.aversion.carrying_capacity,
-            "S_weight": self.aversion.S_weight,
-            "T_weight": self.aversion.T_weight,
-            "X_weight": self.aversion.X_weight,
-            "I_weight": self.aversion.I_weight,
-            "F_weight": self.aversion.F_weight,
-            "B_weight": self.aversion.B_weight,
-        }
-    
-    def get_U_params(
-            self,
-            aversive_internal_state
-    ):
-        """
-        Gathers all urge to escape parameters into a dictionary.
-        """
-        return {
-            "A": aversive_internal_state,
-            "feedback": self.urge_to_escape.feedback,
-            "A_weight": self.urge_to_escape.A_weight,
-        }
-    
-    def get_T_params(
-            self,
-            urge_to_escape,
-    ):
-        """
-        Gathers all suicidal thought parameters into a dictionary.
-        """
-        return {
-            "U": urge_to_escape,
-            "weight_new": self.suicidal_thought.weight_new,
-            "sig_middle": self.suicidal_thought.sig_middle,
-            "sig_steepness": self.suicidal_thought.sig_steepness,
-        }
-    
-    def get_X_params(
-            self,
-            urge_to_escape,
-    ):
-        """
-        Gathers all escape behavior parameters into a dictionary.
-        """
-        return {
-            "U": urge_to_escape,
-            "weight_new": self.escape_behavior.weight_new,
-            "sig_middle": self.escape_behavior.sig_middle,
-            "sig_steepness": self.escape_behavior.sig_steepness,
-        }
-    
-    def get_E_params(
-            self,
-            aversive_internal_state,
-            urge_to_escape,
-    ):
-        """
-        Gathers all external strategy parameters into a dictionary.
-        """
-        return {
-            "A": aversive_internal_state,
-            "U": urge_to_escape,
-            "feedback": self.external_strategy.feedback,
-            "carrying_capacity": self.external_strategy.carrying_capacity,
-            "A_weight": self.external_strategy.A_weight,
-            "U_weight": self.external_strategy.U_weight,
-        }
-    
-    def get_I_params(
-            self,
-            aversive_internal_state,
-            urge_to_escape,
-    ):
-        """
-        Gathers all internal strategy parameters into a dictionary.
-        """
-        return {
-            "A": aversive_internal_state,
-            "U": urge_to_escape,
-            "feedback": self.internal_strategy.feedback,
-            "carrying_capacity": self.internal_strategy.carrying_capacity,
-            "A_weight": self.internal_strategy.A_weight,
-            "U_weight": self.internal_strategy.U_weight,
-        }
\ No newline at end of file
+                setattr(view, name, value)
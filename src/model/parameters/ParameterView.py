@@ -0,0 +1,52 @@
+class ParameterView():
+    """
+    Live view of one compiled parameter set of a Parameters object,
+    with the fields of its record class. Reading a field returns the
+    compiled value in use, and setting a field replaces the compiled
+    tuple, so a change through the view takes effect at once and is
+    never overwritten by a stale record.
+    """
+    def __init__(self, params, set_name, set_class):
+        """
+        Parameters
+        ----------
+        params: Parameters
+            Parameters object holding the compiled parameters.
+        set_name: str
+            Name of the parameter set in params.compiled.
+        set_class: type
+            Record class of the parameter set, e.g. StressParameterSet.
+        """
+        object.__setattr__(self, "_params", params)
+        object.__setattr__(self, "_set_name", set_name)
+        object.__setattr__(self, "_set_class", set_class)
+
+    @property
+    def FIELDS(self):
+        return self._set_class.FIELDS
+
+    @property
+    def Compiled(self):
+        return self._set_class.Compiled
+
+    def compile(self):
+        """
+        Returns the compiled parameters in use.
+        """
+        return self._params.compiled[self._set_name]
+
+    def __getattr__(self, name):
+        if name in self._set_class.FIELDS:
+            return getattr(self.compile(), name)
+        raise AttributeError(
+            f"{self._set_class.__name__} has no parameter {name}")
+
+    def __setattr__(self, name, value):
+        if name not in self._set_class.FIELDS:
+            raise AttributeError(
+                f"{self._set_class.__name__} has no parameter {name}")
+        self._params.compiled[self._set_name] = \
+            self.compile()._replace(**{name: value})
+
+    def __repr__(self):
+        return repr(self.compile())
@@ -0,0 +1,49 @@
+from functools import partialmethod
+
+# Parameters subclasses with overridden defaults per
+# (Parameters class, overrides)
+OVERRIDDEN_CLASSES = {}
+
+def freeze_overrides(overrides):
+    """
+    Returns a hashable version of a {set name: {field: value}} dict.
+    """
+    return tuple(sorted(
+        (set_name, tuple(sorted(fields.items())))
+        for set_name, fields in overrides.items()
+    ))
+
+def with_defaults(params_class, overrides):
+    """
+    Returns a subclass of a Parameters class whose set_*_params methods
+    default to the given values, so that the overrides survive every
+    reset to the defaults by a state. Fields that are not overridden
+    keep the defaults of params_class. Subclasses are built once per
+    set of overrides, so they share parameter snapshots.
+
+    Parameters
+    ----------
+    params_class: type
+        Parameters class to override, e.g. DefaultParameters.
+    overrides: dict
+        New default values by parameter set name and field, e.g.
+        {"aversion": {"feedback": 4, "S_weight": 2}}.
+    """
+    key = (params_class, freeze_overrides(overrides))
+    if key not in OVERRIDDEN_CLASSES:
+        defaults = params_class()
+        methods = {}
+        for set_name, fields in overrides.items():
+            method_name = f"set_{set_name}_params"
+            if not hasattr(params_class, method_name):
+                raise ValueError(f"Unknown parameter set {set_name}")
+            for field in fields:
+                if field not in getattr(defaults, set_name).FIELDS:
+                    raise ValueError(
+                        f"Unknown field {field} of parameter set {set_name}")
+            methods[method_name] = partialmethod(
+                getattr(params_class, method_name), **fields)
+        methods["__module__"] = __name__
+        OVERRIDDEN_CLASSES[key] = type(
+            params_class.__name__, (params_class,), methods)
+    return OVERRIDDEN_CLASSES[key]
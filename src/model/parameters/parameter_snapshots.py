@@ -0,0 +1,26 @@
+from types import MappingProxyType
+
+# Compiled parameters per (Parameters class, state name)
+SNAPSHOTS = {}
+
+def get_default_snapshot(params_class):
+    """
+    Returns the compiled default parameters of a Parameters class.
+    """
+    key = (params_class, None)
+    if key not in SNAPSHOTS:
+        SNAPSHOTS[key] = MappingProxyType(dict(params_class().compiled))
+    return SNAPSHOTS[key]
+
+def get_snapshot(params_class, state):
+    """
+    Returns the compiled parameters of a Parameters class after the
+    given state's modify_parameters has been applied to its defaults.
+    Snapshots are built once and shared by all agents of the class.
+    """
+    key = (params_class, state.to_string())
+    if key not in SNAPSHOTS:
+        params = params_class()
+        state.modify_parameters(params)
+        SNAPSHOTS[key] = MappingProxyType(dict(params.compiled))
+    return SNAPSHOTS[key]
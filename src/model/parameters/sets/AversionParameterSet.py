@@ -1,7 +1,22 @@
+from collections import namedtuple
+
+
 class AversionParameterSet():
     """
     Record class for aversive internal state (A) parameters
     """
+    FIELDS = (
+        "feedback",
+        "carrying_capacity",
+        "S_weight",
+        "T_weight",
+        "X_weight",
+        "I_weight",
+        "F_weight",
+        "B_weight",
+    )
+    Compiled = namedtuple("AversionParameters", FIELDS)
+
     def __init__(
             self,
             feedback=0,
@@ -48,4 +63,20 @@ class AversionParameterSet():
         self.X_weight = X_weight
         self.I_weight = I_weight
         self.F_weight = F_weight
-        self.B_weight = B_weight
\ No newline at end of file
+        self.B_weight = B_weight
+
+    def compile(self):
+        """
+        Returns the parameters as an immutable named tuple with a
+        fixed field order, for use in the update equations.
+        """
+        return self.Compiled(
+            self.feedback,
+            self.carrying_capacity,
+            self.S_weight,
+            self.T_weight,
+            self.X_weight,
+            self.I_weight,
+            self.F_weight,
+            self.B_weight,
+        )
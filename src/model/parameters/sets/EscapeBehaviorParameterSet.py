@@ -1,7 +1,17 @@
+from collections import namedtuple
+
+
 class EscapeBehaviorParameterSet():
     """
     Record class for escape behavior (X) parameters
     """
+    FIELDS = (
+        "weight_new",
+        "sig_middle",
+        "sig_steepness",
+    )
+    Compiled = namedtuple("EscapeBehaviorParameters", FIELDS)
+
     def __init__(
             self,
             weight_new=0,
@@ -27,3 +37,14 @@ class EscapeBehaviorParameterSet():
         self.weight_new = weight_new
         self.sig_middle = sig_middle
         self.sig_steepness = sig_steepness
+
+    def compile(self):
+        """
+        Returns the parameters as an immutable named tuple with a
+        fixed field order, for use in the update equations.
+        """
+        return self.Compiled(
+            self.weight_new,
+            self.sig_middle,
+            self.sig_steepness,
+        )
@@ -1,7 +1,18 @@
+from collections import namedtuple
+
+
 class InternalParameterSet():
     """
     Record class for internal escape strategy (I) parameters
     """
+    FIELDS = (
+        "feedback",
+        "carrying_capacity",
+        "A_weight",
+        "U_weight",
+    )
+    Compiled = namedtuple("InternalParameters", FIELDS)
+
     def __init__(
             self,
             feedback=0,
@@ -31,4 +42,16 @@ class InternalParameterSet():
         self.feedback = feedback
         self.carrying_capacity = carrying_capacity
         self.A_weight = A_weight
-        self.U_weight = U_weight
\ No newline at end of file
+        self.U_weight = U_weight
+
+    def compile(self):
+        """
+        Returns the parameters as an immutable named tuple with a
+        fixed field order, for use in the update equations.
+        """
+        return self.Compiled(
+            self.feedback,
+            self.carrying_capacity,
+            self.A_weight,
+            self.U_weight,
+        )
@@ -1,7 +1,18 @@
+from collections import namedtuple
+
+
 class StressParameterSet():
     """
     Record class for stress (S) parameters
     """
+    FIELDS = (
+        "mean",
+        "sigma",
+        "reversion",
+        "E_weight",
+    )
+    Compiled = namedtuple("StressParameters", FIELDS)
+
     def __init__(
             self,
             mean=0,
@@ -28,4 +39,16 @@ class StressParameterSet():
         self.mean = mean
         self.sigma = sigma
         self.reversion = reversion
-        self.E_weight = E_weight
\ No newline at end of file
+        self.E_weight = E_weight
+
+    def compile(self):
+        """
+        Returns the parameters as an immutable named tuple with a
+        fixed field order, for use in the update equations.
+        """
+        return self.Compiled(
+            self.mean,
+            self.sigma,
+            self.reversion,
+            self.E_weight,
+        )
@@ -1,7 +1,17 @@
+from collections import namedtuple
+
+
 class SuicidalParameterSet():
     """
     Record class for suicidal thought (T) parameters
     """
+    FIELDS = (
+        "weight_new",
+        "sig_middle",
+        "sig_steepness",
+    )
+    Compiled = namedtuple("SuicidalParameters", FIELDS)
+
     def __init__(
             self,
             weight_new=0,
@@ -26,4 +36,15 @@ class SuicidalParameterSet():
         """
         self.weight_new = weight_new
         self.sig_middle = sig_middle
-        self.sig_steepness = sig_steepness
\ No newline at end of file
+        self.sig_steepness = sig_steepness
+
+    def compile(self):
+        """
+        Returns the parameters as an immutable named tuple with a
+        fixed field order, for use in the update equations.
+        """
+        return self.Compiled(
+            self.weight_new,
+            self.sig_middle,
+            self.sig_steepness,
+        )
@@ -1,7 +1,16 @@
+from collections import namedtuple
+
+
 class UrgeToEscapeParameterSet():
     """
     Record class for urge to escape (U) parameters
     """
+    FIELDS = (
+        "feedback",
+        "A_weight",
+    )
+    Compiled = namedtuple("UrgeToEscapeParameters", FIELDS)
+
     def __init__(
             self,
             feedback=0,
@@ -20,4 +29,14 @@ class UrgeToEscapeParameterSet():
             timestep on urge to escape
         """
         self.feedback = feedback
-        self.A_weight = A_weight
\ No newline at end of file
+        self.A_weight = A_weight
+
+    def compile(self):
+        """
+        Returns the parameters as an immutable named tuple with a
+        fixed field order, for use in the update equations.
+        """
+        return self.Compiled(
+            self.feedback,
+            self.A_weight,
+        )
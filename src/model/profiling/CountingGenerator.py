@@ -0,0 +1,41 @@
+from collections import Counter
+import numpy as np
+
+
+class CountingGenerator():
+    """
+    Wraps a np.random.Generator and counts the values drawn from it,
+    per distribution method. Draws are passed through unchanged, so a
+    model using the wrapper draws exactly what it would draw from the
+    wrapped generator.
+    """
+    def __init__(self, generator):
+        """
+        Parameters
+        ----------
+        generator: np.random.Generator
+            Generator to draw from.
+        """
+        self.generator = generator
+        self.draws = Counter()
+
+    def __getattr__(self, name):
+        attribute = getattr(self.generator, name)
+        if not callable(attribute) or name == "spawn":
+            return attribute
+        draws = self.draws
+
+        def counted(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            draws[name] += np.size(result)
+            return result
+        return counted
+
+    def total(self):
+        """
+        Returns the number of values drawn by all methods.
+        """
+        return sum(self.draws.values())
+
+    def reset(self):
+        self.draws.clear()
@@ -0,0 +1,207 @@
+import json
+import time
+from pathlib import Path
+from model.profiling.CountingGenerator import CountingGenerator
+
+# Phases of a model step, in report order. The agent updates are the
+# time of the step not spent in any other phase.
+PHASES = ("collect", "statistics", "updates", "transitions", "checkpoint")
+
+
+class StepProfiler():
+    """
+    Measures how the wall time of SuicideModel.step splits over its
+    phases, and counts the state transitions and random draws per
+    step. Noise that draws ahead in blocks, like WienerNoise, counts
+    the draws it hands out; the draws of its block refills are only
+    reported separately as prefetched.
+
+    The profiler replaces the methods it times on the instances of
+    one model with timed wrappers, so a model that is not profiled
+    runs its methods unchanged and pays nothing:
+    - collect: the trajectory recorder's collect;
+    - statistics: the online statistics' collect, if any;
+    - transitions: every StateManager.update_state of the per-agent
+      path, or every Population.transition_agent of the vectorized
+      path;
+    - checkpoint: save_checkpoint;
+    - updates: the rest of the step, i.e. the agent variable updates.
+    """
+    def __init__(self, sampler=None):
+        """
+        Parameters
+        ----------
+        sampler: object
+            Sampling profiler with start() and stop() methods, e.g. a
+            StackSampler, which runs from the first profiled step
+            until stop(). Its report() is added to the report if it
+            has one.
+        """
+        self.sampler = sampler
+        self.generators = {}
+        self.prefetched = {}
+        self.agents = 0
+        self.steps = 0
+        self.step_seconds = 0.0
+        self.transitions = 0
+        self.max_transitions = 0
+        self._phases = {phase: [0.0, 0] for phase in PHASES}
+        self._started = False
+
+    def count_draws(self, generator, name):
+        """
+        Returns generator wrapped in a CountingGenerator, whose draws
+        are reported under name.
+        """
+        generator = CountingGenerator(generator)
+        self.generators[name] = generator
+        return generator
+
+    def count_noise(self, noise, name):
+        """
+        Counts the standard normal draws noise hands out under name,
+        and the draws of its generator, if any, as prefetched.
+        """
+        # A CountingGenerator of the noise counts the values returned
+        # by its bound standard_normal, which every increment uses
+        counter = CountingGenerator(noise)
+        noise.standard_normal = counter.standard_normal
+        self.generators[name] = counter
+        if hasattr(noise, "rng"):
+            noise.rng = CountingGenerator(noise.rng)
+            self.prefetched[name] = noise.rng
+
+    def _timed(self, function, phase, count_transitions=False):
+        """
+        Returns function wrapped to add its wall time and calls to a
+        phase. With count_transitions, every call also counts as one
+        transition, unless it returns False.
+        """
+        totals = self._phases[phase]
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            totals[0] += clock() - start
+            totals[1] += 1
+            if count_transitions and result is not False:
+                self.transitions += 1
+            return result
+        return timed
+
+    def attach(self, model):
+        """
+        Instruments a fully built model.
+        """
+        self.agents = len(model.agents)
+        model.datacollector.collect = self._timed(
+            model.datacollector.collect, "collect")
+        if model.statistics is not None:
+            model.statistics.collect = self._timed(
+                model.statistics.collect, "statistics")
+        model.save_checkpoint = self._timed(
+            model.save_checkpoint, "checkpoint")
+        population = model.population
+        if population is None:
+            for agent in model.agents:
+                manager = agent.state_manager
+                manager.update_state = self._timed(
+                    manager.update_state, "transitions",
+                    count_transitions=True)
+        else:
+            population.transition_agent = self._timed(
+                population.transition_agent, "transitions",
+                count_transitions=True)
+        noise = model.noise if population is None else population.noise
+        if noise is not None and hasattr(noise, "standard_normal"):
+            self.count_noise(noise, "noise")
+        # mesa calls the model's step through _user_step
+        model._user_step = self._profiled_step(model._user_step)
+
+    def _profiled_step(self, step):
+        clock = time.perf_counter
+
+        def profiled_step(*args, **kwargs):
+            if not self._started:
+                self._start()
+            transitions = self.transitions
+            start = clock()
+            step(*args, **kwargs)
+            self.step_seconds += clock() - start
+            self.steps += 1
+            self.max_transitions = max(
+                self.max_transitions, self.transitions - transitions)
+        return profiled_step
+
+    def _start(self):
+        # Only count draws made while stepping, not while building
+        for generator in (*self.generators.values(),
+                          *self.prefetched.values()):
+            generator.reset()
+        if self.sampler is not None:
+            self.sampler.start()
+        self._started = True
+
+    def stop(self):
+        """
+        Stops the sampler, if any.
+        """
+        if self.sampler is not None and self._started:
+            self.sampler.stop()
+
+    def report(self):
+        """
+        Returns the measurements of all profiled steps as a
+        JSON-serializable dict.
+        """
+        seconds = {phase: totals[0] for phase, totals in self._phases.items()}
+        seconds["updates"] = max(0.0, self.step_seconds - sum(
+            seconds[phase] for phase in PHASES if phase != "updates"))
+        calls = {phase: totals[1] for phase, totals in self._phases.items()}
+        calls["updates"] = self.steps
+        steps = max(1, self.steps)
+        draws = {name: dict(generator.draws)
+                 for name, generator in self.generators.items()}
+        total_draws = sum(generator.total()
+                          for generator in self.generators.values())
+        report = {
+            "agents": self.agents,
+            "steps": self.steps,
+            "step_seconds": self.step_seconds,
+            "agent_steps_per_second": self.agents * self.steps
+            / self.step_seconds if self.step_seconds > 0 else None,
+            "phases": {
+                phase: {
+                    "seconds": seconds[phase],
+                    "calls": calls[phase],
+                    "fraction": seconds[phase] / self.step_seconds
+                    if self.step_seconds > 0 else None,
+                }
+                for phase in PHASES
+            },
+            "counters": {
+                "transitions": self.transitions,
+                "transitions_per_step": self.transitions / steps,
+                "max_transitions_per_step": self.max_transitions,
+                "rng_draws": draws,
+                "rng_draws_per_step": total_draws / steps,
+                "rng_prefetched_draws": {
+                    name: dict(generator.draws)
+                    for name, generator in self.prefetched.items()
+                },
+            },
+        }
+        if self.sampler is not None and hasattr(self.sampler, "report"):
+            self.stop()
+            report["sampler"] = self.sampler.report()
+        return report
+
+    def write(self, path):
+        """
+        Writes the report to a JSON file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
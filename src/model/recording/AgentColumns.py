@@ -0,0 +1,176 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from model.recording.TrajectoryRecorder import (
+    VARIABLE_COLUMNS, STATE_COLUMN, TYPE_NAMES
+)
+from model.system_updates.state_registry import STATE_NAMES, NO_STATE
+
+# File names of the stored columns, by column name
+COLUMN_FILES = {**VARIABLE_COLUMNS, "Time": "time", STATE_COLUMN: "state"}
+
+# Metadata file of a stored directory
+META_FILE = "meta.json"
+
+
+def codes(names, categories):
+    """
+    Returns the small-int codes of names in categories, with NO_STATE
+    for missing names.
+    """
+    values = pd.Categorical(names, categories=categories).codes
+    return np.where(values < 0, NO_STATE, values).astype(np.uint8)
+
+
+class AgentColumns():
+    """
+    Agent variables stored as one .npy file per column in a directory,
+    with the rows sorted by agent and then by step, and the offset of
+    every agent's first row in an index. The columns are opened as
+    memory maps, so one agent's series is a slice that reads only its
+    own rows from disk.
+
+    Directory layout:
+    - meta.json: names of the stored columns;
+    - agents.npy, types.npy, offsets.npy: agent IDs, type codes and
+      row offsets, with offsets[i]:offsets[i + 1] the rows of agent i;
+    - steps.npy and one <file>.npy per column, see COLUMN_FILES.
+    """
+    def __init__(self, directory):
+        """
+        Parameters
+        ----------
+        directory: str or Path
+            Directory written by AgentColumns.write.
+        """
+        self.directory = Path(directory)
+        with open(self.directory / META_FILE) as file:
+            self.columns = json.load(file)["columns"]
+        self.agent_ids = np.load(self.directory / "agents.npy")
+        self.types = np.load(self.directory / "types.npy")
+        self.offsets = np.load(self.directory / "offsets.npy")
+        self.steps = np.load(self.directory / "steps.npy", mmap_mode="r")
+        self.values = {
+            column: np.load(self.directory / f"{COLUMN_FILES[column]}.npy",
+                            mmap_mode="r")
+            for column in self.columns
+        }
+        self._positions = {
+            agent_id: position
+            for position, agent_id in enumerate(self.agent_ids.tolist())
+        }
+
+    @classmethod
+    def write(cls, agent_df, directory):
+        """
+        Writes a DataFrame of agent variables indexed by step and agent
+        ID, as returned by TrajectoryRecorder.get_agent_vars_dataframe,
+        and returns it opened as AgentColumns.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        # Removed before any column is overwritten, so an interrupted
+        # write over an earlier one cannot be opened either
+        (directory / META_FILE).unlink(missing_ok=True)
+        agent_df = agent_df.sort_index(level=["AgentID", "Step"])
+        ids = agent_df.index.get_level_values("AgentID").to_numpy()
+        starts = np.concatenate(
+            ([0], np.flatnonzero(ids[1:] != ids[:-1]) + 1)).astype(np.int64)
+
+        np.save(directory / "agents.npy", ids[starts].astype(np.int64))
+        np.save(directory / "types.npy", codes(
+            agent_df["Type"].to_numpy()[starts], TYPE_NAMES))
+        np.save(directory / "offsets.npy", np.append(starts, len(ids)))
+        np.save(directory / "steps.npy", agent_df.index.get_level_values(
+            "Step").to_numpy().astype(np.int64))
+
+        columns = [column for column in COLUMN_FILES if column in agent_df]
+        for column in columns:
+            if column == STATE_COLUMN:
+                values = codes(agent_df[column].to_numpy(), STATE_NAMES)
+            else:
+                values = agent_df[column].to_numpy(dtype=float)
+            np.save(directory / f"{COLUMN_FILES[column]}.npy", values)
+        # Written last, so only a complete write can be opened
+        with open(directory / META_FILE, "w") as file:
+            json.dump({"columns": columns}, file)
+        return cls(directory)
+
+    def __len__(self):
+        return len(self.agent_ids)
+
+    def _as_column(self, column, values):
+        """
+        Returns stored values as read into memory, with states as names
+        and NaN where missing.
+        """
+        if column == STATE_COLUMN:
+            names = np.array(STATE_NAMES + (np.nan,), dtype=object)
+            return names[np.minimum(values, len(STATE_NAMES))]
+        return np.asarray(values)
+
+    def rows(self, agent_id):
+        """
+        Returns the slice of the rows of an agent.
+        """
+        position = self._positions[agent_id]
+        return slice(self.offsets[position], self.offsets[position + 1])
+
+    def agent_type(self, agent_id):
+        return TYPE_NAMES[self.types[self._positions[agent_id]]]
+
+    def arrays(self, agent_id):
+        """
+        Returns the Time, variable and State columns of an agent as
+        arrays, as taken by plotting.trajectories.plot_agent.
+        """
+        rows = self.rows(agent_id)
+        arrays = {}
+        for column in self.columns:
+            values = self.values[column][rows]
+            arrays[column] = self._as_column(column, values)
+        return arrays
+
+    def iter_agents(self, agent_ids=None):
+        """
+        Yields the agent ID, type and arrays of the given agents, or of
+        all agents if None.
+        """
+        if agent_ids is None:
+            agent_ids = self.agent_ids.tolist()
+        for agent_id in agent_ids:
+            yield agent_id, self.agent_type(agent_id), self.arrays(agent_id)
+
+    def first_of_types(self):
+        """
+        Returns the ID of the first agent of every stored type.
+        """
+        _, first = np.unique(self.types, return_index=True)
+        return self.agent_ids[np.sort(first)].tolist()
+
+    def agent_frame(self, agent_id):
+        """
+        Returns the variables of one agent as a DataFrame indexed by
+        step.
+        """
+        rows = self.rows(agent_id)
+        frame = {"Type": self.agent_type(agent_id)}
+        frame.update(self.arrays(agent_id))
+        return pd.DataFrame(
+            frame, index=pd.Index(self.steps[rows], name="Step"))
+
+    def to_dataframe(self):
+        """
+        Returns all agents as a DataFrame indexed by step and agent ID,
+        like the one that was written.
+        """
+        counts = np.diff(self.offsets)
+        index = pd.MultiIndex.from_arrays(
+            [np.asarray(self.steps), np.repeat(self.agent_ids, counts)],
+            names=["Step", "AgentID"],
+        )
+        frame = {"Type": np.array(TYPE_NAMES)[np.repeat(self.types, counts)]}
+        for column in self.columns:
+            frame[column] = self._as_column(column, self.values[column])
+        return pd.DataFrame(frame, index=index).sort_index()
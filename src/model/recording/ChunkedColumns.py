@@ -0,0 +1,191 @@
+from pathlib import Path
+import numpy as np
+
+# Largest size of the preallocated rows of one ChunkedColumns
+CHUNK_BYTES = 2**26
+
+
+class ChunkedColumns():
+    """
+    Set of named columns that are filled row by row into preallocated
+    arrays of at most chunk_bytes. The arrays start with initial_rows
+    rows and double whenever they fill up, until they hold a whole
+    chunk, so rarely used columns do not preallocate full chunks.
+    Full chunks of rows are flushed to
+    disk as .npz files, so memory stays fixed however many rows are
+    added. Without a directory, flushed chunks are kept in memory as
+    compact arrays instead, and memory grows with every row.
+    """
+    def __init__(self, layout, chunk_rows, directory=None, prefix="chunk",
+                 chunk_bytes=CHUNK_BYTES, initial_rows=None):
+        """
+        Parameters
+        ----------
+        layout: dict
+            Maps each column name to a (dtype, shape) pair, where shape
+            is the shape of one row of the column.
+        chunk_rows: int
+            Largest number of rows per chunk.
+        directory: str or Path
+            Directory to flush full chunks to. If None, flushed chunks
+            are kept in memory, without bound.
+        prefix: str
+            Start of the file names of the flushed chunks.
+        chunk_bytes: int
+            Largest size of a chunk in bytes. Chunks hold fewer than
+            chunk_rows rows if these would not fit, but at least one.
+        initial_rows: int
+            Number of rows to preallocate at first. If None, a whole
+            chunk is preallocated.
+        """
+        self.layout = layout
+        row_bytes = sum(
+            np.dtype(dtype).itemsize * int(np.prod(shape))
+            for dtype, shape in layout.values())
+        self.chunk_rows = max(1, min(
+            chunk_rows, chunk_bytes // max(1, row_bytes)))
+        if initial_rows is None:
+            initial_rows = self.chunk_rows
+        initial_rows = max(1, min(initial_rows, self.chunk_rows))
+        self.directory = None if directory is None else Path(directory)
+        self.prefix = prefix
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._columns = {
+            name: np.empty((initial_rows, *shape), dtype=dtype)
+            for name, (dtype, shape) in layout.items()
+        }
+        self._rows = 0
+        self._chunks = []
+        self._chunk_count = 0
+
+    def _capacity(self):
+        return len(next(iter(self._columns.values())))
+
+    def _grow(self, rows):
+        """
+        Makes room for at least rows rows, doubling the preallocated
+        arrays up to a whole chunk.
+        """
+        capacity = self._capacity()
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        capacity = min(capacity, self.chunk_rows)
+        for name, column in self._columns.items():
+            grown = np.empty((capacity, *column.shape[1:]), dtype=column.dtype)
+            grown[:self._rows] = column[:self._rows]
+            self._columns[name] = grown
+
+    def _make_room(self, rows):
+        """
+        Flushes or grows the preallocated arrays if they are full.
+        Returns how many of rows fit.
+        """
+        if self._rows == self.chunk_rows:
+            self.flush()
+        self._grow(min(self._rows + rows, self.chunk_rows))
+        return min(rows, self._capacity() - self._rows)
+
+    def append(self, **values):
+        """
+        Adds one row, with a value for every column.
+        """
+        self._make_room(1)
+        row = self._rows
+        for name, column in self._columns.items():
+            column[row] = values[name]
+        self._rows += 1
+
+    def extend(self, count, **values):
+        """
+        Adds count rows at once, with an array of count values for
+        every column.
+        """
+        start = 0
+        while start < count:
+            stop = start + self._make_room(count - start)
+            rows = slice(self._rows, self._rows + stop - start)
+            for name, column in self._columns.items():
+                column[rows] = values[name][start:stop]
+            self._rows += stop - start
+            start = stop
+
+    def _chunk_path(self, count):
+        return self.directory / f"{self.prefix}_{count:05d}.npz"
+
+    def _current_chunk(self):
+        return {
+            name: column[:self._rows].copy()
+            for name, column in self._columns.items()
+        }
+
+    def flush(self):
+        """
+        Moves the filled rows out of the preallocated arrays, to disk
+        if a directory was given.
+        """
+        if self._rows == 0:
+            return
+        chunk = self._current_chunk()
+        if self.directory is None:
+            self._chunks.append(chunk)
+        else:
+            np.savez(self._chunk_path(self._chunk_count), **chunk)
+        self._chunk_count += 1
+        self._rows = 0
+
+    def chunks(self):
+        """
+        Yields all chunks in order, including the rows that have not
+        been flushed yet.
+        """
+        if self.directory is None:
+            yield from self._chunks
+        else:
+            for count in range(self._chunk_count):
+                with np.load(self._chunk_path(count)) as chunk:
+                    yield dict(chunk)
+        if self._rows > 0:
+            yield self._current_chunk()
+
+    def concatenate(self):
+        """
+        Returns every column with all of its rows as one array.
+        """
+        chunks = list(self.chunks())
+        return {
+            name: np.concatenate([chunk[name] for chunk in chunks])
+            if chunks else np.empty((0, *shape), dtype=dtype)
+            for name, (dtype, shape) in self.layout.items()
+        }
+
+    def get_checkpoint(self):
+        """
+        Returns the arrays and metadata needed to continue adding rows.
+        Without a directory this holds every row so far, otherwise
+        only the rows that have not been flushed to disk.
+        """
+        if self.directory is None:
+            return self.concatenate(), {"chunk_count": 0}
+        return self._current_chunk(), {"chunk_count": self._chunk_count}
+
+    def load_checkpoint(self, arrays, meta):
+        """
+        Restores the columns from get_checkpoint output.
+        """
+        self._chunk_count = meta["chunk_count"]
+        self._chunks = []
+        self._rows = 0
+        if self.directory is None:
+            if len(arrays[next(iter(self.layout))]) > 0:
+                self._chunks = [dict(arrays)]
+                self._chunk_count = 1
+            return
+        rows = len(arrays[next(iter(self.layout))])
+        self._grow(rows)
+        for name, column in self._columns.items():
+            column[:rows] = arrays[name]
+        self._rows = rows
+
@@ -0,0 +1,352 @@
+import numpy as np
+import pandas as pd
+from model.recording.TrajectoryRecorder import (
+    VARIABLE_COLUMNS, CADENCE_INTERVALS, TYPE_NAMES, TYPE_CODES,
+)
+
+# Columns summarized by default
+STATISTICS_COLUMNS = (
+    "Aversive Internal State",
+    "Urge to Escape",
+    "Suicidal Thought",
+)
+# Quantiles estimated by default
+STATISTICS_QUANTILES = (0.05, 0.5, 0.95)
+# Thresholds whose exceedance is counted by default, by column
+STATISTICS_THRESHOLDS = {"Suicidal Thought": (0.5,)}
+
+
+class OnlineStatistics():
+    """
+    Streaming summary of agent variables per agent type and time bin,
+    updated in place from the current values of all agents, so runs
+    can be analysed without recording their trajectories. Memory
+    grows with the number of types and time bins, not with the
+    number of agents or steps.
+
+    For every column, type and bin it keeps:
+    - the count, mean and sum of squared deviations of the values,
+      merged batch by batch with the parallel form of Welford's
+      algorithm, and their minimum and maximum;
+    - a histogram over a fixed range, with one extra bin below and
+      above it, from which quantiles are interpolated to within one
+      histogram bin;
+    - the number of values above every threshold of the column.
+    Every agent contributes one value per update, so a fraction above
+    a threshold is the share of agent-updates in the bin.
+
+    Summaries of disjoint agents or runs with the same settings, e.g.
+    of the shards of a ShardedSimulation, combine exactly with merge.
+    """
+    def __init__(
+            self,
+            agents,
+            columns=STATISTICS_COLUMNS,
+            interval="hourly",
+            cadence=1,
+            quantiles=STATISTICS_QUANTILES,
+            thresholds=None,
+            histogram_bins=100,
+            histogram_range=(0, 1),
+    ):
+        """
+        Parameters
+        ----------
+        agents: iterable of StandardAgent
+            Agents to summarize, in the model's update order.
+        columns: sequence of str
+            Summarized columns, as in VARIABLE_COLUMNS.
+        interval: str or float
+            Length of a time bin in model time, or "hourly" or
+            "daily".
+        cadence: int
+            Number of steps between updates.
+        quantiles: sequence of float
+            Quantiles reported by to_dataframe.
+        thresholds: dict
+            Thresholds by column whose exceedance is counted. Defaults
+            to STATISTICS_THRESHOLDS, for the summarized columns.
+        histogram_bins: int
+            Number of histogram bins within histogram_range.
+        histogram_range: tuple
+            Lowest and highest value of the histograms.
+        """
+        for column in columns:
+            if column not in VARIABLE_COLUMNS:
+                raise ValueError(f"Unknown summarized column {column}")
+        if thresholds is None:
+            thresholds = {column: values
+                          for column, values in STATISTICS_THRESHOLDS.items()
+                          if column in columns}
+        for column in thresholds:
+            if column not in columns:
+                raise ValueError(f"Threshold of unsummarized column {column}")
+        if isinstance(interval, str) and interval not in CADENCE_INTERVALS:
+            raise ValueError(f"Unknown interval {interval}")
+        if not isinstance(cadence, int) or cadence < 1:
+            raise ValueError(f"Unknown cadence {cadence}")
+        self.columns = tuple(columns)
+        self.interval = interval
+        self.bin_length = CADENCE_INTERVALS.get(interval, interval)
+        self.cadence = cadence
+        self.quantiles = tuple(quantiles)
+        self.thresholds = [(column, threshold)
+                           for column, values in thresholds.items()
+                           for threshold in values]
+        self.histogram_bins = histogram_bins
+        self.histogram_range = tuple(histogram_range)
+        self.edges = np.linspace(*histogram_range, histogram_bins + 1)
+
+        self.agents = list(agents)
+        self.types = np.array(
+            [TYPE_CODES[agent.type] for agent in self.agents], dtype=np.intp)
+        # Indices of the agents of every type that has any
+        self.groups = [(code, np.flatnonzero(self.types == code))
+                       for code in range(len(TYPE_NAMES))]
+        self.groups = [(code, group) for code, group in self.groups
+                       if len(group) > 0]
+        self._collects = 0
+        # Number of time bins in use, and the preallocated arrays,
+        # which grow by doubling along the bin axis
+        self.bins = 0
+        self.arrays = self._allocate(1)
+
+    def _allocate(self, capacity):
+        types = len(TYPE_NAMES)
+        columns = len(self.columns)
+        return {
+            "count": np.zeros((capacity, types), dtype=np.int64),
+            "mean": np.zeros((capacity, types, columns)),
+            "m2": np.zeros((capacity, types, columns)),
+            "min": np.full((capacity, types, columns), np.inf),
+            "max": np.full((capacity, types, columns), -np.inf),
+            "histogram": np.zeros(
+                (capacity, types, columns, self.histogram_bins + 2),
+                dtype=np.int64),
+            "exceedances": np.zeros(
+                (capacity, types, len(self.thresholds)), dtype=np.int64),
+        }
+
+    def _reserve(self, bins):
+        """
+        Makes room for the given number of time bins.
+        """
+        capacity = len(self.arrays["count"])
+        if bins > capacity:
+            arrays = self._allocate(max(bins, 2 * capacity))
+            for name, values in self.arrays.items():
+                arrays[name][:self.bins] = values[:self.bins]
+            self.arrays = arrays
+        self.bins = max(self.bins, bins)
+
+    def _values(self, model, column):
+        name = VARIABLE_COLUMNS[column]
+        if model.population is not None:
+            return getattr(model.population, name)
+        return np.array([getattr(agent, name) for agent in self.agents])
+
+    def collect(self, model):
+        """
+        Adds the current values of all agents to the bin of the
+        model's current time, if an update is due.
+        """
+        due = self._collects % self.cadence == 0
+        self._collects += 1
+        if not due or len(self.agents) == 0:
+            return
+        # Small offset so rounding in the summed timesteps does not
+        # push a whole bin into the previous one
+        time_bin = int(np.floor(model.time / self.bin_length + 1e-9))
+        self._reserve(time_bin + 1)
+        arrays = self.arrays
+        types = self.types
+        type_count = len(TYPE_NAMES)
+        counts = np.bincount(types, minlength=type_count)
+        present = counts > 0
+        old_counts = arrays["count"][time_bin]
+        new_counts = old_counts + counts
+
+        for index, column in enumerate(self.columns):
+            values = np.asarray(self._values(model, column), dtype=float)
+            # Batch moments per type, merged into the bin's moments
+            sums = np.bincount(types, weights=values, minlength=type_count)
+            batch_mean = np.divide(sums, counts, out=np.zeros(type_count),
+                                   where=present)
+            batch_m2 = np.bincount(
+                types, weights=(values - batch_mean[types])**2,
+                minlength=type_count)
+            mean = arrays["mean"][time_bin, :, index]
+            delta = batch_mean - mean
+            weight = np.divide(counts, new_counts,
+                               out=np.zeros(type_count), where=present)
+            arrays["m2"][time_bin, :, index] += \
+                batch_m2 + delta**2 * old_counts * weight
+            mean += delta * weight
+
+            minimum = arrays["min"][time_bin, :, index]
+            maximum = arrays["max"][time_bin, :, index]
+            for code, group in self.groups:
+                group_values = values[group]
+                minimum[code] = min(minimum[code], group_values.min())
+                maximum[code] = max(maximum[code], group_values.max())
+
+            # Bin 0 is below the range and the last bin above it
+            cells = np.searchsorted(self.edges, values, side="right")
+            cells[values == self.edges[-1]] = self.histogram_bins
+            width = self.histogram_bins + 2
+            arrays["histogram"][time_bin, :, index] += np.bincount(
+                types * width + cells, minlength=type_count * width,
+            ).reshape(type_count, width)
+
+            for exceedance, (threshold_column, threshold) in \
+                    enumerate(self.thresholds):
+                if threshold_column == column:
+                    arrays["exceedances"][time_bin, :, exceedance] += \
+                        np.bincount(types, weights=values > threshold,
+                                    minlength=type_count).astype(np.int64)
+        arrays["count"][time_bin] = new_counts
+
+    def merge(self, other):
+        """
+        Adds the summaries of other, with the same settings, to these
+        summaries, as if their values had been collected here too.
+        """
+        if (self.columns, self.bin_length, self.thresholds,
+                self.histogram_bins, self.histogram_range) != \
+                (other.columns, other.bin_length, other.thresholds,
+                 other.histogram_bins, other.histogram_range):
+            raise ValueError("Only statistics with the same settings can"
+                             + " be merged")
+        self._reserve(other.bins)
+        bins = slice(0, other.bins)
+        merge_summaries(
+            {name: values[bins] for name, values in self.arrays.items()},
+            {name: values[bins] for name, values in other.arrays.items()},
+        )
+
+    def quantile(self, histogram, q):
+        """
+        Returns the q-quantile of the values counted in histograms
+        over their last axis, interpolated linearly within histogram
+        bins. Quantiles below or above the histogram range are
+        returned as its lowest or highest value.
+        """
+        counts = histogram[..., 1:-1]
+        cumulative = np.cumsum(histogram, axis=-1)
+        total = cumulative[..., -1]
+        target = q * total
+        # First bin whose cumulative count reaches the target
+        cell = np.minimum(
+            np.sum(cumulative < target[..., None], axis=-1),
+            self.histogram_bins + 1)
+        inner = np.clip(cell - 1, 0, self.histogram_bins - 1)
+        before = np.take_along_axis(
+            cumulative, cell[..., None], axis=-1)[..., 0] \
+            - np.take_along_axis(counts, inner[..., None], axis=-1)[..., 0]
+        in_cell = np.take_along_axis(counts, inner[..., None], axis=-1)[..., 0]
+        fraction = np.divide(target - before, in_cell,
+                             out=np.zeros(target.shape), where=in_cell > 0)
+        width = self.edges[1] - self.edges[0]
+        values = self.edges[inner] + np.clip(fraction, 0, 1) * width
+        values = np.where(cell == 0, self.edges[0], values)
+        values = np.where(cell > self.histogram_bins, self.edges[-1], values)
+        return np.where(total > 0, values, np.nan)
+
+    def to_dataframe(self, combine_types=False):
+        """
+        Returns the summaries as a DataFrame indexed by time bin and
+        agent type, with the start time and number of values of every
+        bin and, for every column, the mean, standard deviation,
+        minimum, maximum, quantiles (as "p50" etc.) and fractions
+        above its thresholds (as "> 0.5" etc.). Bins without values
+        are left out.
+
+        Parameters
+        ----------
+        combine_types: bool
+            If True, the types are merged into one type "all".
+        """
+        arrays = {name: values[:self.bins]
+                  for name, values in self.arrays.items()}
+        type_names = TYPE_NAMES
+        if combine_types:
+            combined = {name: values[:, :1].copy()
+                        for name, values in arrays.items()}
+            for code in range(1, len(TYPE_NAMES)):
+                merge_summaries(combined, {
+                    name: values[:, code:code + 1]
+                    for name, values in arrays.items()})
+            arrays = combined
+            type_names = ("all",)
+
+        counts = arrays["count"]
+        bins, types = np.nonzero(counts)
+        frame = {
+            "Time": bins * self.bin_length,
+            "Samples": counts[bins, types],
+        }
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for index, column in enumerate(self.columns):
+                n = counts[bins, types]
+                frame[f"{column} mean"] = arrays["mean"][bins, types, index]
+                frame[f"{column} std"] = np.sqrt(np.where(
+                    n > 1, arrays["m2"][bins, types, index] / (n - 1),
+                    np.nan))
+                frame[f"{column} min"] = arrays["min"][bins, types, index]
+                frame[f"{column} max"] = arrays["max"][bins, types, index]
+                histogram = arrays["histogram"][bins, types, index]
+                for q in self.quantiles:
+                    # Bounded by the exact extremes, which are sharper
+                    # at the edges of the histogram range
+                    frame[f"{column} p{100 * q:g}"] = np.clip(
+                        self.quantile(histogram, q),
+                        frame[f"{column} min"], frame[f"{column} max"])
+                for exceedance, (threshold_column, threshold) in \
+                        enumerate(self.thresholds):
+                    if threshold_column == column:
+                        frame[f"{column} > {threshold:g}"] = \
+                            arrays["exceedances"][bins, types, exceedance] / n
+        index = pd.MultiIndex.from_arrays(
+            [bins, np.array(type_names)[types]], names=["Bin", "Type"])
+        return pd.DataFrame(frame, index=index)
+
+    def get_checkpoint(self):
+        """
+        Returns the arrays and metadata needed to continue collecting
+        where the statistics are.
+        """
+        arrays = {name: values[:self.bins].copy()
+                  for name, values in self.arrays.items()}
+        return arrays, {"collects": self._collects, "bins": self.bins}
+
+    def load_checkpoint(self, arrays, meta):
+        """
+        Restores the statistics from get_checkpoint output.
+        """
+        self._collects = meta["collects"]
+        self.bins = 0
+        self.arrays = self._allocate(max(1, meta["bins"]))
+        self._reserve(meta["bins"])
+        for name, values in self.arrays.items():
+            values[:self.bins] = arrays[name]
+
+
+def merge_summaries(arrays, others):
+    """
+    Merges the summary arrays of OnlineStatistics others into arrays
+    of the same shape, in place: counts, histograms and exceedances
+    add up, extremes combine, and means and sums of squared
+    deviations follow the pairwise update of Chan et al.
+    """
+    counts = arrays["count"][..., None]
+    other_counts = others["count"][..., None]
+    new_counts = counts + other_counts
+    weight = np.divide(other_counts, new_counts,
+                       out=np.zeros(new_counts.shape), where=new_counts > 0)
+    delta = others["mean"] - arrays["mean"]
+    arrays["m2"] += others["m2"] + delta**2 * counts * weight
+    arrays["mean"] += delta * weight
+    np.minimum(arrays["min"], others["min"], out=arrays["min"])
+    np.maximum(arrays["max"], others["max"], out=arrays["max"])
+    for name in ("count", "histogram", "exceedances"):
+        arrays[name] += others[name]
@@ -0,0 +1,342 @@
+import numpy as np
+import pandas as pd
+from Constants import Constants
+from model.recording.ChunkedColumns import ChunkedColumns
+from model.system_updates.state_registry import (
+    STATE_NAMES, STATE_CODES, NO_STATE
+)
+
+# Recorded agent variables, by column name
+VARIABLE_COLUMNS = {
+    "Stress": "stress",
+    "Aversive Internal State": "aversive_internal_state",
+    "Urge to Escape": "urge_to_escape",
+    "Suicidal Thought": "suicidal_thought",
+    "Escape Behavior": "escape_behavior",
+    "External-Focused Change": "external_strat",
+    "Internal-Focused Change": "internal_strat",
+}
+STATE_COLUMN = "State"
+RECORDED_COLUMNS = (*VARIABLE_COLUMNS, STATE_COLUMN)
+
+# Time between recordings of the named cadences
+CADENCE_INTERVALS = {
+    "hourly": Constants.DAY_LENGTH / 24,
+    "daily": Constants.DAY_LENGTH,
+}
+# Recordings per chunk of the named cadences, one day and one month
+CADENCE_CHUNK_ROWS = {
+    "hourly": 24,
+    "daily": 30,
+}
+# Cadence recording agents only when their state changes
+TRANSITIONS = "transitions"
+# Transition rows preallocated per agent at first, grown when full
+TRANSITION_ROWS_PER_AGENT = 8
+
+# Small-int codes of the agent types
+TYPE_NAMES = ("standard", "volatile", "popular", "bullied")
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+
+class TrajectoryRecorder():
+    """
+    Records the agent variables of a model into preallocated NumPy
+    columns, with one row per recording and one column per agent.
+    States and agent types are stored as small-int codes.
+
+    Every recorded column has a cadence, which is one of:
+    - an int n, to record every n steps;
+    - "hourly" or "daily", to record at the first step at or after
+      every hour or day of model time;
+    - "transitions", to record only the agents whose state changed
+      since the last step, and the initial state of every agent.
+    Columns with the same cadence are recorded together in chunks of
+    rows, see ChunkedColumns. A chunk covers about chunk_steps steps
+    for cadences of every n steps, CADENCE_CHUNK_ROWS recordings for
+    hourly and daily cadences, and chunk_steps times the number of
+    agents transitions, of which only TRANSITION_ROWS_PER_AGENT per
+    agent are preallocated until more are recorded.
+
+    Drop-in replacement for the mesa.DataCollector of SuicideModel.
+    """
+    def __init__(self, agents, chunk_steps=1440, directory=None,
+                 cadences=None):
+        """
+        Parameters
+        ----------
+        agents: iterable of StandardAgent
+            Agents to record, in the model's update order.
+        chunk_steps: int
+            Largest number of steps covered by a chunk of preallocated
+            rows of a cadence of every n steps, and largest number of
+            transitions per agent in a chunk. Chunks are also kept
+            below CHUNK_BYTES.
+        directory: str or Path
+            Directory to flush full chunks to as .npz files. If None,
+            flushed chunks are kept in memory, so memory grows with
+            the length of the run; pass a directory for long runs.
+        cadences: dict
+            Cadence per recorded column, by column name as in
+            RECORDED_COLUMNS. Columns that are left out are not
+            recorded. If None, every column is recorded every step.
+        """
+        if cadences is None:
+            cadences = {column: 1 for column in RECORDED_COLUMNS}
+        for column, cadence in cadences.items():
+            if column not in RECORDED_COLUMNS:
+                raise ValueError(f"Unknown recorded column {column}")
+            if not (cadence == TRANSITIONS or cadence in CADENCE_INTERVALS
+                    or (isinstance(cadence, int) and cadence >= 1)):
+                raise ValueError(f"Unknown cadence {cadence} of {column}")
+        self.cadences = dict(cadences)
+
+        self.agents = list(agents)
+        self.agent_ids = np.array(
+            [agent.unique_id for agent in self.agents], dtype=np.int64)
+        self.types = np.array(
+            [TYPE_CODES[agent.type] for agent in self.agents], dtype=np.uint8)
+        self.chunk_steps = chunk_steps
+        self.directory = directory
+        self._collects = 0
+
+        # One track of grid recordings per cadence
+        size = len(self.agents)
+        self._tracks = []
+        for cadence in dict.fromkeys(self.cadences.values()):
+            if cadence == TRANSITIONS:
+                continue
+            columns = [column for column in RECORDED_COLUMNS
+                       if self.cadences.get(column) == cadence]
+            layout = {"steps": (np.int64, ()), "time": (float, ())}
+            for column in columns:
+                layout[self._key(column)] = (self._dtype(column), (size,))
+            if isinstance(cadence, int):
+                prefix = f"every_{cadence}_steps"
+                chunk_rows = -(-chunk_steps // cadence)
+            else:
+                prefix = cadence
+                chunk_rows = CADENCE_CHUNK_ROWS[cadence]
+            self._tracks.append({
+                "cadence": cadence,
+                "columns": columns,
+                "storage": ChunkedColumns(
+                    layout, chunk_rows, directory, prefix),
+                "last_tick": None,
+            })
+
+        # Events of agents changing state
+        self._transitions = None
+        columns = [column for column in VARIABLE_COLUMNS
+                   if self.cadences.get(column) == TRANSITIONS]
+        if TRANSITIONS in self.cadences.values():
+            layout = {
+                "steps": (np.int64, ()),
+                "time": (float, ()),
+                "agents": (np.int64, ()),
+                "state": (np.uint8, ()),
+            }
+            for column in columns:
+                layout[self._key(column)] = (self._dtype(column), ())
+            self._transitions = {
+                "columns": columns,
+                "storage": ChunkedColumns(
+                    layout, chunk_steps * max(1, size), directory,
+                    TRANSITIONS,
+                    initial_rows=TRANSITION_ROWS_PER_AGENT * max(1, size)),
+                "last_states": np.full(size, NO_STATE, dtype=np.uint8),
+            }
+
+    def _key(self, column):
+        return "state" if column == STATE_COLUMN else VARIABLE_COLUMNS[column]
+
+    def _dtype(self, column):
+        return np.uint8 if column == STATE_COLUMN else float
+
+    def _values(self, model, column, cache):
+        """
+        Returns the current values of a column for all agents.
+        """
+        if column not in cache:
+            population = model.population
+            if column == STATE_COLUMN:
+                if population is not None:
+                    values = population.state_codes
+                else:
+                    values = np.array([
+                        STATE_CODES[agent.state_manager.state.to_string()]
+                        for agent in self.agents
+                    ], dtype=np.uint8)
+            elif population is not None:
+                values = getattr(population, VARIABLE_COLUMNS[column])
+            else:
+                name = VARIABLE_COLUMNS[column]
+                values = np.array(
+                    [getattr(agent, name) for agent in self.agents])
+            cache[column] = values
+        return cache[column]
+
+    def _due(self, track, model):
+        cadence = track["cadence"]
+        if isinstance(cadence, int):
+            return self._collects % cadence == 0
+        # Small offset so rounding in the summed timesteps does not
+        # push a whole hour or day into the previous interval
+        tick = int(np.floor(model.time / CADENCE_INTERVALS[cadence] + 1e-9))
+        if tick == track["last_tick"]:
+            return False
+        track["last_tick"] = tick
+        return True
+
+    def collect(self, model):
+        """
+        Records the current values of the agents for every column
+        whose cadence is due.
+        """
+        cache = {}
+        for track in self._tracks:
+            if self._due(track, model):
+                track["storage"].append(
+                    steps=model.steps,
+                    time=model.time,
+                    **{self._key(column): self._values(model, column, cache)
+                       for column in track["columns"]},
+                )
+
+        if self._transitions is not None:
+            states = self._values(model, STATE_COLUMN, cache)
+            last_states = self._transitions["last_states"]
+            changed = np.flatnonzero(states != last_states)
+            if len(changed) > 0:
+                count = len(changed)
+                self._transitions["storage"].extend(
+                    count,
+                    steps=np.full(count, model.steps),
+                    time=np.full(count, model.time),
+                    agents=changed,
+                    state=states[changed],
+                    **{self._key(column):
+                       self._values(model, column, cache)[changed]
+                       for column in self._transitions["columns"]},
+                )
+                last_states[changed] = states[changed]
+        self._collects += 1
+
+    def flush(self):
+        """
+        Flushes the recorded rows of every cadence.
+        """
+        for track in self._tracks:
+            track["storage"].flush()
+        if self._transitions is not None:
+            self._transitions["storage"].flush()
+
+    def _storages(self):
+        storages = [track["storage"] for track in self._tracks]
+        if self._transitions is not None:
+            storages.append(self._transitions["storage"])
+        return storages
+
+    def get_checkpoint(self):
+        """
+        Returns the arrays and metadata needed to continue recording
+        where the recorder is, keyed by chunk file prefix.
+        """
+        arrays = {}
+        meta = {
+            "collects": self._collects,
+            "last_ticks": [track["last_tick"] for track in self._tracks],
+            "storages": {},
+        }
+        for storage in self._storages():
+            storage_arrays, storage_meta = storage.get_checkpoint()
+            for name, values in storage_arrays.items():
+                arrays[f"{storage.prefix}/{name}"] = values
+            meta["storages"][storage.prefix] = storage_meta
+        if self._transitions is not None:
+            arrays["last_states"] = self._transitions["last_states"].copy()
+        return arrays, meta
+
+    def load_checkpoint(self, arrays, meta):
+        """
+        Restores the recorder from get_checkpoint output.
+        """
+        self._collects = meta["collects"]
+        for track, last_tick in zip(self._tracks, meta["last_ticks"]):
+            track["last_tick"] = last_tick
+        for storage in self._storages():
+            storage.load_checkpoint(
+                {name: arrays[f"{storage.prefix}/{name}"]
+                 for name in storage.layout},
+                meta["storages"][storage.prefix],
+            )
+        if self._transitions is not None:
+            self._transitions["last_states"][:] = arrays["last_states"]
+
+    def _as_column(self, column, values):
+        if column == STATE_COLUMN:
+            return np.array(STATE_NAMES)[values.astype(np.intp)]
+        return values
+
+    def _track_frame(self, track):
+        data = track["storage"].concatenate()
+        rows = len(data["steps"])
+        size = len(self.agents)
+        index = pd.MultiIndex.from_arrays(
+            [np.repeat(data["steps"], size), np.tile(self.agent_ids, rows)],
+            names=["Step", "AgentID"],
+        )
+        frame = {"Type": np.array(TYPE_NAMES)[np.tile(self.types, rows)]}
+        for column in RECORDED_COLUMNS:
+            if column == STATE_COLUMN:
+                frame["Time"] = np.repeat(data["time"], size)
+            if column in track["columns"]:
+                frame[column] = self._as_column(
+                    column, data[self._key(column)].ravel())
+        return pd.DataFrame(frame, index=index)
+
+    def _transitions_frame(self):
+        data = self._transitions["storage"].concatenate()
+        agents = data["agents"]
+        index = pd.MultiIndex.from_arrays(
+            [data["steps"], self.agent_ids[agents]],
+            names=["Step", "AgentID"],
+        )
+        frame = {
+            "Type": np.array(TYPE_NAMES)[self.types[agents]],
+            "Time": data["time"],
+            STATE_COLUMN: self._as_column(STATE_COLUMN, data["state"]),
+        }
+        for column in self._transitions["columns"]:
+            frame[column] = self._as_column(column, data[self._key(column)])
+        return pd.DataFrame(frame, index=index)
+
+    def get_agent_vars_dataframe(self):
+        """
+        Returns all recordings as a DataFrame indexed by step and agent
+        ID, with the same columns as the mesa.DataCollector of
+        SuicideModel for the recorded columns. Recordings of different
+        cadences are joined on the union of their steps, leaving values
+        missing where a column was not recorded. A State recorded at
+        transitions is carried forward to every row of its agent.
+        """
+        frames = [self._track_frame(track) for track in self._tracks]
+        if self._transitions is not None:
+            frames.append(self._transitions_frame())
+        if len(frames) == 1 and self._transitions is None:
+            return frames[0]
+
+        frame = frames[0]
+        for other in frames[1:]:
+            frame = frame.combine_first(other)
+        frame = frame.sort_index()
+        if self.cadences.get(STATE_COLUMN) == TRANSITIONS:
+            frame[STATE_COLUMN] = frame.groupby(
+                level="AgentID")[STATE_COLUMN].ffill()
+        columns = ["Type"]
+        columns += [column for column in VARIABLE_COLUMNS
+                    if column in self.cadences]
+        columns += ["Time"]
+        if STATE_COLUMN in self.cadences:
+            columns += [STATE_COLUMN]
+        return frame[columns]
@@ -0,0 +1,100 @@
+from model.SuicideModel import SuicideModel, AGENT_TYPES
+
+
+class ShardModel(SuicideModel):
+    """
+    SuicideModel of one contiguous part of a larger population, as run
+    by a worker of a ShardedSimulation. The agent types and the
+    social networks are given instead of drawn, and the networks'
+    connections point into the whole population.
+
+    With social coupling, the coupling variable of the agents of
+    other shards is read from SharedValues, to which the shard
+    publishes its own agents' values after every step.
+    """
+    def __init__(self, type_counts, friend_graph, bully_graph, **kwargs):
+        """
+        Parameters
+        ----------
+        type_counts: sequence of int
+            Number of agents of every type, in the order of
+            AGENT_TYPES.
+        friend_graph: SocialGraph
+            Friend connections of the agents of the shard, see
+            SocialGraph.rows.
+        bully_graph: SocialGraph
+            Bully connections of the agents of the shard.
+        kwargs:
+            Keyword arguments of SuicideModel other than n.
+        """
+        self.type_counts = type_counts
+        self.shard_graphs = (friend_graph, bully_graph)
+        self.shared = None
+        self.barrier = None
+        self.exchanges = 0
+        super().__init__(n=sum(type_counts), **kwargs)
+
+    def add_agents(self, n):
+        """
+        Creates the agents of the shard, with the unique_id of their
+        place in the whole population.
+        """
+        for agent_class, count in zip(AGENT_TYPES, self.type_counts):
+            agent_class.create_agents(model=self, n=count)
+        friend_graph = self.shard_graphs[0]
+        ids = friend_graph.ids[friend_graph.offset:friend_graph.offset + n]
+        for agent, unique_id in zip(self.agents, ids.tolist()):
+            agent.unique_id = unique_id
+
+    def build_social_networks(self):
+        """
+        Uses the given networks of the shard.
+        """
+        self.friend_graph, self.bully_graph = self.shard_graphs
+        friend_counts = self.friend_graph.degrees().tolist()
+        bully_counts = self.bully_graph.degrees().tolist()
+        for index, (agent, num_friends, num_bullies) in enumerate(
+                zip(self.agents, friend_counts, bully_counts)):
+            agent.social_index = index
+            agent.num_friends = num_friends
+            agent.num_bullies = num_bullies
+
+    def share_coupling(self, shared, barrier):
+        """
+        Reads the coupling variable of the whole population from
+        shared, and publishes the initial values of the shard's
+        agents to it. Every shard has to call this before the first
+        step, which waits for all of them.
+
+        Parameters
+        ----------
+        shared: SharedValues
+            Coupling variable of the whole population.
+        barrier: multiprocessing.Barrier
+            Barrier of all shards.
+        """
+        self.shared = shared
+        self.barrier = barrier
+        self.population.coupling_values = \
+            lambda: self.shared.values(self.exchanges)
+        self._publish()
+
+    def _publish(self):
+        self.shared.publish(
+            self.exchanges, self.friend_graph.offset,
+            getattr(self.population, self.population.social_coupling))
+        self.barrier.wait()
+
+    def step(self, dt):
+        """
+        Performs one timestep of the shard, and exchanges the coupling
+        variable with the other shards.
+        """
+        super().step(dt)
+        if self.shared is not None:
+            self.exchanges += 1
+            self._publish()
+
+    def save_checkpoint(self, path=None):
+        raise ValueError("Shards of a ShardedSimulation cannot be"
+                         + " checkpointed")
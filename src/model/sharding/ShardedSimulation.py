@@ -0,0 +1,306 @@
+import multiprocessing
+import queue
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from model.SuicideModel import AGENT_TYPES, TYPE_PROBABILITIES
+from model.shared.SharedArrays import SharedArrays
+from model.social.SocialGraph import SocialGraph
+from model.system_updates.Population import population_arrays
+from model.sharding.ShardModel import ShardModel
+from model.sharding.SharedValues import SharedValues
+
+
+def shard_arrays(shared, start, stop):
+    """
+    Returns the views of the agents start to stop of the population
+    arrays in shared, see population_arrays, or None if shared has
+    none.
+    """
+    if "state_codes" not in shared:
+        return None
+    return {
+        name: shared[name][..., start:stop]
+        for name in population_arrays(0)
+    }
+
+
+def run_shard(shard, seed, type_counts, bounds, shared, days, dt,
+              model_kwargs, summarize=None, barrier=None, results=None):
+    """
+    Runs one shard for a number of days and returns summarize(model),
+    or the agent variable DataFrame if summarize is None. If results
+    is given, (shard, result) or (shard, exception) is put into it
+    instead.
+
+    Parameters
+    ----------
+    bounds: tuple
+        Index of the first agent of the shard and of the first agent
+        after it.
+    shared: SharedArrays
+        Networks of the whole population, and its population arrays
+        and coupling buffers if used, see ShardedSimulation.share.
+    barrier: multiprocessing.Barrier
+        Barrier of all shards, if they exchange the coupling variable.
+    """
+    start, stop = bounds
+    try:
+        graphs = [
+            SocialGraph(
+                shared[f"{name}_indptr"],
+                shared[f"{name}_indices"],
+                shared[f"{name}_weights"],
+                ids=shared["ids"],
+            ).rows(start, stop)
+            for name in ("friend", "bully")
+        ]
+        model = ShardModel(
+            type_counts, *graphs, seed=seed,
+            arrays=shard_arrays(shared, start, stop), **model_kwargs)
+        if barrier is not None:
+            model.share_coupling(SharedValues(shared["coupling"]), barrier)
+        for _ in range(int(days / dt)):
+            model.step(dt)
+        if summarize is None:
+            result = model.datacollector.get_agent_vars_dataframe()
+        else:
+            result = summarize(model)
+    except BaseException as error:
+        if results is None:
+            raise
+        # Release the other shards waiting at the barrier
+        if barrier is not None:
+            barrier.abort()
+        result = error
+    if results is None:
+        return result
+    results.put((shard, result))
+
+
+class ShardedSimulation():
+    """
+    Runs one population of SuicideModel agents split across worker
+    processes. Every shard owns a contiguous part of the agents and
+    runs it as a ShardModel in its own process.
+
+    The parent process draws the agent types and samples the friend
+    and bully networks of the whole population, so connections cross
+    shards freely. The networks are kept once in SharedArrays, which
+    every shard attaches to instead of receiving a copy. Vectorized
+    shards also keep their agent variables, parameter tables and
+    state codes in views of population-wide shared arrays.
+
+    Without social coupling, the influence of a connection only
+    depends on its weight and the shards run independently. With
+    social coupling, the coupling variable of every agent lives in
+    shared double buffers as well: after every step each shard writes
+    its agents' values to them and waits for the others at a barrier,
+    and reads the values of its friends and bullies in place during
+    the next step.
+
+    Every shard draws from its own child of the simulation seed, so
+    results only depend on the seed and the number of shards, but
+    differ from those of one SuicideModel of the same population.
+    """
+    def __init__(
+            self,
+            n,
+            shards,
+            seed=None,
+            days=1,
+            dt=1/(24*60),
+            model_kwargs=None,
+            summarize=None,
+            directory=None,
+    ):
+        """
+        Parameters
+        ----------
+        n: int
+            Number of agents of the whole population.
+        shards: int
+            Number of shards, each run in its own process. If 1, the
+            shard runs in the current process.
+        seed: int or np.random.SeedSequence
+            Seed of the simulation. If None, fresh entropy is used,
+            which is kept in self.seed_sequence.entropy.
+        days: float
+            Number of days to model.
+        dt: float
+            Timestep size.
+        model_kwargs: dict
+            Keyword arguments of SuicideModel other than n and seed.
+            A record_directory gets a subdirectory per shard, and
+            checkpointing is not supported.
+        summarize: function
+            Takes a finished shard and returns its result. Must be
+            picklable, i.e. defined at module level. If None, the
+            agent variable DataFrame is returned.
+        directory: str or Path
+            Directory to keep the shared arrays in as memory-mapped
+            .npy files, which remain after the run, e.g. to read the
+            final state of the population with SharedArrays. If None,
+            they are kept in shared memory, which is freed after the
+            run.
+        """
+        if not 1 <= shards <= max(n, 1):
+            raise ValueError("The number of shards must be between 1"
+                             + " and the number of agents")
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_sequence = seed
+        self.n = n
+        self.shards = shards
+        self.days = days
+        self.dt = dt
+        self.model_kwargs = {} if model_kwargs is None else dict(model_kwargs)
+        self.summarize = summarize
+        self.directory = directory
+
+    def seeds(self):
+        """
+        Returns the seed of the networks and the seed of every shard.
+        """
+        # Spawn from a copy, so every call returns the same children
+        seed_sequence = np.random.SeedSequence(
+            self.seed_sequence.entropy,
+            spawn_key=self.seed_sequence.spawn_key,
+        )
+        network_seed, *shard_seeds = seed_sequence.spawn(self.shards + 1)
+        return network_seed, shard_seeds
+
+    def bounds(self):
+        """
+        Returns the index of the first agent of every shard, and the
+        number of agents.
+        """
+        return np.linspace(0, self.n, self.shards + 1).astype(np.int64)
+
+    def coupled(self):
+        """
+        Returns whether the shards exchange a coupling variable.
+        """
+        return self.shards > 1 \
+            and self.model_kwargs.get("social_coupling") is not None
+
+    def partition(self, rng):
+        """
+        Draws the agent types and networks of the whole population.
+        Returns the type counts of every shard, and the friend and
+        bully graph. Agents are ordered by type, as in SuicideModel.
+        """
+        counts = rng.multinomial(self.n, TYPE_PROBABILITIES)
+        types = np.repeat(np.arange(len(AGENT_TYPES)), counts)
+        ids = np.arange(1, self.n + 1)
+        friend_graph = SocialGraph.sample(
+            np.array([cls.friend_count for cls in AGENT_TYPES])[types],
+            ids=ids, rng=rng)
+        bully_graph = SocialGraph.sample(
+            np.array([cls.bully_count for cls in AGENT_TYPES])[types],
+            ids=ids, rng=rng)
+        bounds = self.bounds()
+        type_counts = [
+            np.bincount(types[start:stop], minlength=len(AGENT_TYPES))
+            .tolist()
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        return type_counts, friend_graph, bully_graph
+
+    def share(self, friend_graph, bully_graph):
+        """
+        Returns new SharedArrays holding the networks, the population
+        arrays of vectorized shards and the coupling buffers of
+        coupled shards, in directory if given.
+        """
+        arrays = {"ids": friend_graph.ids}
+        for name, graph in (("friend", friend_graph),
+                            ("bully", bully_graph)):
+            for key, array in graph.get_checkpoint()[0].items():
+                arrays[f"{name}_{key}"] = array
+        if self.model_kwargs.get("vectorized"):
+            arrays.update(population_arrays(self.n))
+        if self.coupled():
+            arrays["coupling"] = np.zeros((2, self.n))
+        return SharedArrays.create(arrays, self.directory)
+
+    def shard_kwargs(self, shard):
+        """
+        Returns the ShardModel keyword arguments of a shard.
+        """
+        model_kwargs = dict(self.model_kwargs)
+        if model_kwargs.get("record_directory") is not None:
+            model_kwargs["record_directory"] = \
+                Path(model_kwargs["record_directory"]) / f"shard_{shard}"
+        return model_kwargs
+
+    def run(self):
+        """
+        Runs all shards and returns the agent variable DataFrame of
+        the whole population, or the result of every shard, in order,
+        if summarize is given.
+        """
+        network_seed, shard_seeds = self.seeds()
+        type_counts, friend_graph, bully_graph = \
+            self.partition(np.random.default_rng(network_seed))
+        bounds = self.bounds()
+        shared = self.share(friend_graph, bully_graph)
+        # Only the shared copy of the networks is kept
+        del friend_graph, bully_graph
+        arguments = [
+            (shard, shard_seeds[shard], type_counts[shard],
+             (int(bounds[shard]), int(bounds[shard + 1])), shared,
+             self.days, self.dt, self.shard_kwargs(shard), self.summarize)
+            for shard in range(self.shards)
+        ]
+        try:
+            if self.shards == 1:
+                results = [run_shard(*arguments[0])]
+            else:
+                results = self._run_processes(arguments)
+        finally:
+            shared.close()
+        if self.summarize is not None:
+            return results
+        return pd.concat(results).sort_index()
+
+    def _run_processes(self, arguments):
+        context = multiprocessing.get_context()
+        results_queue = context.Queue()
+        barrier = context.Barrier(self.shards) if self.coupled() else None
+        processes = [
+            context.Process(target=run_shard, args=(
+                *shard_arguments, barrier, results_queue))
+            for shard_arguments in arguments
+        ]
+        try:
+            for process in processes:
+                process.start()
+            # Results are taken before joining, so no worker blocks
+            # on a full queue
+            results = {}
+            while len(results) < len(processes):
+                try:
+                    shard, result = results_queue.get(timeout=1)
+                    results[shard] = result
+                except queue.Empty:
+                    if any(process.exitcode not in (None, 0)
+                           for process in processes):
+                        raise RuntimeError("A shard process exited"
+                                           + " without a result")
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+        errors = [result for result in results.values()
+                  if isinstance(result, BaseException)]
+        if errors:
+            # Shards released by an aborted barrier only report the
+            # broken barrier, so the original error is raised first
+            errors.sort(key=lambda error: isinstance(
+                error, threading.BrokenBarrierError))
+            raise errors[0]
+        return [results[shard] for shard in range(self.shards)]
@@ -0,0 +1,33 @@
+class SharedValues():
+    """
+    One value per agent of a whole population, which every shard of a
+    ShardedSimulation reads in place and writes its own agents' part
+    of, kept in an array of SharedArrays.
+
+    The values are double-buffered by step: during step t the shards
+    read the values at the start of the step from buffer t % 2 and
+    write their new values to buffer (t + 1) % 2, so one barrier per
+    step keeps any shard from overwriting values another shard is
+    still reading.
+    """
+    def __init__(self, buffers):
+        """
+        Parameters
+        ----------
+        buffers: np.ndarray
+            Array of shape (2, number of agents).
+        """
+        self.buffers = buffers
+
+    def values(self, step):
+        """
+        Returns the values of all agents at the start of a step.
+        """
+        return self.buffers[step % 2]
+
+    def publish(self, step, start, values):
+        """
+        Writes the values of the agents from index start on at the
+        start of a step.
+        """
+        self.buffers[step % 2, start:start + len(values)] = values
@@ -0,0 +1,158 @@
+import gc
+from multiprocessing import shared_memory
+from pathlib import Path
+import numpy as np
+
+# Byte alignment of every array in a shared memory block
+ALIGNMENT = 64
+
+
+class SharedArrays():
+    """
+    Named numpy arrays that several processes use without copying,
+    either in one multiprocessing.shared_memory block or as
+    memory-mapped .npy files in a directory.
+
+    Pickling a SharedArrays only pickles the name of its block or
+    directory and the layout of its arrays, and unpickling attaches
+    to the same memory. It can therefore be passed to worker
+    processes, e.g. as an argument of ProcessPoolExecutor.map, and
+    every worker reads and writes the same pages instead of its own
+    copy.
+
+    The process that creates the arrays owns them: closing its
+    SharedArrays frees a shared memory block, while attached copies
+    only detach. Memory-mapped files are left on disk.
+    """
+    def __init__(self, layout=None, name=None, directory=None, owner=False,
+                 writeable=True):
+        """
+        Attaches to existing arrays; use create to make new ones.
+
+        Parameters
+        ----------
+        layout: dict
+            Byte offset, shape and dtype string of every array, by
+            name. Offsets are ignored for memory-mapped files. If
+            None, every .npy file in directory is attached.
+        name: str
+            Name of the shared memory block holding the arrays.
+        directory: str or Path
+            Directory of the memory-mapped .npy files holding the
+            arrays, if name is None.
+        owner: bool
+            Whether closing the arrays frees the shared memory block.
+        writeable: bool
+            Whether the arrays can be written to.
+        """
+        if (name is None) == (directory is None):
+            raise ValueError("Shared arrays need either a shared memory"
+                             + " name or a directory")
+        if layout is None and directory is not None:
+            layout = {path.stem: None
+                      for path in sorted(Path(directory).glob("*.npy"))}
+        self.layout = layout
+        self.name = name
+        self.directory = None if directory is None else Path(directory)
+        self.owner = owner
+        self.writeable = writeable
+        self.memory = None
+        if name is not None:
+            self.memory = shared_memory.SharedMemory(name=name)
+            buffer = self.memory.buf
+            self.arrays = {
+                key: np.ndarray(shape, dtype=np.dtype(dtype),
+                                buffer=buffer, offset=offset)
+                for key, (offset, shape, dtype) in layout.items()
+            }
+        else:
+            mode = "r+" if writeable else "r"
+            self.arrays = {
+                key: np.load(self.directory / f"{key}.npy", mmap_mode=mode)
+                for key in layout
+            }
+        if not writeable:
+            for array in self.arrays.values():
+                array.flags.writeable = False
+
+    @classmethod
+    def create(cls, arrays, directory=None):
+        """
+        Copies arrays into new shared memory, or into memory-mapped
+        files in directory if given, and returns the owning
+        SharedArrays.
+
+        Parameters
+        ----------
+        arrays: dict
+            Arrays to share, by name. Names must be valid file names.
+        directory: str or Path
+            Directory to write one .npy file per array to.
+        """
+        arrays = {key: np.asarray(array) for key, array in arrays.items()}
+        layout = {}
+        offset = 0
+        for key, array in arrays.items():
+            offset = -(-offset // ALIGNMENT) * ALIGNMENT
+            layout[key] = (offset, array.shape, array.dtype.str)
+            offset += array.nbytes
+        if directory is not None:
+            directory = Path(directory)
+            directory.mkdir(parents=True, exist_ok=True)
+            for key, array in arrays.items():
+                np.save(directory / f"{key}.npy", array)
+            return cls(layout, directory=directory, owner=True)
+
+        memory = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        try:
+            for key, array in arrays.items():
+                start, shape, dtype = layout[key]
+                np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf,
+                           offset=start)[...] = array
+            shared = cls(layout, name=memory.name, owner=True)
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+        # The new SharedArrays holds its own handle of the block
+        memory.close()
+        return shared
+
+    def __reduce__(self):
+        return (SharedArrays, (self.layout, self.name, self.directory,
+                               False, self.writeable))
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def __contains__(self, key):
+        return key in self.arrays
+
+    def keys(self):
+        return self.arrays.keys()
+
+    def close(self):
+        """
+        Detaches from the arrays, and frees the shared memory block if
+        this SharedArrays created it. Arrays returned earlier must no
+        longer be used.
+        """
+        # Arrays viewing the block must be dropped before closing it
+        self.arrays = {}
+        if self.memory is not None:
+            try:
+                self.memory.close()
+            except BufferError:
+                # Views only held by unreachable reference cycles, e.g.
+                # of a finished model, are collected first
+                gc.collect()
+                self.memory.close()
+            if self.owner:
+                self.memory.unlink()
+            self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,285 @@
+import numpy as np
+from scipy import sparse
+
+
+class SocialGraph():
+    """
+    Directed, weighted social network of a population in compressed
+    sparse row (CSR) form. The connections of agent i are
+    indices[indptr[i]:indptr[i+1]], with matching weights. Agents are
+    identified by their index in the model's agent list, and ids maps
+    the indices to the agents' unique_id.
+
+    Connections never point to the agent itself, and every agent is
+    connected to another agent at most once.
+
+    A graph can also hold the connections of a contiguous part of a
+    larger network, see rows. Its rows are then the agents of the
+    part, offset agents into the network, and its indices still point
+    into the whole network of columns agents.
+    """
+    def __init__(self, indptr, indices, weights, ids=None, offset=0,
+                 columns=None):
+        """
+        Parameters
+        ----------
+        indptr: np.ndarray
+            Start of the connections of every agent in indices, with
+            the total number of connections appended.
+        indices: np.ndarray
+            Index of the connected agent of every connection.
+        weights: np.ndarray
+            Weight of every connection.
+        ids: np.ndarray
+            unique_id of every agent in the network. If None, the
+            indices are used.
+        offset: int
+            Index in the network of the agent of the first row.
+        columns: int
+            Number of agents in the network. If None, the number of
+            rows.
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.size = len(indptr) - 1
+        self.offset = offset
+        self.columns = self.size if columns is None else columns
+        self.ids = np.arange(self.columns) if ids is None \
+            else np.asarray(ids)
+        # Influence and saturation per agent by saturation constant,
+        # and the adjacency matrix, cleared whenever the connections
+        # change
+        self._influence = {}
+        self._saturation = {}
+        self._adjacency = None
+
+    @classmethod
+    def sample(cls, degrees, ids=None, rng=np.random):
+        """
+        Samples a network in which every agent is connected to a given
+        number of distinct other agents, chosen uniformly at random.
+        Weights are drawn from N(0.5, 0.15), clipped to [0, 1].
+        Takes O(N*k) time and memory for N agents with k connections.
+
+        Parameters
+        ----------
+        degrees: array_like
+            Number of connections of every agent. Capped at the number
+            of other agents.
+        ids: np.ndarray
+            unique_id of every agent.
+        rng: np.random.Generator or np.random.RandomState
+            Source of randomness, the global np.random by default.
+        """
+        degrees = np.asarray(degrees, dtype=np.int64)
+        size = len(degrees)
+        degrees = np.clip(degrees, 0, max(size - 1, 0))
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = sample_targets(np.arange(size), degrees, size, rng)
+        return cls(indptr, indices, sample_weights(len(indices), rng), ids)
+
+    def get_checkpoint(self):
+        """
+        Returns the arrays and metadata needed to restore the network.
+        """
+        return {
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "weights": self.weights,
+        }, {"offset": self.offset, "columns": self.columns}
+
+    def load_checkpoint(self, arrays, meta):
+        """
+        Restores the network from get_checkpoint output.
+        """
+        self.indptr = np.array(arrays["indptr"])
+        self.indices = np.array(arrays["indices"])
+        self.weights = np.array(arrays["weights"])
+        self.size = len(self.indptr) - 1
+        self.offset = meta.get("offset", 0)
+        self.columns = meta.get("columns", self.size)
+        self._influence.clear()
+        self._saturation.clear()
+        self._adjacency = None
+
+    def __len__(self):
+        return self.size
+
+    def rows(self, start, stop):
+        """
+        Returns the connections of agents start to stop as a graph of
+        that part of the network, sharing its connection arrays with
+        this graph.
+        """
+        first, last = self.indptr[start], self.indptr[stop]
+        return SocialGraph(
+            self.indptr[start:stop + 1] - first,
+            self.indices[first:last],
+            self.weights[first:last],
+            ids=self.ids,
+            offset=self.offset + start,
+            columns=self.columns,
+        )
+
+    def degrees(self):
+        """
+        Returns the number of connections of every agent.
+        """
+        return np.diff(self.indptr)
+
+    def sources(self):
+        """
+        Returns the index of the agent every connection belongs to.
+        """
+        return np.repeat(np.arange(self.size), self.degrees())
+
+    def influence(self, k=5):
+        """
+        Returns the saturated mean social influence of every agent:
+        the mean weight of the agent's connections, multiplied by
+        n/(k+n) for n connections, so that it goes to the mean weight
+        as n -> inf and is half of it at n = k. Agents without
+        connections have no influence. Computed once and kept until
+        the network changes.
+        """
+        if k not in self._influence:
+            n = self.degrees()
+            totals = np.bincount(
+                self.sources(), weights=self.weights, minlength=self.size)
+            connected = n > 0
+            safe_n = np.where(connected, n, 1)
+            self._influence[k] = np.where(
+                connected, (totals/safe_n) * (safe_n/(k+safe_n)), 0.0)
+        return self._influence[k]
+
+    def adjacency(self):
+        """
+        Returns the weighted adjacency matrix as a sparse CSR array,
+        sharing its arrays with the graph.
+        """
+        if self._adjacency is None:
+            self._adjacency = sparse.csr_array(
+                (self.weights, self.indices, self.indptr),
+                shape=(self.size, self.columns),
+            )
+        return self._adjacency
+
+    def coupled_influence(self, values, k=5):
+        """
+        Returns the saturated mean social influence of every agent
+        with each connection weighted by the current value of the
+        connected agent, using one sparse matrix-vector product.
+        The weighted mean over the n connections is saturated by
+        n/(k+n) as in influence, which it equals when all values
+        are 1.
+
+        Parameters
+        ----------
+        values: np.ndarray
+            Current value of every agent of the network, e.g. their
+            aversive internal state.
+        k: float
+            Number of connections at which the saturation is 1/2.
+        """
+        if k not in self._saturation:
+            # (total/n) * (n/(k+n)) simplifies to total/(k+n)
+            n = self.degrees()
+            self._saturation[k] = np.where(n > 0, 1 / (k + n), 0.0)
+        return (self.adjacency() @ values) * self._saturation[k]
+
+    def neighbours(self, index):
+        """
+        Returns the indices and weights of the connections of an agent.
+        """
+        start, stop = self.indptr[index], self.indptr[index + 1]
+        return self.indices[start:stop], self.weights[start:stop]
+
+    def connections(self, index):
+        """
+        Returns the connections of an agent as rows of
+        (unique_id, weight).
+        """
+        indices, weights = self.neighbours(index)
+        return np.column_stack((self.ids[indices], weights))
+
+    def resample(self, index, degree, rng=np.random):
+        """
+        Replaces the connections of an agent by a given number of
+        newly sampled ones, as in sample. Returns the number of
+        connections, capped at the number of other agents.
+        """
+        degree = int(np.clip(degree, 0, max(self.columns - 1, 0)))
+        indices = sample_targets(
+            np.array([self.offset + index]), np.array([degree]),
+            self.columns, rng)
+        self.replace(index, indices, sample_weights(degree, rng))
+        return degree
+
+    def replace(self, index, indices, weights):
+        """
+        Replaces the connections of an agent. Takes time linear in the
+        number of connections in the network.
+        """
+        start, stop = self.indptr[index], self.indptr[index + 1]
+        self.indices = np.concatenate(
+            (self.indices[:start], indices, self.indices[stop:]))
+        self.weights = np.concatenate(
+            (self.weights[:start], weights, self.weights[stop:]))
+        self.indptr[index + 1:] += len(indices) - (stop - start)
+        self._influence.clear()
+        self._saturation.clear()
+        self._adjacency = None
+
+
+def sample_weights(count, rng=np.random):
+    """
+    Draws connection weights from N(0.5, 0.15) (roughly between 0 and
+    1), clipped to [0, 1].
+    """
+    return np.clip(rng.normal(loc=0.5, scale=0.15, size=count), 0, 1)
+
+
+def sample_targets(sources, degrees, size, rng=np.random):
+    """
+    Draws degrees[j] distinct targets other than sources[j] out of
+    size agents, for every j. Returns the targets of each source in
+    ascending order, one source after another.
+
+    Sources that connect to at most half of the other agents draw
+    targets uniformly and redraw duplicates until there are none.
+    Sources that connect to more take the first targets of a random
+    permutation, which only happens in networks with fewer agents
+    than twice the degree.
+    """
+    edge_sources = np.repeat(sources, degrees)
+    edge_rows = np.repeat(np.arange(len(sources)), degrees)
+    targets = np.empty(len(edge_sources), dtype=np.int64)
+    dense = degrees > (size - 1) // 2
+    dense_edges = dense[edge_rows]
+
+    if dense.any():
+        rows = sources[dense]
+        keys = rng.random((len(rows), size))
+        keys[np.arange(len(rows)), rows] = np.inf
+        order = np.argsort(keys, axis=1)
+        taken = np.arange(size) < degrees[dense][:, None]
+        targets[dense_edges] = order[taken]
+
+    # Edges are identified by row * size + target, which sorts them by
+    # row and then by target
+    redraw = np.flatnonzero(~dense_edges)
+    check = redraw
+    while len(redraw) > 0:
+        # Draw out of the other size - 1 agents by skipping the source
+        drawn = (rng.random(len(redraw)) * (size - 1)).astype(np.int64)
+        targets[redraw] = drawn + (drawn >= edge_sources[redraw])
+        keys = edge_rows[check] * size + targets[check]
+        order = np.argsort(keys)
+        duplicate = keys[order[1:]] == keys[order[:-1]]
+        redraw = check[order[1:][duplicate]]
+        # Only rows with redrawn targets can contain new duplicates
+        check = np.flatnonzero(np.isin(edge_rows, edge_rows[redraw]))
+
+    return np.sort(edge_rows * size + targets) % size
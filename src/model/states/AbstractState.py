@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from model.parameters.AbstractParameters import Parameters
+from model.parameters.parameter_snapshots import get_snapshot
 
 class State(ABC):
     """
@@ -88,6 +89,20 @@ class State(ABC):
         """
         pass
 
+    def apply_parameters(self, params: Parameters):
+        """
+        Gives a Parameters object the parameters of the current state
+        by swapping in a cached snapshot of modify_parameters applied
+        to the defaults of its class.
+
+        Parameters
+        ----------
+        params: Parameters
+            Parameters object containing the agent's current
+            parameters for each evolution equation.
+        """
+        params.apply_snapshot(get_snapshot(type(params), self))
+
     @abstractmethod
     def to_string(self):
         """
@@ -22,7 +22,7 @@ class HomeState(State):
         self._start_time = time
         mean_sleep = state_params.mean_sleep
         sigma_sleep = state_params.sigma_sleep
-        sleep_hours = max(0, np.random.normal(mean_sleep, sigma_sleep))
+        sleep_hours = max(0, state_params.rng.normal(mean_sleep, sigma_sleep))
         sleep_length = sleep_hours * Constants.DAY_LENGTH * (1/24)
         
         time_of_day = time % Constants.DAY_LENGTH
@@ -1,5 +1,6 @@
 from model.states.AbstractState import State
 from errors.StateError import PreviousStateError
+from model.parameters.parameter_snapshots import get_default_snapshot
 from Constants import Constants
 import numpy as np
 
@@ -32,17 +33,48 @@ class MorningState(State):
     def modify_parameters(self, params):
         # Reset from last state
         params.set_defaults()
+        params.apply_snapshot(self.deficit_parameters(params.compiled))
 
-        # Modify stress, suicidal thought, and their weights on aversion
-        # based on shortage of sleep
-        sleep_deficit = max(0.0, (Constants.HEALTHY_SLEEP - self.sleep) / Constants.HEALTHY_SLEEP)
-        new_s_mean = min(1.0, params.stress.mean + 0.3 * sleep_deficit)
-        params.set_stress_params(mean=new_s_mean)
-        new_t_mid = max(0.0, params.suicidal_thought.sig_middle - 0.2 * sleep_deficit)
-        params.set_suicidal_thought_params(sig_middle=new_t_mid)
-        new_s_weight = params.aversion.S_weight + 3 * sleep_deficit
-        new_t_weight = params.aversion.T_weight + 0.5 * sleep_deficit
-        params.set_aversion_params(S_weight=new_s_weight, T_weight=new_t_weight)
+    def apply_parameters(self, params):
+        # The sleep deficit differs per morning, so patch the cached
+        # defaults instead of caching a snapshot per deficit
+        params.apply_snapshot(
+            self.deficit_parameters(get_default_snapshot(type(params))))
+
+    def deficit_parameters(self, compiled):
+        """
+        Returns compiled parameters with the effects of this morning's
+        sleep deficit applied: a higher stress mean, an earlier onset
+        of suicidal thoughts, and heavier weights of stress and
+        suicidal thoughts on aversion.
+
+        Parameters
+        ----------
+        compiled: Mapping
+            Compiled parameter tuples by parameter set name, before
+            the sleep deficit.
+        """
+        sleep_deficit = self.sleep_deficit()
+        stress = compiled["stress"]
+        suicidal_thought = compiled["suicidal_thought"]
+        aversion = compiled["aversion"]
+        return {
+            **compiled,
+            "stress": stress._replace(
+                mean=min(1.0, stress.mean + 0.3 * sleep_deficit)),
+            "suicidal_thought": suicidal_thought._replace(
+                sig_middle=max(0.0, suicidal_thought.sig_middle - 0.2 * sleep_deficit)),
+            "aversion": aversion._replace(
+                S_weight=aversion.S_weight + 3 * sleep_deficit,
+                T_weight=aversion.T_weight + 0.5 * sleep_deficit),
+        }
+
+    def sleep_deficit(self):
+        """
+        Returns the shortage of sleep before this morning as a
+        fraction of a healthy night's sleep.
+        """
+        return max(0.0, (Constants.HEALTHY_SLEEP - self.sleep) / Constants.HEALTHY_SLEEP)
     
     def to_string(self):
         return self.STATE_NAME
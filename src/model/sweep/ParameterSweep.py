@@ -0,0 +1,219 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+from model.ensemble.Ensemble import run_replicate
+from model.sweep.designs import DESIGNS, latin_hypercube, saltelli, morris, scale
+from model.sweep.sensitivity import sobol_indices, elementary_effects
+
+
+def mean_suicidal_thought(model):
+    """
+    Mean suicidal thought over all agents and recorded steps.
+    """
+    df = model.datacollector.get_agent_vars_dataframe()
+    return float(df["Suicidal Thought"].mean())
+
+def thought_onset(model, threshold=0.5):
+    """
+    Fraction of agents whose suicidal thought exceeded the threshold
+    at any recorded step.
+    """
+    df = model.datacollector.get_agent_vars_dataframe()
+    peaks = df.groupby(level="AgentID")["Suicidal Thought"].max()
+    return float((peaks > threshold).mean())
+
+# Output summaries computed per run when none are given
+SUMMARIES = {
+    "Mean Suicidal Thought": mean_suicidal_thought,
+    "Suicidal Thought Onset": thought_onset,
+}
+
+def evaluate_summaries(model, summaries):
+    """
+    Returns the value of every summary for a finished model.
+    """
+    return {name: summary(model) for name, summary in summaries.items()}
+
+
+class ParameterSweep():
+    """
+    Runs SuicideModel over a design of parameter values and computes
+    the sensitivity of output summaries to the parameters.
+
+    Parameters are named "set.field" after a parameter set of
+    Parameters and one of its FIELDS, e.g. "aversion.feedback" or
+    "stress.sigma". Every point of the design overrides the defaults
+    of all agent types with its values, see
+    parameter_overrides.with_defaults.
+
+    Every point runs the same replicate seeds, so differences between
+    points are not masked by differences in the random draws.
+    """
+    def __init__(
+            self,
+            ranges,
+            method="lhs",
+            samples=64,
+            replicates=1,
+            levels=4,
+            seed=None,
+            days=1,
+            dt=1/(24*60),
+            model_kwargs=None,
+            summaries=None,
+            workers=None,
+    ):
+        """
+        Parameters
+        ----------
+        ranges: dict
+            (low, high) bounds by parameter name.
+        method: str
+            "lhs" for a Latin hypercube, "sobol" for Saltelli's
+            design for Sobol indices, or "morris" for Morris'
+            elementary effects.
+        samples: int
+            Number of points for "lhs", base samples for "sobol"
+            (preferably a power of 2), which runs
+            samples * (parameters + 2) points, or trajectories for
+            "morris", which runs samples * (parameters + 1) points.
+        replicates: int
+            Number of model runs per point, averaged per summary.
+        levels: int
+            Number of grid levels per parameter for "morris", even
+            and at least 2.
+        seed: int or np.random.SeedSequence
+            Seed of the design and of the replicates.
+        days: float
+            Number of days to model per run.
+        dt: float
+            Timestep size.
+        model_kwargs: dict
+            Keyword arguments of SuicideModel, e.g. n, other than seed
+            and parameter_overrides.
+        summaries: dict
+            Functions taking a finished model and returning a float,
+            by output name. Must be picklable, i.e. defined at module
+            level. Defaults to SUMMARIES.
+        workers: int
+            Number of worker processes. If 1, runs happen in the
+            current process. If None, one per CPU.
+        """
+        if method not in DESIGNS:
+            raise ValueError(f"Unknown sweep design {method}")
+        for name in ranges:
+            if len(name.split(".")) != 2:
+                raise ValueError(f"Parameter {name} is not named set.field")
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        design_seed, replicate_seed = seed.spawn(2)
+        self.ranges = dict(ranges)
+        self.names = list(self.ranges)
+        self.method = method
+        self.samples = samples
+        self.replicates = replicates
+        self.levels = levels
+        self.rng = np.random.default_rng(design_seed)
+        self.replicate_seeds = replicate_seed.spawn(replicates)
+        self.days = days
+        self.dt = dt
+        self.model_kwargs = {} if model_kwargs is None else dict(model_kwargs)
+        self.summaries = SUMMARIES if summaries is None else dict(summaries)
+        self.workers = workers
+        self.design = self.build_design()
+        self.results = None
+
+    def build_design(self):
+        """
+        Returns the design of the sweep in the unit cube, one row per
+        point.
+        """
+        dimensions = len(self.names)
+        if self.method == "lhs":
+            return latin_hypercube(dimensions, self.samples, self.rng)
+        if self.method == "sobol":
+            return saltelli(dimensions, self.samples, self.rng)
+        return morris(dimensions, self.samples, self.levels, self.rng)
+
+    def points(self):
+        """
+        Returns the parameter values of every point as a DataFrame.
+        """
+        bounds = [self.ranges[name] for name in self.names]
+        return pd.DataFrame(
+            scale(self.design, bounds), columns=self.names)
+
+    def overrides(self, point):
+        """
+        Returns the parameter_overrides of SuicideModel for a point.
+        """
+        overrides = {}
+        for name, value in zip(self.names, point):
+            set_name, field = name.split(".")
+            overrides.setdefault(set_name, {})[field] = float(value)
+        return overrides
+
+    def run(self):
+        """
+        Runs every point of the design and returns the points with
+        the summaries averaged over replicates, one row per point.
+        """
+        points = self.points()
+        seeds, model_kwargs = [], []
+        for point in points.itertuples(index=False):
+            kwargs = {
+                **self.model_kwargs,
+                "parameter_overrides": self.overrides(point),
+            }
+            for seed in self.replicate_seeds:
+                seeds.append(seed)
+                model_kwargs.append(kwargs)
+        runs = len(seeds)
+        arguments = (
+            seeds,
+            [self.days] * runs,
+            [self.dt] * runs,
+            model_kwargs,
+            [partial(evaluate_summaries, summaries=self.summaries)] * runs,
+        )
+        if self.workers == 1:
+            outputs = list(map(run_replicate, *arguments))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                outputs = list(pool.map(run_replicate, *arguments))
+
+        outputs = pd.DataFrame(outputs)
+        outputs.index = np.repeat(np.arange(len(points)), self.replicates)
+        self.results = pd.concat(
+            [points, outputs.groupby(level=0).mean()], axis=1)
+        return self.results
+
+    def analyze(self):
+        """
+        Returns the sensitivity of every summary to the parameters,
+        as a DataFrame per summary with one row per parameter: the
+        first- and total-order Sobol indices "S1" and "ST" for the
+        "sobol" design, or the mean, mean absolute value and standard
+        deviation of the elementary effects "mu", "mu_star" and
+        "sigma" for the "morris" design. Runs the sweep first if it
+        has not been run.
+        """
+        if self.method == "lhs":
+            raise ValueError("Sensitivity indices require the sobol or"
+                             + " morris design")
+        if self.results is None:
+            self.run()
+        dimensions = len(self.names)
+        analysis = {}
+        for name in self.summaries:
+            outputs = self.results[name].to_numpy()
+            if self.method == "sobol":
+                first, total = sobol_indices(outputs, dimensions)
+                columns = {"S1": first, "ST": total}
+            else:
+                mu, mu_star, sigma = elementary_effects(
+                    self.design, outputs, dimensions)
+                columns = {"mu": mu, "mu_star": mu_star, "sigma": sigma}
+            analysis[name] = pd.DataFrame(columns, index=self.names)
+        return analysis
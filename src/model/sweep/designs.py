@@ -0,0 +1,64 @@
+import numpy as np
+from scipy.stats import qmc
+
+# Sampling designs available for parameter sweeps
+DESIGNS = ("lhs", "sobol", "morris")
+
+def latin_hypercube(dimensions, samples, seed=None):
+    """
+    Returns a Latin hypercube design of samples points in the unit
+    cube, one row per point.
+    """
+    return qmc.LatinHypercube(d=dimensions, seed=seed).random(samples)
+
+def saltelli(dimensions, samples, seed=None):
+    """
+    Returns the design of Saltelli's scheme for Sobol indices in the
+    unit cube: base samples A and B from one scrambled Sobol sequence,
+    followed by one copy of A per dimension i with column i taken from
+    B. Has samples * (dimensions + 2) rows, in the order A, B, AB_1,
+    ..., AB_d. samples should be a power of 2 to keep the balance
+    properties of the Sobol sequence.
+    """
+    base = qmc.Sobol(d=2 * dimensions, seed=seed).random(samples)
+    A = base[:, :dimensions]
+    B = base[:, dimensions:]
+    blocks = [A, B]
+    for i in range(dimensions):
+        AB = A.copy()
+        AB[:, i] = B[:, i]
+        blocks.append(AB)
+    return np.vstack(blocks)
+
+def morris(dimensions, trajectories, levels=4, seed=None):
+    """
+    Returns the design of Morris' elementary effects method in the
+    unit cube. Every trajectory starts at a random point of a grid
+    with the given number of levels per dimension, and moves each
+    dimension once, in random order, by delta = levels/(2*(levels-1)).
+    Has trajectories * (dimensions + 1) rows, one trajectory after
+    another. levels must be even and at least 2, so that every
+    step stays in the unit cube.
+    """
+    if levels < 2 or levels % 2 != 0:
+        raise ValueError("Morris designs need an even number of at"
+                         + f" least 2 levels, not {levels}")
+    rng = np.random.default_rng(seed)
+    delta = levels / (2 * (levels - 1))
+    design = np.empty((trajectories, dimensions + 1, dimensions))
+    for trajectory in design:
+        point = rng.integers(0, levels, dimensions) / (levels - 1)
+        trajectory[0] = point
+        for step, i in enumerate(rng.permutation(dimensions), start=1):
+            # Move up unless that leaves the unit cube
+            point[i] += delta if point[i] + delta <= 1 else -delta
+            trajectory[step] = point
+    return design.reshape(-1, dimensions)
+
+def scale(design, bounds):
+    """
+    Maps a design from the unit cube onto the given (low, high)
+    bounds of every dimension.
+    """
+    low, high = np.asarray(bounds, dtype=float).T
+    return low + design * (high - low)
@@ -0,0 +1,66 @@
+import numpy as np
+
+def sobol_indices(outputs, dimensions):
+    """
+    Estimates first- and total-order Sobol indices from model outputs
+    on a saltelli design, with the estimators of Saltelli et al.
+    (2010) for the first order and Jansen for the total order.
+
+    Parameters
+    ----------
+    outputs: np.ndarray
+        Output for every row of the design, in design order.
+    dimensions: int
+        Number of varied parameters.
+
+    Returns
+    -------
+    Arrays of the first- and total-order index of every parameter.
+    """
+    outputs = np.asarray(outputs, dtype=float)
+    samples = len(outputs) // (dimensions + 2)
+    blocks = outputs.reshape(dimensions + 2, samples)
+    f_A, f_B, f_AB = blocks[0], blocks[1], blocks[2:]
+    variance = np.var(np.concatenate((f_A, f_B)))
+    if variance == 0:
+        return np.zeros(dimensions), np.zeros(dimensions)
+    first = np.mean(f_B * (f_AB - f_A), axis=1) / variance
+    total = 0.5 * np.mean((f_A - f_AB)**2, axis=1) / variance
+    return first, total
+
+def elementary_effects(design, outputs, dimensions):
+    """
+    Computes Morris' elementary effects statistics from model outputs
+    on a morris design, in unit-cube coordinates.
+
+    Parameters
+    ----------
+    design: np.ndarray
+        Unit-cube design the outputs were computed on.
+    outputs: np.ndarray
+        Output for every row of the design, in design order.
+    dimensions: int
+        Number of varied parameters.
+
+    Returns
+    -------
+    Arrays of the mean, mean absolute value and standard deviation of
+    the elementary effects of every parameter.
+    """
+    design = np.asarray(design).reshape(-1, dimensions + 1, dimensions)
+    outputs = np.asarray(outputs, dtype=float).reshape(-1, dimensions + 1)
+    steps = np.diff(design, axis=1)
+    changes = np.diff(outputs, axis=1)
+    # Every step moves exactly one dimension
+    moved = np.argmax(np.abs(steps), axis=2)
+    effects = np.empty((len(design), dimensions))
+    for trajectory in range(len(design)):
+        for step, i in enumerate(moved[trajectory]):
+            effects[trajectory, i] = changes[trajectory, step]\
+                / steps[trajectory, step, i]
+    return (
+        effects.mean(axis=0),
+        np.abs(effects).mean(axis=0),
+        effects.std(axis=0, ddof=1) if len(effects) > 1
+        else np.zeros(dimensions),
+    )
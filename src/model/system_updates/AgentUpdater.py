@@ -1,12 +1,20 @@
 import numpy as np
+from Constants import Constants
 
 
 class AgentUpdater():
     """
     Contains parameter update logic for the agents.
     """
-    def __init__(self):
-        pass
+    def __init__(self, rng=np.random):
+        """
+        Parameters
+        ----------
+        rng: np.random.Generator
+            Source of the stress noise when no pre-drawn value is
+            given, the global np.random by default.
+        """
+        self.rng = rng
     
     def stress(
             self,
@@ -16,15 +24,20 @@ class AgentUpdater():
             mean=0.2,
             sigma=0.12,
             reversion=1.2,
-            prev_E_weight=1.0
+            prev_E_weight=1.0,
+            dW=None,
     ):
         """
         Models stress evolution using discrete-time (Euler-Maruyama)
         approximation of an Ornstein-Uhlenbeck process.
         S(t + dt) = S(t) + r(mu - S(t))*dt + dW*sigma
+
+        dW is drawn from the updater's rng when no pre-drawn
+        increment is given.
         """
         drift = reversion * (mean - prev_stress)
-        dW = np.random.normal(0, np.sqrt(dt))
+        if dW is None:
+            dW = self.rng.normal(0, np.sqrt(dt))
         stress = prev_stress + drift * dt + sigma * dW
         damping = np.exp(-prev_E_weight * prev_E * dt)
         stress *= damping
@@ -34,104 +47,173 @@ class AgentUpdater():
             stress = 1
         return stress
 
-    def aversive_internal_state(self, prev_state, t, params):
+    def stress_exact(
+            self,
+            dt,
+            prev_stress,
+            prev_E,
+            mean=0.2,
+            sigma=0.12,
+            reversion=1.2,
+            prev_E_weight=1.0,
+            Z=None,
+    ):
+        """
+        Models stress evolution using the exact transition of an
+        Ornstein-Uhlenbeck process, valid for any step size dt.
+        The damping by external escape strategies is folded into the
+        reversion as an extra pull towards zero, with E held constant
+        over the step:
+        dS = (r*mu - (r + w*E)*S)*dt + sigma*dW
+        S(t + dt) = m + (S(t) - m)*exp(-k*dt)
+                    + sigma*sqrt((1 - exp(-2*k*dt)) / (2*k))*Z
+        with k = r + w*E and m = r*mu/k.
+
+        Z is a standard normal draw, taken from the updater's rng when
+        no pre-drawn value is given.
+        """
+        if Z is None:
+            Z = self.rng.normal(0, 1)
+        rate = reversion + prev_E_weight * prev_E
+        if rate > 0:
+            decay = np.exp(-rate * dt)
+            long_term_mean = reversion * mean / rate
+            sd = sigma * np.sqrt((1 - decay**2) / (2 * rate))
+        else:
+            decay = 1
+            long_term_mean = 0
+            sd = sigma * np.sqrt(dt)
+        stress = long_term_mean + (prev_stress - long_term_mean) * decay + sd * Z
+        if stress < 0:
+            stress = 0
+        elif stress > 1:
+            stress = 1
+        return stress
+
+    def aversive_internal_state(self, prev_state, t, inputs, params):
         """
         Evolution equation of aversive internal state.
         dA/dt = A*f * (K - A) + (S )
 
-        params: dict
-            Dictionary containing the required parameters
-        """
-        try:
-            S = params["S"]
-            T = params["T"]
-            X = params["X"]
-            I = params["I"]
-            F = params["F"]
-            B = params["B"]
-            feedback = params["feedback"]
-            carrying_capacity = params["carrying_capacity"]
-            S_weight = params["S_weight"]
-            T_weight = params["T_weight"]
-            X_weight = params["X_weight"]
-            I_weight = params["I_weight"]
-            F_weight = params["F_weight"]
-            B_weight = params["B_weight"]
-        except KeyError as e:
-            raise Exception(f"Missing parameter {e.args[0]}"+
-                            " for aversive internal state evolution")
+        inputs: tuple
+            Values of S, T, X, I, F and B from the previous timestep
+        params: AversionParameterSet.Compiled
+            Compiled aversive internal state parameters
+        """
+        S, T, X, I, F, B = inputs
+        feedback, carrying_capacity, S_weight, T_weight, X_weight,\
+            I_weight, F_weight, B_weight = params
         new_state = feedback * prev_state * (carrying_capacity - prev_state)\
             + S_weight * S - T_weight * T - X_weight * X - I_weight * I\
                 - F_weight * F + B_weight * B
         return new_state
 
-    def urge_to_escape(self, prev_state, t, params):
+    def urge_to_escape(self, prev_state, t, inputs, params):
         """
         Evolution equation of urge to escape.
 
-        params: dict
-            Dictionary containing the required parameters
-        """
-        try:
-            A = params["A"]
-            feedback = params["feedback"]
-            A_weight = params["A_weight"]
-        except KeyError as e:
-            print(f"Missing parameter {e.args[0]}"+
-                            " for urge to escape evolution")
-            raise Exception("Terminating program")
+        inputs: tuple
+            Value of A from the previous timestep
+        params: UrgeToEscapeParameterSet.Compiled
+            Compiled urge to escape parameters
+        """
+        A, = inputs
+        feedback, A_weight = params
         new_state = -feedback * prev_state  + A_weight * A
         return new_state
 
 
-    def sigmoid(self, prev_state, t, params):
+    def sigmoid(self, prev_state, t, inputs, params):
         """
         Discretized evolution equation of suicidal thoughts
         and escape behaviors.
         Uses a simple feedback model with given weight of new
         state vs old state.
 
-        params: dict
-            Dictionary containing the required parameters
-        """
-        try:
-            U = params["U"]
-            weight_new = params["weight_new"]
-            sig_middle = params["sig_middle"]
-            sig_steepness = params["sig_steepness"]
-        except KeyError as e:
-            print(f"Missing parameter {e.args[0]}"+
-                            " for suicidal thought evolution")
-            raise Exception("Terminating program")
+        inputs: tuple
+            Value of U from the previous timestep
+        params: SuicidalParameterSet.Compiled or
+                EscapeBehaviorParameterSet.Compiled
+            Compiled suicidal thought or escape behavior parameters
+        """
+        U, = inputs
+        weight_new, sig_middle, sig_steepness = params
         sigmoid = (1 / (1 + np.exp(-sig_steepness * (U - sig_middle))))
         new_state = (1 - weight_new) * prev_state  + weight_new * sigmoid
         return new_state
 
 
-    def strategy_for_escape(self, prev_state, t, params):
+    def sigmoid_rate(self, prev_state, t, inputs, params):
+        """
+        Evolution equation of the step-size independent form of the
+        sigmoid update of suicidal thoughts and escape behaviors.
+        dT/dt = r * (sigmoid(U) - T), with r = -ln(1 - weight_new) /
+        Constants.SIGMOID_STEP, so that one step of SIGMOID_STEP of
+        the exact solution equals the weight_new blend of sigmoid.
+
+        inputs: tuple
+            Value of U
+        params: SuicidalParameterSet.Compiled or
+                EscapeBehaviorParameterSet.Compiled
+            Compiled suicidal thought or escape behavior parameters
+        """
+        U, = inputs
+        weight_new, sig_middle, sig_steepness = params
+        sigmoid = (1 / (1 + np.exp(-sig_steepness * (U - sig_middle))))
+        new_state = self.relaxation_rate(weight_new) * (sigmoid - prev_state)
+        return new_state
+
+    def relaxation_rate(self, weight_new):
+        """
+        Rate of sigmoid_rate for the given weight_new. A weight_new
+        of 1 replaces the old state entirely every step, which is
+        approximated by a relaxation time of a small fraction of
+        Constants.SIGMOID_STEP.
+        """
+        weight_old = np.maximum(1 - weight_new, 1e-9)
+        return -np.log(weight_old) / Constants.SIGMOID_STEP
+
+    def sigmoid_relaxation(self, prev_state, dt, inputs, params):
+        """
+        Step-size independent form of the sigmoid update of suicidal
+        thoughts and escape behaviors. Returns the exact solution of
+        sigmoid_rate after time dt with U held constant, which for
+        dt = Constants.SIGMOID_STEP equals the weight_new blend of
+        the sigmoid update.
+
+        inputs: tuple
+            Value of U at the start of the step
+        params: SuicidalParameterSet.Compiled or
+                EscapeBehaviorParameterSet.Compiled
+            Compiled suicidal thought or escape behavior parameters
+        """
+        U, = inputs
+        weight_new, sig_middle, sig_steepness = params
+        sigmoid = (1 / (1 + np.exp(-sig_steepness * (U - sig_middle))))
+        weight_old = (1 - weight_new) ** (dt / Constants.SIGMOID_STEP)
+        new_state = weight_old * prev_state + (1 - weight_old) * sigmoid
+        return new_state
+
+
+    def strategy_for_escape(self, prev_state, t, inputs, params):
         """
         Evolution equation of external or internal escape
         strategy.
 
-        params: dict
-            Dictionary containing the required parameters
-        """
-        try:
-            A = params["A"]
-            U = params["U"]
-            feedback = params["feedback"]
-            carrying_capacity = params["carrying_capacity"]
-            A_weight = params["A_weight"]
-            U_weight = params["U_weight"]
-        except KeyError as e:
-            raise Exception(f"Missing parameter {e.args[0]}"+
-                            " for escape strategy evolution")
+        inputs: tuple
+            Values of A and U from the previous timestep
+        params: ExternalParameterSet.Compiled or
+                InternalParameterSet.Compiled
+            Compiled external or internal strategy parameters
+        """
+        A, U = inputs
+        feedback, carrying_capacity, A_weight, U_weight = params
         new_state = feedback * prev_state * (carrying_capacity - prev_state)\
             + A_weight * A - U_weight * U
         return new_state
 
 
-    def rk4_step(self, prev_state, t, dt, f, params):
+    def rk4_step(self, prev_state, t, dt, f, inputs, params):
         """
         Runge-Kutta 4 implementation that estimates the solution of
         a differential equation in time dt.
@@ -146,11 +228,15 @@ class AgentUpdater():
             Timestep size
         f: function
             Evolution equation of the to-be-approximated parameter
+        inputs: tuple
+            Values of the other agent variables the equation uses
+        params: tuple
+            Compiled parameters of the evolution equation
         """
-        k1 = f(prev_state, t, params)
-        k2 = f(prev_state + 0.5*dt*k1, t + 0.5*dt, params)
-        k3 = f(prev_state + 0.5*dt*k2, t + 0.5*dt, params)
-        k4 = f(prev_state + dt*k3, t + dt, params)
+        k1 = f(prev_state, t, inputs, params)
+        k2 = f(prev_state + 0.5*dt*k1, t + 0.5*dt, inputs, params)
+        k3 = f(prev_state + 0.5*dt*k2, t + 0.5*dt, inputs, params)
+        k4 = f(prev_state + dt*k3, t + dt, inputs, params)
         new_state = prev_state + dt * (k1 + 2*k2 + 2*k3 + k4) / 6
         if new_state > 1:
             return 2 - new_state
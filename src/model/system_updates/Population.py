@@ -0,0 +1,618 @@
+import numpy as np
+from model.parameters.DefaultParameters import DefaultParameters
+from model.system_updates.PopulationUpdater import PopulationUpdater
+from model.system_updates.StateScheduler import StateScheduler
+from model.system_updates.StateManager import STEP_TOLERANCE
+from model.system_updates.state_registry import STATE_CODES
+
+# Agent variables that are stored as population arrays
+VARIABLES = (
+    "stress",
+    "aversive_internal_state",
+    "urge_to_escape",
+    "suicidal_thought",
+    "escape_behavior",
+    "external_strat",
+    "internal_strat",
+    "total_time",
+)
+
+# Integration schemes available for stress
+STRESS_SCHEMES = ("euler", "exact")
+
+# Integrators available for the other agent variables
+INTEGRATORS = ("rk4", "adaptive", "implicit")
+
+# Agent variables that can couple social influence to the state of
+# the connected agents
+COUPLING_VARIABLES = (
+    "aversive_internal_state",
+    "suicidal_thought",
+    "escape_behavior",
+)
+
+# Parameter sets of a Parameters object, by attribute name
+PARAMETER_SETS = (
+    "stress",
+    "aversion",
+    "urge_to_escape",
+    "suicidal_thought",
+    "escape_behavior",
+    "external_strategy",
+    "internal_strategy",
+)
+
+
+def population_arrays(size):
+    """
+    Returns zeroed arrays for the agent variables, parameter tables
+    and state codes of a population of size agents, by the names
+    Population takes them in its arrays argument. Parameter tables
+    are named after their parameter set with a "_parameters" suffix.
+    """
+    parameters = DefaultParameters()
+    arrays = {name: np.zeros(size) for name in VARIABLES}
+    for set_name in PARAMETER_SETS:
+        fields = len(getattr(parameters, set_name).FIELDS)
+        arrays[f"{set_name}_parameters"] = np.zeros((fields, size))
+    arrays["state_codes"] = np.zeros(size, dtype=np.uint8)
+    return arrays
+
+
+class PopulationVariable():
+    """
+    Descriptor for an agent variable that lives in a Population array
+    once the agent is attached to one, and in the agent itself before
+    that.
+    """
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.private_name = "_" + name
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        if agent.population is None:
+            return getattr(agent, self.private_name)
+        return getattr(agent.population, self.name)[agent.population_index]
+
+    def __set__(self, agent, value):
+        if agent.population is None:
+            setattr(agent, self.private_name, value)
+        else:
+            getattr(agent.population, self.name)[agent.population_index] = value
+
+
+class Population():
+    """
+    Structure-of-arrays representation of all agents in a model.
+    Every agent variable is stored as one contiguous array, and the
+    whole population is advanced with one batched step per timestep.
+    """
+    def __init__(
+            self,
+            agents,
+            friend_graph,
+            bully_graph,
+            noise=None,
+            stress_scheme="euler",
+            stress_interval=1,
+            integrator="rk4",
+            max_dt=1/96,
+            tolerance=1e-6,
+            social_coupling=None,
+            rng=np.random,
+            arrays=None,
+    ):
+        """
+        Copies the current values and parameters of the agents into
+        population arrays and attaches the agents to them.
+
+        Parameters
+        ----------
+        agents: iterable of StandardAgent
+            Agents making up the population, in update order.
+        friend_graph: SocialGraph
+            Friend network of the agents, indexed in the same order.
+        bully_graph: SocialGraph
+            Bully network of the agents, indexed in the same order.
+        noise: WienerNoise
+            Provider of pre-drawn stress increments. If None, the
+            increments are drawn from rng every step.
+        stress_scheme: str
+            "euler" for the Euler-Maruyama stress update of
+            AgentUpdater.stress, or "exact" for the exact
+            Ornstein-Uhlenbeck transition of stress_exact.
+        stress_interval: int
+            Number of steps per stress update. Stress is held
+            constant in between and advanced over the whole interval
+            at once, which requires the exact scheme. With constant
+            coefficients this gives stress the same distribution at
+            every update as updating it each step.
+        integrator: str
+            "rk4" to update every agent with one fixed step per
+            timestep, or "adaptive" to advance each agent with
+            error-controlled steps of its own size within a
+            timestep, see advance_adaptive, or "implicit" for one
+            backward Euler step per timestep, see step_implicit.
+        max_dt: float
+            Largest step the adaptive integrator may take. Stress is
+            refreshed once per adaptive step.
+        tolerance: float
+            Absolute and relative tolerance of the adaptive
+            integrator's error per step.
+        social_coupling: str
+            Name of the agent variable, one of COUPLING_VARIABLES,
+            by which every friend and bully connection is weighted
+            each time the influence is evaluated, see
+            SocialGraph.coupled_influence. If None, influence only
+            depends on the connection weights.
+        rng: np.random.Generator
+            Source of the stress increments when there is no noise
+            provider.
+        arrays: dict
+            Preallocated arrays to hold the agent variables, parameter
+            tables and state codes, named as by population_arrays,
+            e.g. views of SharedArrays that other processes read. The
+            population writes its values into them at the end of
+            every step. If None, the population allocates its own.
+        """
+        if stress_scheme not in STRESS_SCHEMES:
+            raise ValueError(f"Unknown stress scheme {stress_scheme}")
+        if stress_interval < 1 or \
+          (stress_interval > 1 and stress_scheme != "exact"):
+            raise ValueError("A stress interval of more than one step"
+                             + " requires the exact stress scheme")
+        if social_coupling is not None and \
+          social_coupling not in COUPLING_VARIABLES:
+            raise ValueError(f"Unknown social coupling {social_coupling}")
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Unknown integrator {integrator}")
+        if integrator == "adaptive" and \
+          (stress_scheme != "exact" or stress_interval != 1):
+            raise ValueError("The adaptive integrator requires the exact"
+                             + " stress scheme with an interval of one step")
+        if integrator == "implicit" and stress_scheme != "exact":
+            raise ValueError("The implicit integrator requires the exact"
+                             + " stress scheme")
+        self.agents = list(agents)
+        self.size = len(self.agents)
+        self.updater = PopulationUpdater(rng)
+        self.noise = noise
+        self.stress_scheme = stress_scheme
+        self.stress_interval = stress_interval
+        self.integrator = integrator
+        self.max_dt = max_dt
+        self.tolerance = tolerance
+        self.social_coupling = social_coupling
+        self.steps = 0
+        self.arrays = arrays
+
+        for name in VARIABLES:
+            values = [getattr(agent, name) for agent in self.agents]
+            setattr(self, name,
+                    self.hold(name, np.array(values, dtype=float)))
+        # Agents share a clock, kept as a scalar for the scheduler
+        self.time = float(self.total_time.max()) if self.size else 0.0
+
+        self.friend_graph = friend_graph
+        self.bully_graph = bully_graph
+
+        # One parameter table per equation, with a row per parameter
+        # in compiled order and a column per agent
+        self.parameters = {}
+        for set_name in PARAMETER_SETS:
+            fields = len(getattr(self.agents[0].parameters, set_name).FIELDS) \
+                if self.agents else 0
+            self.parameters[set_name] = self.hold(
+                f"{set_name}_parameters", np.zeros((fields, self.size)))
+
+        for index, agent in enumerate(self.agents):
+            agent.population = self
+            agent.population_index = index
+            self.load_parameters(agent)
+
+        self.scheduler = StateScheduler(self.agents)
+        self.state_codes = self.hold("state_codes", np.array([
+            STATE_CODES[agent.state_manager.state.to_string()]
+            for agent in self.agents
+        ], dtype=np.uint8))
+        # Proposed size of each agent's next adaptive step
+        self.step_sizes = np.full(self.size, max_dt)
+
+    @property
+    def friend_influence(self):
+        """
+        Saturated mean social influence of every agent's friends,
+        from the friends' current state if coupled.
+        """
+        if self.social_coupling is None:
+            return self.friend_graph.influence()
+        return self.friend_graph.coupled_influence(self.coupling_values())
+
+    @property
+    def bully_influence(self):
+        """
+        Saturated mean social influence of every agent's bullies,
+        from the bullies' current state if coupled.
+        """
+        if self.social_coupling is None:
+            return self.bully_graph.influence()
+        return self.bully_graph.coupled_influence(self.coupling_values())
+
+    def coupling_values(self):
+        """
+        Returns the values of the social coupling variable of every
+        agent the social graphs point to. These are the population's
+        own agents, unless the graphs point into a larger network, as
+        for the shards of a ShardedSimulation.
+        """
+        return getattr(self, self.social_coupling)
+
+    def get_checkpoint(self):
+        """
+        Returns the arrays and metadata of the population that are not
+        kept by its agents: the schedule, the clock and the adaptive
+        step sizes.
+        """
+        arrays, meta = self.scheduler.get_checkpoint()
+        arrays["step_sizes"] = self.step_sizes.copy()
+        meta.update(time=self.time, steps=self.steps)
+        if self.noise is not None:
+            meta["noise"] = self.noise.get_checkpoint()[1]
+        return arrays, meta
+
+    def load_checkpoint(self, arrays, meta):
+        """
+        Restores the population from get_checkpoint output, after its
+        agents have been restored.
+        """
+        self.scheduler.load_checkpoint(arrays, meta)
+        self.step_sizes = np.array(arrays["step_sizes"], dtype=float)
+        self.time = meta["time"]
+        self.steps = meta["steps"]
+        if self.noise is not None:
+            self.noise.load_checkpoint({}, meta["noise"])
+        for index, agent in enumerate(self.agents):
+            self.load_parameters(agent)
+            self.state_codes[index] = \
+                STATE_CODES[agent.state_manager.state.to_string()]
+
+    def load_parameters(self, agent):
+        """
+        Copies the current compiled parameters of an agent into the
+        population parameter tables.
+        """
+        index = agent.population_index
+        compiled = agent.parameters.compiled
+        for set_name, table in self.parameters.items():
+            table[:, index] = compiled[set_name]
+
+    def step(self, dt):
+        """
+        Updates all agents over timestep dt, then moves the agents
+        whose state has run out to their following state.
+        """
+        if self.integrator == "adaptive":
+            self.advance_adaptive(dt)
+        else:
+            if self.integrator == "implicit":
+                self.step_implicit(dt)
+            else:
+                self.step_rk4(dt)
+            self.transition_states(dt)
+        if self.arrays is not None:
+            for name in VARIABLES:
+                setattr(self, name, self.hold(name, getattr(self, name)))
+        self.steps += 1
+
+    def hold(self, name, values):
+        """
+        Returns the array to keep values in: the preallocated array of
+        that name, with values copied into it, or values themselves
+        if the population has no preallocated arrays.
+        """
+        if self.arrays is None:
+            return values
+        array = self.arrays[name]
+        if array is not values:
+            array[...] = values
+        return array
+
+    def step_rk4(self, dt):
+        """
+        Updates all agents over timestep dt with the update equations
+        of StandardAgent.update_agent.
+        """
+        params = self.parameters
+        t = self.total_time
+
+        # Update stress
+        new_S = self.update_stress(dt)
+
+        # Update aversive internal state
+        new_A = self.updater.rk4_step(
+            self.aversive_internal_state,
+            t,
+            dt,
+            self.updater.aversive_internal_state,
+            (
+                self.stress,
+                self.suicidal_thought,
+                self.escape_behavior,
+                self.internal_strat,
+                self.friend_influence,
+                self.bully_influence,
+            ),
+            params["aversion"],
+        )
+
+        # Update urge to escape
+        new_U = self.updater.rk4_step(
+            self.urge_to_escape,
+            t,
+            dt,
+            self.updater.urge_to_escape,
+            (self.aversive_internal_state,),
+            params["urge_to_escape"],
+        )
+
+        # Update suicidal thought
+        new_T = self.updater.sigmoid(
+            self.suicidal_thought,
+            t,
+            (self.urge_to_escape,),
+            params["suicidal_thought"],
+        )
+
+        # Update escape behavior
+        new_X = self.updater.sigmoid(
+            self.escape_behavior,
+            t,
+            (self.urge_to_escape,),
+            params["escape_behavior"],
+        )
+
+        # Update external strategy
+        new_E = self.updater.rk4_step(
+            self.external_strat,
+            t,
+            dt,
+            self.updater.strategy_for_escape,
+            (self.aversive_internal_state, self.urge_to_escape),
+            params["external_strategy"],
+        )
+
+        # Update internal strategy
+        new_I = self.updater.rk4_step(
+            self.internal_strat,
+            t,
+            dt,
+            self.updater.strategy_for_escape,
+            (self.aversive_internal_state, self.urge_to_escape),
+            params["internal_strategy"],
+        )
+
+        self.stress = new_S
+        self.aversive_internal_state = new_A
+        self.urge_to_escape = new_U
+        self.suicidal_thought = new_T
+        self.escape_behavior = new_X
+        self.external_strat = new_E
+        self.internal_strat = new_I
+        self.total_time = self.total_time + dt
+        self.time += dt
+
+    def step_implicit(self, dt):
+        """
+        Updates all agents over timestep dt with one backward Euler
+        step of the coupled equations for A, U, E, I, T and X, after
+        advancing stress with its exact transition. T and X use the
+        step-size independent form of the sigmoid update, so larger
+        timesteps keep the behavior of the one-minute blend, and the
+        stiff sigmoid and logistic terms do not limit the step size.
+        """
+        new_S = self.update_stress(dt)
+        inputs = (new_S, self.friend_influence, self.bully_influence)
+        y = np.array([
+            self.aversive_internal_state,
+            self.urge_to_escape,
+            self.external_strat,
+            self.internal_strat,
+            self.suicidal_thought,
+            self.escape_behavior,
+        ])
+        new_y = self.updater.backward_euler_step(
+            y,
+            dt,
+            lambda y: self.updater.coupled_rates(y, inputs, self.parameters),
+            lambda y: self.updater.coupled_jacobian(y, inputs, self.parameters),
+        )
+
+        self.stress = new_S
+        self.aversive_internal_state = self.updater.reflect(new_y[0])
+        self.urge_to_escape = self.updater.reflect(new_y[1])
+        self.external_strat = self.updater.reflect(new_y[2])
+        self.internal_strat = self.updater.reflect(new_y[3])
+        self.suicidal_thought = new_y[4]
+        self.escape_behavior = new_y[5]
+        self.total_time = self.total_time + dt
+        self.time += dt
+
+    def update_stress(self, dt):
+        """
+        Returns the stress of all agents after timestep dt, using the
+        population's stress scheme and interval.
+        """
+        mean, sigma, reversion, E_weight = self.parameters["stress"]
+        if self.stress_scheme == "euler":
+            return self.updater.stress(
+                dt=dt,
+                prev_stress=self.stress,
+                prev_E=self.external_strat,
+                mean=mean,
+                sigma=sigma,
+                reversion=reversion,
+                prev_E_weight=E_weight,
+                dW=None if self.noise is None else self.noise.increments(dt),
+            )
+        # Hold stress until the last step of the interval
+        if (self.steps + 1) % self.stress_interval != 0:
+            return self.stress
+        return self.updater.stress_exact(
+            dt=dt * self.stress_interval,
+            prev_stress=self.stress,
+            prev_E=self.external_strat,
+            mean=mean,
+            sigma=sigma,
+            reversion=reversion,
+            prev_E_weight=E_weight,
+            Z=None if self.noise is None else self.noise.standard_normal(),
+        )
+
+    def transition_states(self, dt):
+        """
+        Moves every agent whose scheduled transition time has passed
+        after a step of size dt to its following state, and schedules
+        the end of that state. As in StateManager.update_state, a state
+        ends at the step it is left over by at most STEP_TOLERANCE of
+        the step, and due agents move on in agent order, as the
+        per-agent path moves them, so draws of the following states'
+        lengths go to the same agents.
+        """
+        due = self.scheduler.pop_due(self.time + STEP_TOLERANCE * dt)
+        for end_time, index in sorted(due, key=lambda pair: pair[1]):
+            self.transition_agent(index, end_time, self.time)
+
+    def transition_agent(self, index, end_time, time):
+        """
+        Moves an agent whose state ended at end_time to its following
+        state, starting at the given time.
+        """
+        agent = self.agents[index]
+        manager = agent.state_manager
+        manager.state.time_left = end_time - time
+        manager.transition(time, agent.parameters)
+        self.state_codes[index] = STATE_CODES[manager.state.to_string()]
+        self.load_parameters(agent)
+        self.scheduler.schedule(time + manager.state.time_left, index)
+
+    def advance_adaptive(self, dt):
+        """
+        Advances every agent over time dt with error-controlled steps
+        of its own size. A, U, E and I are integrated together with
+        embedded Cash-Karp steps, which are cut short at the end of
+        the agent's current state so that no step straddles a change
+        of parameters. Over each accepted step, stress follows the
+        exact Ornstein-Uhlenbeck transition and suicidal thought and
+        escape behavior follow the exact solution of their relaxation
+        towards the sigmoid, with the other variables held at their
+        values at the start of the step.
+        """
+        updater = self.updater
+        params = self.parameters
+        times = self.total_time
+        end_time = self.time + dt
+
+        while True:
+            # States can end before they start, e.g. a home state after
+            # a long night, so agents move on until their state ends
+            # after their own time
+            due = self.scheduler.due_agents(times)
+            while len(due) > 0:
+                for index in due:
+                    self.transition_agent(
+                        index, self.scheduler.end_times[index], times[index])
+                due = self.scheduler.due_agents(times)
+            active = np.flatnonzero(times < end_time)
+            if len(active) == 0:
+                break
+
+            # Propose steps, snapped to state ends and the end of dt
+            t = times[active]
+            limit = np.minimum(self.scheduler.end_times[active], end_time)
+            h = np.minimum(self.step_sizes[active], self.max_dt)
+            # Steps ending within rounding of the limit are snapped too,
+            # so no vanishing step is left over
+            snapped = t + h * (1 + 1e-9) >= limit
+            h = np.where(snapped, np.maximum(limit - t, 0), h)
+
+            S = self.stress[active]
+            T = self.suicidal_thought[active]
+            X = self.escape_behavior[active]
+            F = self.friend_influence[active]
+            B = self.bully_influence[active]
+            aversion = params["aversion"][:, active]
+            urge_to_escape = params["urge_to_escape"][:, active]
+            external_strategy = params["external_strategy"][:, active]
+            internal_strategy = params["internal_strategy"][:, active]
+
+            def rates(y):
+                A, U, E, I = y
+                return np.array([
+                    updater.aversive_internal_state(
+                        A, None, (S, T, X, I, F, B), aversion),
+                    updater.urge_to_escape(U, None, (A,), urge_to_escape),
+                    updater.strategy_for_escape(
+                        E, None, (A, U), external_strategy),
+                    updater.strategy_for_escape(
+                        I, None, (A, U), internal_strategy),
+                ])
+
+            y = np.array([
+                self.aversive_internal_state[active],
+                self.urge_to_escape[active],
+                self.external_strat[active],
+                self.internal_strat[active],
+            ])
+            new_y, error = updater.cash_karp_step(y, h, rates)
+
+            # Accept steps within tolerance and adapt step sizes
+            scale = self.tolerance * (1 + np.abs(y))
+            error_ratio = np.max(np.abs(error) / scale, axis=0)
+            accepted = error_ratio <= 1
+            with np.errstate(divide="ignore"):
+                factor = np.clip(0.9 * error_ratio**-0.2, 0.2, 5)
+            proposal = h * factor
+            # Steps shortened by snapping say little about the next one
+            keep = snapped & accepted
+            proposal[keep] = np.maximum(
+                proposal[keep], self.step_sizes[active][keep])
+            self.step_sizes[active] = proposal
+
+            done = active[accepted]
+            h = h[accepted]
+            U = y[1][accepted]
+            mean, sigma, reversion, E_weight = params["stress"][:, done]
+            new_S = updater.stress_exact(
+                dt=h,
+                prev_stress=S[accepted],
+                prev_E=y[2][accepted],
+                mean=mean,
+                sigma=sigma,
+                reversion=reversion,
+                prev_E_weight=E_weight,
+                Z=None if self.noise is None
+                    else self.noise.standard_normal()[done],
+            )
+            new_T = updater.sigmoid_relaxation(
+                T[accepted], h, (U,), params["suicidal_thought"][:, done])
+            new_X = updater.sigmoid_relaxation(
+                X[accepted], h, (U,), params["escape_behavior"][:, done])
+
+            self.stress[done] = new_S
+            self.suicidal_thought[done] = new_T
+            self.escape_behavior[done] = new_X
+            self.aversive_internal_state[done] = updater.reflect(
+                new_y[0][accepted])
+            self.urge_to_escape[done] = updater.reflect(new_y[1][accepted])
+            self.external_strat[done] = updater.reflect(new_y[2][accepted])
+            self.internal_strat[done] = updater.reflect(new_y[3][accepted])
+            # Clocks never move backwards, even if rounding puts a
+            # limit just before an agent's time
+            times[done] = np.where(
+                snapped[accepted],
+                np.maximum(limit[accepted], t[accepted]),
+                t[accepted] + h)
+
+        self.time = end_time
@@ -0,0 +1,252 @@
+import warnings
+import numpy as np
+from model.system_updates.AgentUpdater import AgentUpdater
+
+
+class PopulationUpdater(AgentUpdater):
+    """
+    Contains parameter update logic for a whole population at once.
+    The evolution equations are inherited from AgentUpdater and are
+    evaluated elementwise on arrays holding one value per agent.
+    """
+    def __init__(self, rng=np.random):
+        super().__init__(rng)
+
+    def stress(
+            self,
+            dt,
+            prev_stress,
+            prev_E,
+            mean=0.2,
+            sigma=0.12,
+            reversion=1.2,
+            prev_E_weight=1.0,
+            dW=None,
+    ):
+        """
+        Models stress evolution of all agents using discrete-time
+        (Euler-Maruyama) approximation of an Ornstein-Uhlenbeck
+        process.
+        S(t + dt) = S(t) + r(mu - S(t))*dt + dW*sigma
+
+        dW is drawn from the updater's rng when no pre-drawn
+        increment is given.
+        """
+        drift = reversion * (mean - prev_stress)
+        if dW is None:
+            dW = self.rng.normal(0, np.sqrt(dt), size=len(prev_stress))
+        stress = prev_stress + drift * dt + sigma * dW
+        damping = np.exp(-prev_E_weight * prev_E * dt)
+        stress *= damping
+        return np.clip(stress, 0, 1)
+
+    def stress_exact(
+            self,
+            dt,
+            prev_stress,
+            prev_E,
+            mean=0.2,
+            sigma=0.12,
+            reversion=1.2,
+            prev_E_weight=1.0,
+            Z=None,
+    ):
+        """
+        Models stress evolution of all agents using the exact
+        transition of an Ornstein-Uhlenbeck process, with the damping
+        by external escape strategies folded into the reversion.
+        See AgentUpdater.stress_exact.
+        """
+        if Z is None:
+            Z = self.rng.normal(0, 1, size=len(prev_stress))
+        rate = reversion + prev_E_weight * prev_E
+        decay = np.exp(-rate * dt)
+        # Fall back to Brownian motion where there is no reversion
+        pulled = rate > 0
+        safe_rate = np.where(pulled, rate, 1)
+        long_term_mean = np.where(pulled, reversion * mean / safe_rate, 0)
+        variance = np.where(
+            pulled, (1 - decay**2) / (2 * safe_rate), dt)
+        stress = long_term_mean + (prev_stress - long_term_mean) * decay\
+            + sigma * np.sqrt(variance) * Z
+        return np.clip(stress, 0, 1)
+
+    def rk4_step(self, prev_state, t, dt, f, inputs, params):
+        """
+        Runge-Kutta 4 implementation that estimates the solution of
+        a differential equation in time dt for every agent.
+
+        Parameters
+        ----------
+        prev_state: np.ndarray
+            Previous values of the to-be-approximated parameter
+        t: float
+            Current time
+        dt: float
+            Timestep size
+        f: function
+            Evolution equation of the to-be-approximated parameter
+        inputs: tuple
+            Arrays of the other agent variables the equation uses
+        params: np.ndarray
+            Parameter table of the evolution equation, one row per
+            parameter and one column per agent
+        """
+        k1 = f(prev_state, t, inputs, params)
+        k2 = f(prev_state + 0.5*dt*k1, t + 0.5*dt, inputs, params)
+        k3 = f(prev_state + 0.5*dt*k2, t + 0.5*dt, inputs, params)
+        k4 = f(prev_state + dt*k3, t + dt, inputs, params)
+        new_state = prev_state + dt * (k1 + 2*k2 + 2*k3 + k4) / 6
+        # Reflect at the boundaries, as in AgentUpdater.rk4_step
+        return self.reflect(new_state)
+
+    def cash_karp_step(self, y, h, f):
+        """
+        Embedded Runge-Kutta 4(5) step of Cash and Karp for a system
+        of equations, with a separate step size per agent.
+
+        Parameters
+        ----------
+        y: np.ndarray
+            Current values, one row per variable and one column per
+            agent
+        h: np.ndarray
+            Step size per agent
+        f: function
+            Returns the time derivatives of y, shaped like y
+
+        Returns
+        -------
+        The fifth order estimate of y after the step, and its
+        difference with the embedded fourth order estimate.
+        """
+        k1 = f(y)
+        k2 = f(y + h * (k1/5))
+        k3 = f(y + h * (3*k1/40 + 9*k2/40))
+        k4 = f(y + h * (3*k1/10 - 9*k2/10 + 6*k3/5))
+        k5 = f(y + h * (-11*k1/54 + 5*k2/2 - 70*k3/27 + 35*k4/27))
+        k6 = f(y + h * (1631*k1/55296 + 175*k2/512 + 575*k3/13824
+                        + 44275*k4/110592 + 253*k5/4096))
+        fifth = y + h * (37*k1/378 + 250*k3/621 + 125*k4/594
+                         + 512*k6/1771)
+        fourth = y + h * (2825*k1/27648 + 18575*k3/48384
+                          + 13525*k4/55296 + 277*k5/14336 + k6/4)
+        return fifth, fifth - fourth
+
+    def reflect(self, state):
+        """
+        Reflects values at the boundaries 0 and 1, as
+        AgentUpdater.rk4_step does.
+        """
+        return np.where(
+            state > 1,
+            2 - state,
+            np.where(state < 0, -state, state),
+        )
+
+    def coupled_rates(self, y, inputs, params):
+        """
+        Time derivatives of A, U, E, I, T and X as one system, with
+        T and X in the step-size independent form of sigmoid_rate.
+
+        Parameters
+        ----------
+        y: np.ndarray
+            Values of A, U, E, I, T and X, one row per variable and
+            one column per agent
+        inputs: tuple
+            Arrays of S, F and B
+        params: dict
+            Parameter tables by parameter set name, as kept by
+            Population
+        """
+        A, U, E, I, T, X = y
+        S, F, B = inputs
+        return np.array([
+            self.aversive_internal_state(
+                A, None, (S, T, X, I, F, B), params["aversion"]),
+            self.urge_to_escape(U, None, (A,), params["urge_to_escape"]),
+            self.strategy_for_escape(
+                E, None, (A, U), params["external_strategy"]),
+            self.strategy_for_escape(
+                I, None, (A, U), params["internal_strategy"]),
+            self.sigmoid_rate(T, None, (U,), params["suicidal_thought"]),
+            self.sigmoid_rate(X, None, (U,), params["escape_behavior"]),
+        ])
+
+    def coupled_jacobian(self, y, inputs, params):
+        """
+        Jacobian of coupled_rates with respect to y, with one 6 x 6
+        matrix per agent.
+        """
+        A, U, E, I, T, X = y
+        jacobian = np.zeros((A.shape[-1], 6, 6))
+
+        feedback, carrying_capacity, S_weight, T_weight, X_weight,\
+            I_weight, F_weight, B_weight = params["aversion"]
+        jacobian[:, 0, 0] = feedback * (carrying_capacity - 2*A)
+        jacobian[:, 0, 3] = -I_weight
+        jacobian[:, 0, 4] = -T_weight
+        jacobian[:, 0, 5] = -X_weight
+
+        feedback, A_weight = params["urge_to_escape"]
+        jacobian[:, 1, 0] = A_weight
+        jacobian[:, 1, 1] = -feedback
+
+        for row, strategy, name in ((2, E, "external_strategy"),
+                                    (3, I, "internal_strategy")):
+            feedback, carrying_capacity, A_weight, U_weight = params[name]
+            jacobian[:, row, 0] = A_weight
+            jacobian[:, row, 1] = -U_weight
+            jacobian[:, row, row] = feedback * (carrying_capacity - 2*strategy)
+
+        for row, name in ((4, "suicidal_thought"), (5, "escape_behavior")):
+            weight_new, sig_middle, sig_steepness = params[name]
+            sigmoid = (1 / (1 + np.exp(-sig_steepness * (U - sig_middle))))
+            rate = self.relaxation_rate(weight_new)
+            jacobian[:, row, 1] = rate * sig_steepness * sigmoid * (1 - sigmoid)
+            jacobian[:, row, row] = -rate
+        return jacobian
+
+    def backward_euler_step(
+            self,
+            y,
+            dt,
+            f,
+            jacobian,
+            tolerance=1e-10,
+            max_iterations=20,
+    ):
+        """
+        Backward Euler step for a system of equations, solving
+        y_new = y + dt * f(y_new) with Newton iterations for every
+        agent at once. Stable for stiff equations at any step size.
+
+        Parameters
+        ----------
+        y: np.ndarray
+            Current values, one row per variable and one column per
+            agent
+        dt: float
+            Timestep size
+        f: function
+            Returns the time derivatives of y, shaped like y
+        jacobian: function
+            Returns the Jacobian of f, one matrix per agent
+        tolerance: float
+            Largest Newton update at which the iteration stops
+        max_iterations: int
+            Number of Newton iterations after which to give up
+        """
+        new_y = y.copy()
+        identity = np.eye(len(y))
+        for _ in range(max_iterations):
+            residual = new_y - y - dt * f(new_y)
+            matrix = identity - dt * jacobian(new_y)
+            delta = np.linalg.solve(matrix, residual.T[..., None])[..., 0].T
+            new_y -= delta
+            if np.max(np.abs(delta), initial=0) < tolerance:
+                return new_y
+        warnings.warn("Backward Euler step did not converge within"
+                      + f" {max_iterations} Newton iterations")
+        return new_y
@@ -1,5 +1,10 @@
 from model.system_updates.state_registry import get_state
 
+# Fraction of a step by which a state may be left over and still end
+# at that step, so that rounding in the summed timesteps does not
+# move a transition to the next step
+STEP_TOLERANCE = 1e-6
+
 
 class StateManager():
     """
@@ -26,12 +31,26 @@ class StateManager():
         self._state_params = state_params
     
     def update_state(self, dt, time, agent_params):
+        """
+        Passes time in the current state and moves to the following
+        state once it has run out, up to STEP_TOLERANCE of the step.
+        Returns whether a transition happened.
+        """
         self._state.pass_time(dt)
-        if self._state.time_left <= 0:
-            next_state_name = self._state.following_state()
-            next_state_class = get_state(next_state_name)
-            next_state = next_state_class()
-            next_state.generate_time(time, self._state, self._state_params)
-            next_state.modify_parameters(agent_params)
-            next_state.last_state = self._state
-            self._state = next_state
+        if self._state.time_left <= STEP_TOLERANCE * dt:
+            self.transition(time, agent_params)
+            return True
+        return False
+
+    def transition(self, time, agent_params):
+        """
+        Moves to the state following the current one, starting at
+        the given time.
+        """
+        next_state_name = self._state.following_state()
+        next_state_class = get_state(next_state_name)
+        next_state = next_state_class()
+        next_state.generate_time(time, self._state, self._state_params)
+        next_state.apply_parameters(agent_params)
+        next_state.last_state = self._state
+        self._state = next_state
@@ -0,0 +1,100 @@
+import heapq
+import numpy as np
+
+
+class StateScheduler():
+    """
+    Keeps the time of every agent's next state transition in a
+    priority queue, so that each step only visits the agents whose
+    state has run out instead of the whole population.
+
+    The end times are also kept in an array indexed by agent, which
+    is the reference for which queue entries are still valid. Agents
+    with their own clocks, such as in adaptive integration, can be
+    checked against it directly.
+    """
+    def __init__(self, agents):
+        """
+        Schedules the end of the current state of every agent.
+
+        Parameters
+        ----------
+        agents: list of StandardAgent
+            Agents to schedule, identified by their index in the list.
+        """
+        self.end_times = np.array([
+            agent.total_time + agent.state_manager.state.time_left
+            for agent in agents
+        ], dtype=float)
+        self._rebuild()
+
+    def __len__(self):
+        return len(self.end_times)
+
+    def _discard_stale(self):
+        while self._queue and \
+          self._queue[0][0] != self.end_times[self._queue[0][1]]:
+            heapq.heappop(self._queue)
+
+    def next_time(self):
+        """
+        Returns the earliest scheduled transition time.
+        """
+        self._discard_stale()
+        return self._queue[0][0]
+
+    def pop_due(self, time):
+        """
+        Removes and returns the (transition time, index) pairs of all
+        agents whose state ends at or before the given time, in order
+        of transition time. The agents stay unscheduled until their
+        next transition is scheduled.
+        """
+        due = []
+        self._discard_stale()
+        while self._queue and self._queue[0][0] <= time:
+            end_time, index = heapq.heappop(self._queue)
+            self.end_times[index] = np.inf
+            due.append((end_time, index))
+            self._discard_stale()
+        return due
+
+    def due_agents(self, times):
+        """
+        Returns the indices of the agents whose state ends at or
+        before their own time, given one time per agent.
+        """
+        return np.flatnonzero(times >= self.end_times)
+
+    def schedule(self, time, index):
+        """
+        Schedules the next transition of an agent, replacing any
+        earlier scheduled transition.
+        """
+        self.end_times[index] = time
+        heapq.heappush(self._queue, (time, index))
+        # Rebuild the queue when replaced entries start to pile up
+        if len(self._queue) > 2 * len(self.end_times) + 64:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._queue = [
+            (end_time, index)
+            for index, end_time in enumerate(self.end_times.tolist())
+        ]
+        heapq.heapify(self._queue)
+
+    def get_checkpoint(self):
+        """
+        Returns the arrays and metadata needed to restore the
+        schedule. The queue is rebuilt from the end times, which pops
+        agents in the same order.
+        """
+        return {"end_times": self.end_times.copy()}, {}
+
+    def load_checkpoint(self, arrays, meta):
+        """
+        Restores the schedule from get_checkpoint output.
+        """
+        self.end_times = np.array(arrays["end_times"], dtype=float)
+        self._rebuild()
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class WienerNoise():
+    """
+    Provides Wiener increments for the stress process of a population.
+    Standard normal draws are generated in blocks of steps x agents
+    and handed out one step at a time through a cursor, so stress
+    updates do not need one RNG call per agent per step.
+
+    The draws come from a dedicated generator that is consumed in
+    order, which makes the increments for a given seed identical
+    regardless of the block size.
+    """
+    def __init__(self, size, seed=None, block_size=2**20):
+        """
+        Parameters
+        ----------
+        size: int
+            Number of agents receiving an increment per step.
+        seed: int or np.random.SeedSequence
+            Seed of the noise generator.
+        block_size: int
+            Approximate number of draws generated per block. The
+            number of steps per block is derived from this and the
+            number of agents.
+        """
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.block_steps = max(1, block_size // max(1, size))
+        self._block = np.empty((0, size))
+        self._cursor = 0
+        # Generator state before the current block was drawn
+        self._block_state = None
+
+    def _draw_block(self):
+        self._block_state = self.rng.bit_generator.state
+        self._block = self.rng.standard_normal((self.block_steps, self.size))
+        self._cursor = 0
+
+    def standard_normal(self):
+        """
+        Returns the next row of standard normal draws, one per agent.
+        """
+        if self._cursor >= len(self._block):
+            self._draw_block()
+        row = self._block[self._cursor]
+        self._cursor += 1
+        return row
+
+    def increments(self, dt):
+        """
+        Returns the Wiener increments dW ~ N(0, dt) for one step of
+        size dt, one per agent.
+        """
+        return np.sqrt(dt) * self.standard_normal()
+
+    def get_checkpoint(self):
+        """
+        Returns the arrays and metadata needed to continue the noise
+        exactly where it is. The current block is not stored, but
+        redrawn from the generator state it was drawn with.
+        """
+        return {}, {
+            "rng_state": self.rng.bit_generator.state,
+            "block_state": self._block_state,
+            "cursor": self._cursor,
+        }
+
+    def load_checkpoint(self, arrays, meta):
+        """
+        Restores the noise from get_checkpoint output.
+        """
+        if meta["block_state"] is None:
+            self._block = np.empty((0, self.size))
+            self._block_state = None
+        else:
+            self.rng.bit_generator.state = meta["block_state"]
+            self._draw_block()
+        self.rng.bit_generator.state = meta["rng_state"]
+        self._cursor = meta["cursor"]
@@ -6,6 +6,12 @@ from model.states.HomeState import HomeState
 
 STATE_REGISTRY = {}
 
+# Small-int codes of the states, for compact recording
+STATE_NAMES = ("sleep", "morning", "commute", "work", "home")
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+# Code of a missing state, e.g. before an agent's first state
+NO_STATE = 255
+
 def get_state(name):
     return STATE_REGISTRY[name]
 
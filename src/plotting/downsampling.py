@@ -0,0 +1,117 @@
+import numpy as np
+
+def minmax_indices(y, buckets):
+    """
+    Returns the sorted indices of the first, smallest, largest and
+    last point of every bucket of consecutive points, so that a line
+    through them covers the same vertical range per bucket as the full
+    series. With one bucket per pixel column the plotted line looks
+    the same as the full series.
+
+    Parameters
+    ----------
+    y: np.ndarray
+        Values of the series.
+    buckets: int
+        Number of buckets to divide the series into.
+    """
+    size = len(y)
+    if size <= 4 * buckets:
+        return np.arange(size)
+    bucket_size = -(-size // buckets)
+    padded = np.full(buckets * bucket_size, np.nan)
+    padded[:size] = y
+    rows = padded.reshape(buckets, bucket_size)
+    # Buckets at the end may be entirely padding
+    filled = ~np.all(np.isnan(rows), axis=1)
+    rows = rows[filled]
+    starts = np.flatnonzero(filled) * bucket_size
+    indices = np.concatenate((
+        starts,
+        starts + np.nanargmin(rows, axis=1),
+        starts + np.nanargmax(rows, axis=1),
+        np.minimum(starts + bucket_size, size) - 1,
+    ))
+    return np.unique(indices)
+
+def lttb_indices(x, y, threshold):
+    """
+    Returns the sorted indices of the points kept by the
+    Largest-Triangle-Three-Buckets algorithm of Steinarsson (2013),
+    which keeps the first and last point and, from every bucket in
+    between, the point forming the largest triangle with the point
+    kept from the previous bucket and the mean of the next bucket.
+
+    Parameters
+    ----------
+    x: np.ndarray
+        Ascending positions of the series.
+    y: np.ndarray
+        Values of the series.
+    threshold: int
+        Number of points to keep.
+    """
+    size = len(y)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0] = 0
+    kept[-1] = size - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+    return kept
+
+def downsample(x, y, points, method="minmax"):
+    """
+    Returns x and y reduced to about the given number of points,
+    keeping their extrema. Missing values are dropped first.
+
+    Parameters
+    ----------
+    x: np.ndarray
+        Ascending positions of the series.
+    y: np.ndarray
+        Values of the series.
+    points: int
+        Number of points to keep, e.g. the width of the plot in
+        pixels.
+    method: str
+        "minmax" for the first, minimum, maximum and last point per
+        bucket, see minmax_indices, or "lttb", see lttb_indices.
+    """
+    present = ~np.isnan(y)
+    x, y = x[present], y[present]
+    if method == "minmax":
+        indices = minmax_indices(y, max(1, points // 4))
+    elif method == "lttb":
+        indices = lttb_indices(x, y, points)
+    else:
+        raise ValueError(f"Unknown downsampling method {method}")
+    return x[indices], y[indices]
+
+def run_lengths(times, labels, end_time=None):
+    """
+    Returns the start times, end times and labels of the runs of
+    equal consecutive labels. Each run ends where the next starts,
+    and the last at end_time, or the last time if None.
+    """
+    labels = np.asarray(labels)
+    if len(labels) == 0:
+        return np.empty(0), np.empty(0), labels
+    starts = np.concatenate(
+        ([0], np.flatnonzero(labels[1:] != labels[:-1]) + 1))
+    start_times = times[starts]
+    end_times = np.append(
+        start_times[1:], times[-1] if end_time is None else end_time)
+    return start_times, end_times, labels[starts]
@@ -0,0 +1,214 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from plotting.downsampling import downsample, run_lengths
+
+# Plotted agent variables, by column name
+SERIES = {
+    "Stress": "S",
+    "Aversive Internal State": "A",
+    "Urge to Escape": "U",
+    "Suicidal Thought": "T",
+    "Escape Behavior": "X",
+    "External-Focused Change": "E",
+    "Internal-Focused Change": "I",
+}
+
+STATE_PALETTE = {
+    "sleep": "navy",
+    "morning": "orange",
+    "commute": "green",
+    "work": "brown",
+    "home": "purple",
+}
+
+# Size of the figures in inches, and their resolution
+FIGSIZE = (12, 6)
+DPI = 100
+
+
+def agent_arrays(agent_df):
+    """
+    Returns the columns of one agent's DataFrame as arrays, as taken
+    by plot_agent.
+    """
+    arrays = {"Time": agent_df["Time"].to_numpy(dtype=float)}
+    for column in SERIES:
+        if column in agent_df:
+            arrays[column] = agent_df[column].to_numpy(dtype=float)
+    if "State" in agent_df:
+        arrays["State"] = agent_df["State"].to_numpy(dtype=object)
+    return arrays
+
+
+def split_agents(agent_df):
+    """
+    Yields the agent ID, type and arrays of every agent in a
+    DataFrame indexed by step and agent ID, splitting it once instead
+    of selecting every agent separately.
+    """
+    agent_df = agent_df.sort_index(level=["AgentID", "Step"])
+    ids = agent_df.index.get_level_values("AgentID").to_numpy()
+    starts = np.concatenate(([0], np.flatnonzero(ids[1:] != ids[:-1]) + 1))
+    stops = np.append(starts[1:], len(ids))
+    columns = agent_arrays(agent_df)
+    types = agent_df["Type"].to_numpy()
+    for start, stop in zip(starts, stops):
+        yield (
+            ids[start].item(),
+            types[start],
+            {name: values[start:stop] for name, values in columns.items()},
+        )
+
+
+def plot_agent(arrays, agent_id, label=None, path=None, method="minmax"):
+    """
+    Plot continuous parameters above a categorical state timeline.
+    X-axis shows time of day (00:00–24:00) repeating for each day.
+    Every series is downsampled to the width of the figure in pixels,
+    keeping its extrema, and the timeline is drawn as one bar per run
+    of equal states. Saves the figure to path if given, and shows it
+    otherwise.
+
+    Parameters
+    ----------
+    arrays: dict
+        Time, variable and State columns of one agent, see
+        agent_arrays.
+    agent_id: int
+        ID of the agent, for the title.
+    label: str
+        Type of the agent, for the title.
+    path: str or Path
+        File to save the figure to.
+    method: str
+        Downsampling method, "minmax" or "lttb". See downsample.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    import matplotlib.ticker as mticker
+
+    time = arrays["Time"]
+    pixels = FIGSIZE[0] * DPI
+
+    # --- Create figure with two stacked subplots ---
+    fig, (ax_params, ax_state) = plt.subplots(
+        2, 1, figsize=FIGSIZE, dpi=DPI,
+        gridspec_kw={"height_ratios": [3, 1]},
+        sharex=True
+    )
+
+    # --- Plot continuous parameters (absolute days) ---
+    for column, short_name in SERIES.items():
+        if column in arrays:
+            x, y = downsample(time, arrays[column], pixels, method)
+            ax_params.plot(x, y, label=short_name)
+
+    ax_params.set_ylim(0, 1)
+    ax_params.set_ylabel("Value")
+    ax_params.set_title(f"{label} Agent {agent_id} - Parameters and State Timeline")
+    ax_params.legend(loc="upper right")
+
+    # --- Plot state timeline ---
+    y_center = 0.5
+    bar_height = 0.2
+    if "State" in arrays:
+        present = arrays["State"] == arrays["State"]
+        starts, ends, states = run_lengths(
+            time[present], arrays["State"][present], time[-1])
+        for state, color in STATE_PALETTE.items():
+            selected = states == state
+            if not selected.any():
+                continue
+            bars = np.column_stack(
+                (starts[selected], ends[selected] - starts[selected]))
+            ax_state.broken_barh(bars, (y_center - bar_height / 2, bar_height), facecolors=color)
+
+    # --- Format X-axis as time-of-day ---
+    def time_of_day_formatter(x, pos):
+        hour = int((x % 1) * 24)
+        return f"{hour:02d}:00"
+
+    ax_params.xaxis.set_major_formatter(mticker.FuncFormatter(time_of_day_formatter))
+    ax_state.xaxis.set_major_formatter(mticker.FuncFormatter(time_of_day_formatter))
+    ax_state.set_yticks([])
+    ax_state.set_xlabel("Time of Day")
+    ax_state.set_xlim(time.min(), time.max())
+
+    # --- Vertical lines to mark day boundaries ---
+    max_day = int(time.max()) + 1
+    for d in range(max_day):
+        ax_state.axvline(x=d, color="red", alpha=1, linestyle="--")
+
+    # --- Legend for states ---
+    legend_handles = [Patch(facecolor=color, label=state) for state, color in STATE_PALETTE.items()]
+    ax_state.legend(handles=legend_handles, loc="upper center", bbox_to_anchor=(0.5, 1.3), ncol=len(STATE_PALETTE), frameon=False)
+
+    plt.tight_layout()
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path)
+        plt.close(fig)
+
+
+def plot_combined(agent_df, agent_id, label=None, path=None):
+    """
+    Plots one agent's DataFrame, indexed by step, with plot_agent.
+    """
+    plot_agent(agent_arrays(agent_df), agent_id, label=label, path=path)
+
+
+def render_agent(arrays, agent_id, label, path, method="minmax"):
+    """
+    Renders one agent to a file without a display, in a worker
+    process.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    plot_agent(arrays, agent_id, label=label, path=path, method=method)
+    return path
+
+
+def first_of_types(agents):
+    """
+    Yields only the first of the agents yielded by split_agents of
+    every type.
+    """
+    seen_types = set()
+    for agent_id, label, arrays in agents:
+        if label not in seen_types:
+            seen_types.add(label)
+            yield agent_id, label, arrays
+
+
+def render_agents(agents, directory, workers=None, method="minmax"):
+    """
+    Renders agents to PNG files in a directory, spread over a pool of
+    worker processes. Returns the paths of the files.
+
+    Parameters
+    ----------
+    agents: iterable
+        Agent ID, type and arrays of every agent to render, as yielded
+        by split_agents or AgentColumns.iter_agents.
+    directory: str or Path
+        Directory to write <type>_agent_<id>.png files to.
+    workers: int
+        Number of worker processes. If 1, renders in the current
+        process. If None, one per CPU.
+    method: str
+        Downsampling method, "minmax" or "lttb".
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tasks = []
+    for agent_id, label, arrays in agents:
+        path = directory / f"{label}_agent_{agent_id}.png"
+        tasks.append((arrays, agent_id, label, path))
+    arguments = list(zip(*tasks)) + [[method] * len(tasks)] \
+        if tasks else [[]] * 5
+    if workers == 1:
+        return list(map(render_agent, *arguments))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_agent, *arguments))
@@ -0,0 +1,56 @@
+import numpy as np
+from model.accuracy.metrics import ACCURACY_VARIABLES
+
+
+def plot_work_precision(results, metric="rmse", path=None):
+    """
+    Plots the work-precision diagram of every compared variable: the
+    error of every mode against its wall time, both on log scales.
+    Modes towards the lower left are both cheap and accurate. The
+    wall time of the reference is marked by a vertical line. Saves
+    the figure to path if given, and shows it otherwise.
+
+    Parameters
+    ----------
+    results: dict
+        Output of AccuracyHarness.run.
+    metric: str
+        Error of the y-axis, e.g. "rmse", "max", "final_rmse",
+        "mean_bias", "wasserstein" or "ks".
+    path: str or Path
+        File to save the figure to.
+    """
+    import matplotlib
+    if path is not None:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    variables = list(ACCURACY_VARIABLES)
+    fig, axes = plt.subplots(
+        1, len(variables), figsize=(4 * len(variables), 4), sharex=True)
+    modes = results["modes"]
+    colors = plt.cm.tab10(np.arange(len(modes)) % 10)
+    for ax, variable in zip(axes, variables):
+        for mode, color in zip(modes, colors):
+            error = mode["variables"][variable][metric]
+            marker = "o" if mode["common_noise"] else "x"
+            # Errors of exactly zero cannot be drawn on a log scale
+            ax.scatter(mode["seconds"], max(error, 1e-16), color=color,
+                       marker=marker, label=mode["name"])
+        ax.axvline(results["reference"]["seconds"], color="gray",
+                   linestyle="--", label="reference")
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_title(f"{variable}: {ACCURACY_VARIABLES[variable]}")
+        ax.set_xlabel("Wall time (s)")
+    axes[0].set_ylabel(metric)
+    handles, labels = axes[0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc="lower center", ncol=4, frameon=False)
+    fig.suptitle(f"{results['agents']} agents, {results['days']:g} days,"
+                 + f" {results['replicates']} replicate(s)")
+    fig.tight_layout(rect=(0, 0.15, 1, 1))
+    if path is None:
+        plt.show()
+    else:
+        fig.savefig(path)
+        plt.close(fig)
@@ -0,0 +1,77 @@
+import argparse
+import json
+from pathlib import Path
+
+
+def parse_args(argv=None):
+    from model.accuracy.AccuracyHarness import ACCURACY_MODES
+
+    parser = argparse.ArgumentParser(
+        description="Compares the accuracy and wall time of fast"
+                    + " simulation modes with the per-agent reference.")
+    parser.add_argument("-n", "--agents", type=int, default=100,
+                        help="Number of agents (default: 100)")
+    parser.add_argument("-d", "--days", type=float, default=2,
+                        help="Number of days to model (default: 2)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the replicates")
+    parser.add_argument("-r", "--replicates", type=int, default=1,
+                        help="Number of seeds per mode (default: 1)")
+    parser.add_argument("--modes", nargs="+", choices=list(ACCURACY_MODES),
+                        default=None, metavar="MODE",
+                        help="Modes to compare (default: all of "
+                             + ", ".join(f'"{mode}"' for mode in ACCURACY_MODES)
+                             + ")")
+    parser.add_argument("--interval", type=int, default=60,
+                        help="Minutes between compared recordings"
+                             + " (default: 60)")
+    parser.add_argument("-o", "--output", type=Path,
+                        default=Path("output") / "accuracy.json",
+                        help="Results file (default: output/accuracy.json)")
+    parser.add_argument("--plot", type=Path, default=None,
+                        help="File to save the work-precision diagram to")
+    parser.add_argument("--metric", default="rmse",
+                        choices=["rmse", "max", "final_rmse", "mean_bias",
+                                 "wasserstein", "ks"],
+                        help="Error shown in the diagram (default: rmse)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from model.accuracy.AccuracyHarness import AccuracyHarness, ACCURACY_MODES
+    from model.accuracy.metrics import ACCURACY_VARIABLES
+
+    args = parse_args(argv)
+    modes = None if args.modes is None \
+        else {name: ACCURACY_MODES[name] for name in args.modes}
+    harness = AccuracyHarness(
+        n=args.agents,
+        days=args.days,
+        modes=modes,
+        replicates=args.replicates,
+        seed=args.seed,
+        interval=args.interval,
+    )
+    results = harness.run()
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    print(f"reference: {results['reference']['seconds']:.3f} s")
+    for mode in results["modes"]:
+        errors = ", ".join(
+            f"{variable} {mode['variables'][variable][args.metric]:.2e}"
+            for variable in ACCURACY_VARIABLES)
+        print(f"{mode['name']}: {mode['seconds']:.3f} s"
+              + f" (x{mode['speedup']:.1f}), {args.metric} {errors}")
+
+    if args.plot is not None:
+        from plotting.work_precision import plot_work_precision
+
+        args.plot.parent.mkdir(parents=True, exist_ok=True)
+        plot_work_precision(results, args.metric, args.plot)
+
+
+if __name__=="__main__":
+    main()
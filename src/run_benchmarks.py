@@ -0,0 +1,99 @@
+import argparse
+from pathlib import Path
+
+
+def parse_args(argv=None):
+    from benchmarks.suite import SCALING_AGENTS, SCALING_DAYS, PER_AGENT_LIMIT
+
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the model and saves the results as JSON.")
+    parser.add_argument("-o", "--output", type=Path,
+                        default=Path("output") / "benchmarks.json",
+                        help="Results file (default: output/benchmarks.json)")
+    parser.add_argument("--skip-micro", action="store_true",
+                        help="Do not run the microbenchmarks")
+    parser.add_argument("--micro", nargs="+", default=None,
+                        help="Names of the microbenchmarks to run"
+                             + " (default: all)")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Timed repeats per microbenchmark (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Minimum seconds per repeat (default: 0.2)")
+    parser.add_argument("--skip-scaling", action="store_true",
+                        help="Do not run the end-to-end scaling curves")
+    parser.add_argument("--agents", type=int, nargs="+",
+                        default=list(SCALING_AGENTS),
+                        help="Agent counts of the scaling curve over agents")
+    parser.add_argument("--days", type=float, nargs="+",
+                        default=list(SCALING_DAYS),
+                        help="Modelled days of the scaling curve over days")
+    parser.add_argument("--agents-days", type=float, default=0.25,
+                        help="Modelled days per run of the curve over"
+                             + " agents (default: 0.25)")
+    parser.add_argument("--days-agents", type=int, default=100,
+                        help="Agents per run of the curve over days"
+                             + " (default: 100)")
+    parser.add_argument("--per-agent-limit", type=int,
+                        default=PER_AGENT_LIMIT,
+                        help="Largest agent count run without --vectorized"
+                             + f" (default: {PER_AGENT_LIMIT})")
+    parser.add_argument("--scaling-repeats", type=int, default=3,
+                        help="Runs per point of the scaling curves, of"
+                             + " which the fastest counts (default: 3)")
+    parser.add_argument("--compare", type=Path, default=None,
+                        help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Slowdown fraction reported as a regression,"
+                             + " if also beyond the slowest earlier repeat"
+                             + " (default: 0.1)")
+    return parser.parse_args(argv)
+
+
+def print_results(results):
+    for result in results:
+        params = ", ".join(f"{key}={value}"
+                           for key, value in result["params"].items())
+        line = f"{result['name']}({params}): {result['seconds']:.3e} s"
+        if "agent_steps_per_second" in result:
+            line += f", {result['agent_steps_per_second']:.3e} agent steps/s"
+        print(line)
+
+
+def print_comparison(rows):
+    for row in rows:
+        params = ", ".join(f"{key}={value}"
+                           for key, value in row["params"].items())
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['name']}({params}): {row['baseline_seconds']:.3e} s"
+              + f" -> {row['seconds']:.3e} s (x{row['ratio']:.2f},"
+              + f" noise {100 * row['noise']:.0f}%){flag}")
+
+
+def main(argv=None):
+    from benchmarks.results import compare, read_results, write_results
+    from benchmarks.suite import run_micro, run_scaling
+
+    args = parse_args(argv)
+    results = []
+    if not args.skip_micro:
+        results += run_micro(args.micro, args.repeats, args.min_time)
+    if not args.skip_scaling:
+        results += run_scaling(
+            args.agents, args.days, args.agents_days, args.days_agents,
+            per_agent_limit=args.per_agent_limit,
+            repeats=args.scaling_repeats,
+        )
+    print_results(results)
+    write_results(args.output, results)
+
+    if args.compare is not None:
+        rows = compare(read_results(args.compare), read_results(args.output),
+                       args.threshold)
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__=="__main__":
+    raise SystemExit(main())
@@ -1,129 +1,242 @@
-from model.SuicideModel import SuicideModel
-import seaborn as sns
-import matplotlib.pyplot as plt
-from matplotlib.patches import Patch
-import matplotlib.ticker as mticker
-import numpy as np
-from tqdm import trange
+import argparse
 from pathlib import Path
-import pandas as pd
+from tqdm import trange
+
+# Output formats, by file extension
+OUTPUT_FORMATS = {".csv": "csv", ".pkl": "pickle", ".columns": "columns"}
 
 
-def plot_combined(agent_df, agent_id, label=None):
+def select_agents(data, all_agents=False):
     """
-    Plot continuous parameters above a categorical state timeline.
-    X-axis shows time of day (00:00–24:00) repeating for each day.
+    Yields the agent ID, type and arrays of every agent, or of the
+    first agent of every type, from a DataFrame or AgentColumns.
     """
-    # --- Prepare state data ---
-    state_df = agent_df[["Time", "State"]].reset_index(drop=True)
-    state_df = state_df[state_df["State"].ne(state_df["State"].shift())].reset_index(drop=True)
-    state_df["End"] = state_df["Time"].shift(-1)
-    state_df.loc[state_df.index[-1], "End"] = agent_df["Time"].iloc[-1]
-
-    state_palette = {
-        "sleep": "navy",
-        "morning": "orange",
-        "commute": "green",
-        "work": "brown",
-        "home": "purple",
-    }
+    import pandas as pd
+    from model.recording.AgentColumns import AgentColumns
+    from plotting.trajectories import first_of_types, split_agents
 
-    # --- Create figure with two stacked subplots ---
-    fig, (ax_params, ax_state) = plt.subplots(
-        2, 1, figsize=(12, 6),
-        gridspec_kw={"height_ratios": [3, 1]},
-        sharex=True
-    )
-
-    # --- Plot continuous parameters (absolute days) ---
-    sns.lineplot(data=agent_df, x="Time", y="Stress", ax=ax_params, label="S")
-    sns.lineplot(data=agent_df, x="Time", y="Aversive Internal State", ax=ax_params, label="A")
-    sns.lineplot(data=agent_df, x="Time", y="Urge to Escape", ax=ax_params, label="U")
-    sns.lineplot(data=agent_df, x="Time", y="Suicidal Thought", ax=ax_params, label="T")
-    sns.lineplot(data=agent_df, x="Time", y="Escape Behavior", ax=ax_params, label="X")
-    sns.lineplot(data=agent_df, x="Time", y="External-Focused Change", ax=ax_params, label="E")
-    sns.lineplot(data=agent_df, x="Time", y="Internal-Focused Change", ax=ax_params, label="I")
-
-    ax_params.set_ylim(0, 1)
-    ax_params.set_ylabel("Value")
-    ax_params.set_title(f"{label} Agent {agent_id} - Parameters and State Timeline")
-    ax_params.legend(loc="upper right")
-
-    # --- Plot state timeline ---
-    y_center = 0.5
-    bar_height = 0.2
-
-    for state, color in state_palette.items():
-        subset = state_df[state_df["State"] == state]
-        if subset.empty:
-            continue
-        bars = [(row.Time, row.End - row.Time) for row in subset.itertuples()]
-        ax_state.broken_barh(bars, (y_center - bar_height / 2, bar_height), facecolors=color)
-
-    # --- Format X-axis as time-of-day ---
-    def time_of_day_formatter(x, pos):
-        hour = int((x % 1) * 24)
-        return f"{hour:02d}:00"
-
-    ax_params.xaxis.set_major_formatter(mticker.FuncFormatter(time_of_day_formatter))
-    ax_state.xaxis.set_major_formatter(mticker.FuncFormatter(time_of_day_formatter))
-    ax_state.set_yticks([])
-    ax_state.set_xlabel("Time of Day")
-    ax_state.set_xlim(agent_df["Time"].min(), agent_df["Time"].max())
-
-    # --- Optional: vertical lines to mark day boundaries ---
-    max_day = int(agent_df["Time"].max()) + 1
-    for d in range(max_day):
-        ax_state.axvline(x=d, color="red", alpha=1, linestyle="--")
-
-    # --- Legend for states ---
-    legend_handles = [Patch(facecolor=color, label=state) for state, color in state_palette.items()]
-    ax_state.legend(handles=legend_handles, loc="upper center", bbox_to_anchor=(0.5, 1.3), ncol=len(state_palette), frameon=False)
-
-    plt.tight_layout()
-    plt.show()
+    if isinstance(data, AgentColumns):
+        agent_ids = None if all_agents else data.first_of_types()
+        return data.iter_agents(agent_ids)
+    if not isinstance(data.index, pd.MultiIndex):
+        data = data.set_index(["Step", "AgentID"])
+    agents = split_agents(data)
+    return agents if all_agents else first_of_types(agents)
 
 
-if __name__=="__main__":
-    run = input("Run simulation? (y/n)\n> ")
-    if run == "y":
-        N_agents = int(input("Enter number of agents\n> "))
-        model = SuicideModel(N_agents)
-        # Timestep size
-        dt = 1/(24*60)
-        # Days to model
-        T = int(input("Enter number of days to model\n> "))
-        N_steps = int(T/dt)
-        t = np.linspace(0, T, N_steps+1)
-        for _ in trange(1, N_steps + 1, desc="Running simulation"):
-            model.step(dt)
-
-        # Ensure folder exists
-        data_folder = Path("output")
-        data_folder.mkdir(parents=True, exist_ok=True)
-
-        # Save full agent DataFrame
-        agent_df = model.datacollector.get_agent_vars_dataframe()
-        csv_path = data_folder / f"{T}_days_{N_agents}_agents.csv"
-        agent_df.to_csv(csv_path, index=True)
+def plot_types(data, directory=None, all_agents=False, workers=None):
+    """
+    Plots the first agent of every type, or every agent, rendering
+    them in parallel to files in directory if given.
+    """
+    from plotting.trajectories import plot_agent, render_agents
+
+    agents = select_agents(data, all_agents)
+    if directory is not None:
+        render_agents(agents, directory, workers=workers)
+        return
+    # Without a directory, show the plots one at a time
+    for agent_id, label, arrays in agents:
+        plot_agent(arrays, agent_id, label=label)
+
+
+def output_format(path, fmt=None):
+    """
+    Returns the given output format, or the one matching the file
+    extension of path.
+    """
+    if fmt is not None:
+        return fmt
+    if path.suffix not in OUTPUT_FORMATS:
+        raise ValueError(f"Cannot infer the output format of {path},"
+                         + " pass --format")
+    return OUTPUT_FORMATS[path.suffix]
+
+
+def save_agent_df(agent_df, path, fmt):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "columns":
+        from model.recording.AgentColumns import AgentColumns
+
+        AgentColumns.write(agent_df, path)
+    elif fmt == "csv":
+        agent_df.to_csv(path, index=True)
     else:
-        agent_df = pd.read_csv("output/10_days_100_agents.csv")
-    plot = input("Generate plot? (y/n)\n> ")
-    if plot == "y":
-        if not isinstance(agent_df.index, pd.MultiIndex):
-            agent_df.set_index(["AgentID", "Step"], inplace=True)
-
-        # Ensure 'Type' column exists in agent_df
-        agent_types = agent_df.reset_index().drop_duplicates("AgentID")[["AgentID", "Type"]]
-
-        # Take the first occurrence of each type
-        first_of_each_type = agent_types.groupby("Type").first().reset_index()
-
-        # Loop through each type and plot
-        for _, row in first_of_each_type.iterrows():
-            agent_id = row["AgentID"]
-            label = row["Type"]
-            if label=="bullied":
-                agent_id = 93
-            single_agent_df = agent_df.xs(agent_id, level="AgentID")
-            plot_combined(single_agent_df, agent_id, label=label)
+        agent_df.to_pickle(path)
+
+
+def load_agent_df(path, fmt):
+    """
+    Returns a saved output, as a DataFrame, or as AgentColumns whose
+    agents are read from disk on access.
+    """
+    import pandas as pd
+
+    if fmt == "columns":
+        from model.recording.AgentColumns import AgentColumns
+
+        return AgentColumns(path)
+    if fmt == "csv":
+        return pd.read_csv(path, index_col=["Step", "AgentID"],
+                           float_precision="round_trip")
+    return pd.read_pickle(path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Runs the suicide model without prompts and saves"
+                    + " the agent variables.")
+    parser.add_argument("-n", "--agents", type=int, default=100,
+                        help="Number of agents (default: 100)")
+    parser.add_argument("-d", "--days", type=float, default=10,
+                        help="Number of days to model (default: 10)")
+    parser.add_argument("--dt", type=float, default=1,
+                        help="Timestep size in minutes (default: 1)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the model's randomness")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="Update all agents in batched array steps")
+    parser.add_argument("-o", "--output", type=Path, default=None,
+                        help="Output file (default:"
+                             + " output/<days>_days_<agents>_agents.columns)")
+    parser.add_argument("-f", "--format", choices=sorted(set(OUTPUT_FORMATS.values())),
+                        default=None,
+                        help="Output format (default: from the file extension)")
+    parser.add_argument("--plot", action="store_true",
+                        help="Plot the first agent of every type")
+    parser.add_argument("--plot-dir", type=Path, default=None,
+                        help="Save the plots to this directory instead of"
+                             + " showing them, implies --plot")
+    parser.add_argument("--plot-all", action="store_true",
+                        help="Plot every agent instead of one per type,"
+                             + " implies --plot")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of processes rendering plots to"
+                             + " --plot-dir (default: one per CPU)")
+    parser.add_argument("--plot-only", type=Path, default=None,
+                        help="Plot a previously saved output file"
+                             + " without running the model")
+    parser.add_argument("--checkpoint", type=Path, default=None,
+                        help="File to write periodic checkpoints to")
+    parser.add_argument("--checkpoint-interval", type=int, default=1440,
+                        help="Number of steps between checkpoints"
+                             + " (default: 1440)")
+    parser.add_argument("--resume", type=Path, default=None,
+                        help="Continue the run saved in this checkpoint up"
+                             + " to --days, with its own number of agents"
+                             + " and settings")
+    parser.add_argument("--profile", type=Path, default=None,
+                        help="Measure the time per phase of a step and"
+                             + " write the report to this JSON file")
+    parser.add_argument("--sample-interval", type=float, default=None,
+                        help="With --profile, also sample the call stack"
+                             + " every this many seconds")
+    parser.add_argument("--statistics", type=Path, default=None,
+                        help="Summarize the agent variables per type and"
+                             + " hour while running and save the summary"
+                             + " to this CSV file")
+    parser.add_argument("--no-trajectories", action="store_true",
+                        help="Do not record or save the agent variables,"
+                             + " e.g. when only --statistics is needed")
+    parser.add_argument("--record-dir", type=Path, default=None,
+                        help="Flush the recorded trajectories to this"
+                             + " directory instead of keeping them in"
+                             + " memory, which grows with the run")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="Do not show a progress bar")
+    args = parser.parse_args(argv)
+    # Plot options are not silently ignored without --plot
+    if args.plot_dir is not None or args.plot_all:
+        args.plot = True
+    if args.plot and args.no_trajectories and args.plot_only is None:
+        parser.error("--plot, --plot-dir and --plot-all need the"
+                     + " trajectories, which --no-trajectories does not"
+                     + " record")
+    return args
+
+
+def print_profile(report):
+    print(f"{report['steps']} steps of {report['agents']} agents in"
+          + f" {report['step_seconds']:.2f} s,"
+          + f" {report['agent_steps_per_second'] or 0:.3g} agent steps/s")
+    for phase, timing in report["phases"].items():
+        print(f"  {phase}: {timing['seconds']:.3f} s"
+              + f" ({100 * (timing['fraction'] or 0):.1f}%)")
+    counters = report["counters"]
+    print(f"  {counters['transitions_per_step']:.3g} transitions and"
+          + f" {counters['rng_draws_per_step']:.3g} random draws per step")
+
+
+def run(args):
+    """
+    Runs the model as configured by the command line arguments and
+    returns the finished model.
+    """
+    from model.SuicideModel import SuicideModel
+    from model.profiling.StackSampler import StackSampler
+
+    profile = {
+        "profile": args.profile is not None,
+        "profile_sampler": None if args.sample_interval is None
+        else StackSampler(args.sample_interval),
+    }
+    # Timestep size in days
+    dt = args.dt / (24*60)
+    if args.resume is not None:
+        model = SuicideModel.resume(args.resume, **profile)
+    else:
+        model = SuicideModel(
+            args.agents,
+            seed=args.seed,
+            vectorized=args.vectorized,
+            checkpoint_path=args.checkpoint,
+            checkpoint_interval=None if args.checkpoint is None
+            else args.checkpoint_interval,
+            record_cadences={} if args.no_trajectories else None,
+            record_directory=args.record_dir,
+            statistics=None if args.statistics is None else {},
+            **profile,
+        )
+    N_steps = int(args.days/dt)
+    for _ in trange(model.steps + 1, N_steps + 1, desc="Running simulation",
+                    disable=args.quiet):
+        model.step(dt)
+    if model.profiler is not None:
+        model.profiler.write(args.profile)
+        print_profile(model.profiler.report())
+    return model
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.plot_only is not None:
+        agent_df = load_agent_df(
+            args.plot_only, output_format(args.plot_only, args.format))
+        plot_types(agent_df, args.plot_dir, args.plot_all, args.workers)
+        return
+
+    if args.output is not None:
+        # Fail before the run if the output format is unknown
+        output_format(args.output, args.format)
+    model = run(args)
+    if args.statistics is not None:
+        if model.statistics is None:
+            raise ValueError("The resumed run has no statistics")
+        args.statistics.parent.mkdir(parents=True, exist_ok=True)
+        model.statistics.to_dataframe().to_csv(args.statistics)
+    if args.no_trajectories:
+        return
+    output = args.output
+    if output is None:
+        # Resumed runs have the number of agents of their checkpoint
+        days = f"{args.days:g}"
+        output = Path("output") \
+            / f"{days}_days_{model.num_agents}_agents.columns"
+    agent_df = model.datacollector.get_agent_vars_dataframe()
+    save_agent_df(agent_df, output, output_format(output, args.format))
+    if args.plot:
+        plot_types(agent_df, args.plot_dir, args.plot_all, args.workers)
+
+
+if __name__=="__main__":
+    main()
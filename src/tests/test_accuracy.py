@@ -0,0 +1,13 @@
+from model.accuracy.AccuracyHarness import AccuracyHarness, ACCURACY_MODES
+
+
+def test_one_minute_mode_matches_reference():
+    # Same step size and common random numbers leave no error but
+    # that of the engine itself
+    name = "vectorized rk4 1 min"
+    harness = AccuracyHarness(n=20, days=2, seed=3,
+                              modes={name: ACCURACY_MODES[name]})
+    mode, = harness.run()["modes"]
+    assert mode["state_agreement"] == 1.0
+    for errors in mode["variables"].values():
+        assert errors["max"] < 1e-9
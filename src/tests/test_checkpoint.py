@@ -0,0 +1,25 @@
+from model.SuicideModel import SuicideModel
+
+
+def test_resume_is_bit_exact(tmp_path):
+    dt = 1 / (24 * 60)
+    # Long enough for every agent to change state around the checkpoint
+    steps = 900
+    for vectorized in (False, True):
+        kwargs = {"n": 12, "seed": 4, "vectorized": vectorized}
+        uninterrupted = SuicideModel(**kwargs)
+        for _ in range(2 * steps):
+            uninterrupted.step(dt)
+
+        path = tmp_path / f"vectorized_{vectorized}.npz"
+        model = SuicideModel(**kwargs)
+        for _ in range(steps):
+            model.step(dt)
+        model.save_checkpoint(path)
+        resumed = SuicideModel.resume(path)
+        for _ in range(steps):
+            resumed.step(dt)
+
+        assert resumed.datacollector.get_agent_vars_dataframe().equals(
+            uninterrupted.datacollector.get_agent_vars_dataframe())
+        assert resumed.time == uninterrupted.time
@@ -0,0 +1,13 @@
+from model.ensemble.Ensemble import Ensemble
+
+
+def test_results_do_not_depend_on_workers():
+    results = [
+        Ensemble(3, seed=0, days=0.1, model_kwargs={"n": 10},
+                 workers=workers).run()
+        for workers in (1, 2)
+    ]
+    for serial, parallel in zip(*results):
+        assert serial.equals(parallel)
+    # Replicates differ from each other
+    assert not results[0][0].equals(results[0][1])
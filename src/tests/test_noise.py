@@ -0,0 +1,14 @@
+import numpy as np
+from model.system_updates.WienerNoise import WienerNoise
+
+
+def test_increments_do_not_depend_on_block_size():
+    # Blocks of one step, of a few steps, and of more steps than drawn
+    dt = 1 / (24 * 60)
+    runs = []
+    for block_size in (7, 7 * 5, 2**20):
+        noise = WienerNoise(7, seed=0, block_size=block_size)
+        runs.append(np.array([noise.increments(dt) for _ in range(100)]))
+    for increments in runs[1:]:
+        assert np.array_equal(increments, runs[0])
+    assert np.isclose(runs[0].std(), np.sqrt(dt), rtol=0.1)
@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+import numpy as np
+from model.recording.OnlineStatistics import OnlineStatistics
+
+COLUMN = "Suicidal Thought"
+
+
+def collect(statistics, values):
+    """
+    Collects two batches of values of COLUMN, of the same agents, into
+    the first hourly bin.
+    """
+    for time, batch in enumerate(values):
+        population = SimpleNamespace(suicidal_thought=batch)
+        statistics.collect(SimpleNamespace(population=population,
+                                           time=time / (24 * 60)))
+
+
+def test_statistics_match_numpy():
+    rng = np.random.default_rng(0)
+    agents = [SimpleNamespace(type=("standard", "bullied")[i % 2])
+              for i in range(400)]
+    values = rng.random((2, len(agents)))
+    statistics = OnlineStatistics(agents, columns=(COLUMN,))
+    collect(statistics, values)
+    frame = statistics.to_dataframe()
+
+    for code, name in enumerate(("standard", "bullied")):
+        sample = values[:, code::2].ravel()
+        row = frame.loc[(0, name)]
+        assert row["Samples"] == len(sample)
+        assert np.isclose(row[f"{COLUMN} mean"], sample.mean())
+        assert np.isclose(row[f"{COLUMN} std"], sample.std(ddof=1))
+        assert row[f"{COLUMN} min"] == sample.min()
+        assert row[f"{COLUMN} max"] == sample.max()
+        # Quantiles are interpolated within histogram bins of 0.01
+        for q in (0.05, 0.5, 0.95):
+            assert abs(row[f"{COLUMN} p{100 * q:g}"]
+                       - np.quantile(sample, q)) <= 0.01
+        assert row[f"{COLUMN} > 0.5"] == np.mean(sample > 0.5)
+
+
+def test_merged_halves_match_one_collect():
+    rng = np.random.default_rng(1)
+    agents = [SimpleNamespace(type=("standard", "popular")[i % 2])
+              for i in range(300)]
+    values = rng.random((2, len(agents)))
+    whole = OnlineStatistics(agents, columns=(COLUMN,))
+    collect(whole, values)
+
+    halves = [OnlineStatistics(agents[part], columns=(COLUMN,))
+              for part in (slice(0, 120), slice(120, None))]
+    collect(halves[0], values[:, :120])
+    collect(halves[1], values[:, 120:])
+    halves[0].merge(halves[1])
+
+    for name, array in whole.arrays.items():
+        merged = halves[0].arrays[name][:whole.bins]
+        if array.dtype.kind == "i":
+            assert np.array_equal(merged, array[:whole.bins])
+        else:
+            assert np.allclose(merged, array[:whole.bins])
@@ -0,0 +1,40 @@
+from model.parameters.DefaultParameters import DefaultParameters
+from model.parameters.parameter_snapshots import get_snapshot
+from model.states.MorningState import MorningState
+from model.states.WorkState import WorkState
+
+
+def test_records_follow_applied_snapshot():
+    params = DefaultParameters()
+    snapshot = get_snapshot(DefaultParameters, WorkState())
+    params.apply_snapshot(snapshot)
+    assert params.aversion.compile() == snapshot["aversion"]
+    assert params.aversion.F_weight == snapshot["aversion"].F_weight
+
+    params.set_aversion_params(S_weight=1)
+    assert params.aversion.S_weight == 1
+    assert params.aversion.compile() == params.compiled["aversion"]
+
+
+def test_record_fields_write_through():
+    params = DefaultParameters()
+    params.aversion.feedback = 7
+    assert params.aversion.feedback == 7
+    assert params.compiled["aversion"].feedback == 7
+    try:
+        params.aversion.not_a_parameter = 1
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("unknown parameters are accepted")
+
+
+def test_morning_paths_agree():
+    morning = MorningState()
+    morning.sleep = 5 / 24
+    modified = DefaultParameters()
+    morning.modify_parameters(modified)
+    applied = DefaultParameters()
+    morning.apply_parameters(applied)
+    assert applied.compiled == modified.compiled
+    assert applied.compiled != DefaultParameters().compiled
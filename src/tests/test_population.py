@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from model.SuicideModel import SuicideModel
+from model.system_updates.WienerNoise import WienerNoise
+
+
+class MonotoneTimes(np.ndarray):
+    """
+    Agent clocks that fail as soon as any of them is set back.
+    """
+    def __setitem__(self, key, values):
+        previous = np.array(self[key])
+        assert np.all(np.asarray(values) >= previous), \
+            "an agent clock moved backwards"
+        super().__setitem__(key, values)
+
+
+def test_adaptive_clocks_never_move_backwards():
+    # Long nights make home states end before they start
+    model = SuicideModel(300, seed=0, vectorized=True,
+                         integrator="adaptive", stress_scheme="exact")
+    for agent in model.agents:
+        agent.state_params.set_sleep_params(mean=14)
+    population = model.population
+    population.total_time = population.total_time.view(MonotoneTimes)
+    dt = 1 / (24 * 60)
+    for _ in range(int(2 / dt)):
+        model.step(dt)
+    assert np.allclose(population.total_time, model.time)
+
+
+@pytest.mark.parametrize("stress_scheme", ["euler", "exact"])
+def test_vectorized_path_matches_per_agent_path(stress_scheme):
+    # Both paths draw their stress increments from the same noise,
+    # and the state lengths from the same model generator
+    dt = 1 / (24 * 60)
+    frames = []
+    for vectorized in (False, True):
+        model = SuicideModel(30, seed=3, vectorized=vectorized,
+                             noise=WienerNoise(30, seed=5),
+                             stress_scheme=stress_scheme)
+        for _ in range(int(2 / dt)):
+            model.step(dt)
+        frames.append(model.datacollector.get_agent_vars_dataframe())
+    per_agent, vectorized = frames
+    assert per_agent.index.equals(vectorized.index)
+    assert (per_agent["State"] == vectorized["State"]).all()
+    for column in ("Stress", "Aversive Internal State", "Urge to Escape",
+                   "Suicidal Thought", "Escape Behavior",
+                   "External-Focused Change", "Internal-Focused Change"):
+        assert np.allclose(per_agent[column], vectorized[column],
+                           rtol=0, atol=1e-9)
+
+
+def test_stress_interval_keeps_stress_distribution():
+    # Over the updates of a 15-step interval, the exact scheme gives
+    # stress the same distribution as updating it every step
+    dt = 1 / (24 * 60)
+    samples = []
+    for stress_interval in (15, 1):
+        model = SuicideModel(400, seed=8, vectorized=True,
+                             stress_scheme="exact",
+                             stress_interval=stress_interval)
+        stress = []
+        for step in range(1, int(3 / dt) + 1):
+            model.step(dt)
+            # Skip the first day, in which stress leaves its start value
+            if step % 15 == 0 and step * dt > 1:
+                stress.append(model.population.stress.copy())
+        samples.append(np.array(stress))
+    interval, per_step = samples
+    assert abs(interval.mean() - per_step.mean()) < 0.02
+    assert abs(interval.var() / per_step.var() - 1) < 0.25
@@ -0,0 +1,66 @@
+import numpy as np
+from model.sweep.designs import saltelli, morris, scale
+from model.sweep.sensitivity import sobol_indices, elementary_effects
+
+# Constants of the Ishigami function
+A = 7
+B = 0.1
+
+
+def ishigami(x):
+    return np.sin(x[:, 0]) + A * np.sin(x[:, 1])**2 \
+        + B * x[:, 2]**4 * np.sin(x[:, 0])
+
+
+def ishigami_indices():
+    """
+    Returns the analytic first- and total-order Sobol indices of the
+    Ishigami function on [-pi, pi]^3.
+    """
+    V1 = 0.5 * (1 + B * np.pi**4 / 5)**2
+    V2 = A**2 / 8
+    V13 = B**2 * np.pi**8 * (1 / 18 - 1 / 50)
+    V = V1 + V2 + V13
+    first = np.array([V1, V2, 0]) / V
+    total = np.array([V1 + V13, V2, V13]) / V
+    return first, total
+
+
+def test_sobol_indices_of_ishigami():
+    design = scale(saltelli(3, 2**14, seed=0), [(-np.pi, np.pi)] * 3)
+    first, total = sobol_indices(ishigami(design), 3)
+    expected_first, expected_total = ishigami_indices()
+    assert np.allclose(first, expected_first, atol=0.02)
+    assert np.allclose(total, expected_total, atol=0.02)
+
+
+def test_elementary_effects_of_linear_function():
+    # Effects of a linear function are its slopes in unit-cube
+    # coordinates, the same along every trajectory
+    slopes = np.array([2.0, -1.0, 0.0])
+    design = morris(3, 20, seed=0)
+    mu, mu_star, sigma = elementary_effects(design, design @ slopes, 3)
+    assert np.allclose(mu, slopes)
+    assert np.allclose(mu_star, np.abs(slopes))
+    assert np.allclose(sigma, 0)
+
+
+def test_elementary_effects_of_ishigami():
+    design = morris(3, 200, seed=0)
+    outputs = ishigami(scale(design, [(-np.pi, np.pi)] * 3))
+    mu, mu_star, sigma = elementary_effects(design, outputs, 3)
+    # x2 and x3 act symmetrically around 0, so their effects of either
+    # sign nearly cancel in the mean, but not in the mean magnitude
+    assert np.all(np.abs(mu[1:]) < 0.2 * mu_star[1:])
+    assert np.all(sigma > 0)
+
+
+def test_morris_design_stays_in_unit_cube():
+    design = morris(3, 50, levels=6, seed=0)
+    assert design.min() >= 0 and design.max() <= 1
+    for levels in (1, 3):
+        try:
+            morris(3, 5, levels=levels)
+        except ValueError:
+            continue
+        raise AssertionError(f"{levels} levels are accepted")
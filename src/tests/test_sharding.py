@@ -0,0 +1,15 @@
+from model.sharding.ShardedSimulation import ShardedSimulation
+
+
+def test_coupled_shards_are_reproducible():
+    # Shards exchange the coupling variable through shared memory
+    # after every step
+    model_kwargs = {"vectorized": True,
+                    "social_coupling": "aversive_internal_state"}
+    results = [
+        ShardedSimulation(30, 3, seed=0, days=0.05,
+                          model_kwargs=model_kwargs).run()
+        for _ in range(2)
+    ]
+    assert results[0].equals(results[1])
+    assert len(results[0].index.unique("AgentID")) == 30
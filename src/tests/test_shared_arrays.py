@@ -0,0 +1,26 @@
+import pickle
+from multiprocessing import shared_memory
+import numpy as np
+from model.shared.SharedArrays import SharedArrays
+
+
+def test_pickle_attaches_and_close_unlinks():
+    values = np.arange(12, dtype=float).reshape(3, 4)
+    shared = SharedArrays.create({"values": values, "codes": np.ones(5)})
+    name = shared.name
+    attached = pickle.loads(pickle.dumps(shared))
+    assert not attached.owner
+    assert np.array_equal(attached["values"], values)
+    # Both refer to the same memory
+    attached["values"][1, 2] = -1
+    assert shared["values"][1, 2] == -1
+    attached.close()
+    assert shared["codes"].sum() == 5
+
+    shared.close()
+    try:
+        shared_memory.SharedMemory(name=name).close()
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError("the shared memory block was not unlinked")
@@ -0,0 +1,36 @@
+import numpy as np
+from model.social.SocialGraph import SocialGraph
+
+
+def test_sampled_graph_has_no_self_loops_or_duplicates():
+    rng = np.random.default_rng(0)
+    # Degrees up to more than the other agents, which are capped
+    degrees = rng.integers(0, 60, 50)
+    graph = SocialGraph.sample(degrees, rng=rng)
+    assert np.array_equal(graph.degrees(), np.minimum(degrees, 49))
+    for index in range(len(graph)):
+        neighbours, weights = graph.neighbours(index)
+        assert index not in neighbours
+        assert len(np.unique(neighbours)) == len(neighbours)
+        assert np.all((weights >= 0) & (weights <= 1))
+
+
+def test_rows_match_the_whole_graph():
+    graph = SocialGraph.sample(
+        np.full(40, 5), ids=np.arange(1, 41), rng=np.random.default_rng(1))
+    values = np.random.default_rng(2).random(40)
+    bounds = (0, 13, 27, 40)
+    parts = [graph.rows(start, stop)
+             for start, stop in zip(bounds[:-1], bounds[1:])]
+    for part, start in zip(parts, bounds):
+        assert part.offset == start
+        assert part.columns == len(graph)
+        for row in range(len(part)):
+            assert np.array_equal(part.connections(row),
+                                  graph.connections(start + row))
+    assert np.array_equal(
+        np.concatenate([part.influence() for part in parts]),
+        graph.influence())
+    assert np.allclose(
+        np.concatenate([part.coupled_influence(values) for part in parts]),
+        graph.coupled_influence(values))